@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Gradioラッパーのイベントループ方式によるリクエスト毎レイテンシ比較
+
+before: 呼び出しごとに asyncio.run()（毎回ループ生成・破棄、接続も張り直し）
+after : 1つの常駐ループ上で await（共有 httpx.AsyncClient の接続を再利用）
+
+ローカルのスタブAPIを使うため、外部のjGrants APIにはアクセスしません。
+
+    python benchmarks/bench_event_loop.py --requests 200
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# ローカルのスタブAPIなのでクライアント側の流量制御はしない
+os.environ.setdefault("JGRANTS_RATE_LIMIT", "0")
+
+from jgrants_mcp_server import core  # noqa: E402
+from tests.stub_api import StubAPI  # noqa: E402
+
+PAYLOAD = {
+    "result": [
+        {
+            "id": f"a0W{i:015d}",
+            "title": f"補助金 {i}",
+            "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+            "subsidy_max_limit": 1000000 * (i + 1),
+        }
+        for i in range(50)
+    ]
+}
+
+
+def _report(label: str, samples: list, connections: int) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(
+        f"{label:<28} mean={statistics.mean(ms):7.2f}ms  p50={statistics.median(ms):7.2f}ms  "
+        f"p95={p95:7.2f}ms  connections={connections}"
+    )
+
+
+def bench_asyncio_run(stub: StubAPI, n: int) -> None:
+    before = stub.connections
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        asyncio.run(core._search_subsidies_internal(keyword="IT導入"))
+        samples.append(time.perf_counter() - start)
+    _report("before: asyncio.run/call", samples, stub.connections - before)
+
+
+def bench_persistent_loop(stub: StubAPI, n: int) -> None:
+    before = stub.connections
+
+    async def run():
+        samples = []
+        for _ in range(n):
+            start = time.perf_counter()
+            await core._search_subsidies_internal(keyword="IT導入")
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    samples = asyncio.run(run())
+    _report("after:  persistent loop", samples, stub.connections - before)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="計測するリクエスト数")
+    parser.add_argument("--delay", type=float, default=0.0, help="スタブAPIの応答遅延（秒）")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with StubAPI(delay=args.delay) as stub:
+        stub.json("/subsidies", PAYLOAD)
+        core.API_BASE_URL = stub.base_url
+
+        print(f"{'='*60}")
+        print(f"Event loop benchmark ({args.requests} requests)")
+        print(f"{'='*60}")
+        bench_asyncio_run(stub, args.requests)
+        bench_persistent_loop(stub, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""サーバーモジュールの import にかかる時間（起動時間の大半）の計測
+
+新しいインタープリタで `python -X importtime` を使って jgrants_mcp_server.core を import し、
+全体の時間と時間のかかったモジュール、変換ライブラリ（markitdown / pdfplumber）などが
+読み込まれたかを表示します。--max-ms を指定すると、超えた場合に終了コード1で終わります（CIでの回帰検知用）。
+
+    python benchmarks/bench_import_time.py --runs 5
+    python benchmarks/bench_import_time.py --module jgrants_mcp_server.gradio_mcp_app
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 起動時に読み込まれていないことを確認するライブラリ
+HEAVY_MODULES = ("markitdown", "pdfplumber", "pandas", "gradio")
+
+
+def _measure(module: str) -> dict:
+    """新しいプロセスで module を import し、importtime の出力と読み込まれた重いライブラリを返す"""
+    code = (
+        f"import json, sys; import {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:   self [us] | cumulative | imported package"（入れ子はパッケージ名の字下げで表す）
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        entries.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+    target = next(e for e in entries if e[0].strip() == module)
+    # 最上位（インデントなし）の import だけを積み上げると全体の時間になる
+    top_level = [e for e in entries if not e[0].startswith(" ")]
+    slowest = sorted(entries, key=lambda e: -e[1])[:10]
+    return {
+        "total_ms": sum(e[2] for e in top_level) / 1000,
+        "module_ms": target[2] / 1000,
+        "top": [(name.strip(), self_us / 1000) for name, self_us, _ in slowest],
+        "loaded": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="jgrants_mcp_server.core", help="計測するモジュール")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（中央値を表示）")
+    parser.add_argument("--max-ms", type=float, default=0, help="import 全体の許容時間（ミリ秒）。0 なら判定しない")
+    args = parser.parse_args()
+
+    results = [_measure(args.module) for _ in range(max(1, args.runs))]
+    total = statistics.median(r["total_ms"] for r in results)
+    last = results[-1]
+
+    print(f"{'='*60}")
+    print(f"Import time: {args.module} ({len(results)} runs)")
+    print(f"{'='*60}")
+    print(f"total (median)   {total:9.1f}ms")
+    print(f"{args.module:<16} {statistics.median(r['module_ms'] for r in results):9.1f}ms")
+    print("slowest modules, self time (last run):")
+    for name, ms in last["top"]:
+        print(f"  {name:<40} {ms:9.1f}ms")
+    print(f"heavy modules loaded: {', '.join(last['loaded']) or 'none'}")
+
+    if args.max_ms > 0 and total > args.max_ms:
+        print(f"FAIL: {total:.1f}ms > {args.max_ms:.1f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
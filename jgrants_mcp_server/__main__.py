@@ -4,6 +4,27 @@ Uses Gradio 5's native MCP server support for unified web UI + MCP server functi
 """
 
 import argparse
+import os
+
+# CLI引数 → 環境変数（サーバーのモジュールを読み込む前に設定する）
+ENV_OPTIONS = {
+    "http_max_connections": "JGRANTS_HTTP_MAX_CONNECTIONS",
+    "http_max_keepalive": "JGRANTS_HTTP_MAX_KEEPALIVE",
+    "http_keepalive_expiry": "JGRANTS_HTTP_KEEPALIVE_EXPIRY",
+    "http_connect_timeout": "JGRANTS_HTTP_CONNECT_TIMEOUT",
+    "http_read_timeout": "JGRANTS_HTTP_READ_TIMEOUT",
+    "http_write_timeout": "JGRANTS_HTTP_WRITE_TIMEOUT",
+    "http_pool_timeout": "JGRANTS_HTTP_POOL_TIMEOUT",
+    "dns_cache_ttl": "JGRANTS_DNS_CACHE_TTL",
+    "warmup_connections": "JGRANTS_WARMUP_CONNECTIONS",
+    "fast_lane_concurrency": "JGRANTS_FAST_LANE_CONCURRENCY",
+    "fast_lane_queue": "JGRANTS_FAST_LANE_QUEUE",
+    "slow_lane_concurrency": "JGRANTS_SLOW_LANE_CONCURRENCY",
+    "slow_lane_queue": "JGRANTS_SLOW_LANE_QUEUE",
+    "slow_lane_queue_timeout": "JGRANTS_SLOW_LANE_QUEUE_TIMEOUT",
+    "tool_concurrency": "JGRANTS_TOOL_CONCURRENCY",
+    "queue_max_size": "JGRANTS_UI_QUEUE_MAX_SIZE",
+}
 
 
 def main():
@@ -34,8 +55,123 @@ def main():
         help="Disable MCP server mode (Gradio UI only)"
     )
 
+    # Upstream HTTP client configuration (overrides the JGRANTS_HTTP_* environment variables)
+    http = parser.add_argument_group("upstream HTTP client")
+    http.add_argument(
+        "--http-max-connections",
+        type=int,
+        help="Maximum concurrent connections to the jGrants API (default: 20)"
+    )
+    http.add_argument(
+        "--http-max-keepalive",
+        type=int,
+        help="Maximum idle keep-alive connections kept in the pool (default: 10)"
+    )
+    http.add_argument(
+        "--http-keepalive-expiry",
+        type=float,
+        help="Seconds an idle keep-alive connection is kept (default: 5)"
+    )
+    http.add_argument(
+        "--http-connect-timeout",
+        type=float,
+        help="Connect timeout in seconds (default: 10)"
+    )
+    http.add_argument(
+        "--http-read-timeout",
+        type=float,
+        help="Read timeout in seconds (default: 30)"
+    )
+    http.add_argument(
+        "--http-write-timeout",
+        type=float,
+        help="Write timeout in seconds (default: 10)"
+    )
+    http.add_argument(
+        "--http-pool-timeout",
+        type=float,
+        help="Seconds to wait for a free pooled connection (default: 5)"
+    )
+    http.add_argument(
+        "--http2",
+        action="store_true",
+        help="Use HTTP/2 for the jGrants API (requires httpx[http2])"
+    )
+    http.add_argument(
+        "--dns-cache-ttl",
+        type=float,
+        help="Cache DNS lookups for this many seconds (default: 0, disabled)"
+    )
+
+    # Request lanes (fast: search/stats, slow: downloads/conversions)
+    lanes = parser.add_argument_group("request lanes")
+    lanes.add_argument(
+        "--fast-lane-concurrency",
+        type=int,
+        help="Concurrent search/metadata tool calls (default: 32, 0 = unlimited)"
+    )
+    lanes.add_argument(
+        "--fast-lane-queue",
+        type=int,
+        help="Fast-lane calls allowed to wait before new ones are rejected (default: 256, 0 = unlimited)"
+    )
+    lanes.add_argument(
+        "--slow-lane-concurrency",
+        type=int,
+        help="Concurrent detail downloads / file conversions (default: 4, 0 = unlimited)"
+    )
+    lanes.add_argument(
+        "--slow-lane-queue",
+        type=int,
+        help="Slow-lane calls allowed to wait before new ones are rejected (default: 32, 0 = unlimited)"
+    )
+    lanes.add_argument(
+        "--slow-lane-queue-timeout",
+        type=float,
+        help="Seconds a slow-lane call may wait for a slot (default: 120, 0 = no limit)"
+    )
+    lanes.add_argument(
+        "--tool-concurrency",
+        metavar="TOOL=N[,TOOL=N...]",
+        help="Per-tool concurrency limits inside each lane "
+             "(default: get_file_content=3,search_attachments=2, empty = none)"
+    )
+    lanes.add_argument(
+        "--queue-max-size",
+        type=int,
+        help="Maximum events held in the Gradio queue (default: 128, 0 = unlimited)"
+    )
+
+    # Startup warm-up
+    parser.add_argument(
+        "--warmup-connections",
+        type=int,
+        help="Connections to the jGrants API opened at startup (default: 2, 0 disables)"
+    )
+    parser.add_argument(
+        "--warmup-catalog",
+        action="store_true",
+        help="Sync the subsidy catalog at startup if it is missing or older than the sync interval"
+    )
+    parser.add_argument(
+        "--preload-converters",
+        action="store_true",
+        help="Load the document converters in the worker processes right after startup"
+    )
+
     args = parser.parse_args()
 
+    for option, env in ENV_OPTIONS.items():
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[env] = str(value)
+    if args.http2:
+        os.environ["JGRANTS_HTTP2"] = "1"
+    if args.warmup_catalog:
+        os.environ["JGRANTS_WARMUP_CATALOG"] = "1"
+    if args.preload_converters:
+        os.environ["JGRANTS_PRELOAD_CONVERTERS"] = "1"
+
     # Launch Gradio app with native MCP support
     from .gradio_mcp_app import launch_app
 
@@ -0,0 +1,167 @@
+"""補助金一覧の集計エンジン（pandas / NumPy によるベクトル化）
+
+一覧を一度だけ列形式（DataFrame）に読み込み、金額・締切の区分（区切りは呼び出し側で指定可能）、
+補助上限額のパーセンタイル、地域・業種・従業員数・利用目的ごとの内訳をまとめて計算します。
+pandas の import は重いため、core からは集計ツールの呼び出し時に読み込みます。
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# group_by に指定できる項目と、一覧（詳細）のキー
+DIMENSIONS = {
+    "area": "target_area_search",
+    "employees": "target_number_of_employees",
+    "industry": "industry",
+    "purpose": "use_purpose",
+}
+
+DEFAULT_AMOUNT_EDGES = (1000000, 10000000, 100000000)
+DEFAULT_DEADLINE_EDGES = (14, 30, 60)
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+UNSPECIFIED = "unspecified"
+EXPIRED = "expired"
+UNKNOWN_GROUP = "未設定"
+
+
+def validate_edges(edges: Sequence[float], name: str) -> Optional[str]:
+    """区切りの検証（不正ならエラーメッセージを返す）"""
+    if not edges:
+        return f"{name} には1つ以上の値を指定してください"
+    if any(e < 0 for e in edges):
+        return f"{name} には0以上の値を指定してください"
+    if any(b <= a for a, b in zip(edges, edges[1:])):
+        return f"{name} は昇順（重複なし）で指定してください"
+    return None
+
+
+def amount_labels(edges: Sequence[float]) -> List[str]:
+    """金額区分のラベル（区間は上限を含む）"""
+    labels = [f"〜{edges[0]:,.0f}"]
+    labels += [f"{a:,.0f}超〜{b:,.0f}" for a, b in zip(edges, edges[1:])]
+    labels.append(f"{edges[-1]:,.0f}超")
+    return labels
+
+
+def deadline_labels(edges: Sequence[int]) -> List[str]:
+    """締切区分（締切までの日数）のラベル"""
+    bounds = [-1] + list(edges)
+    labels = [f"{a + 1}〜{b}日" for a, b in zip(bounds, bounds[1:])]
+    labels.append(f"{edges[-1] + 1}日以上")
+    return labels
+
+
+def build_frame(records: List[Dict[str, Any]], now: datetime) -> pd.DataFrame:
+    """一覧を列形式に読み込み、金額・締切までの日数を数値列にする"""
+    columns = ["id", "title", "subsidy_max_limit", "acceptance_end_datetime", *DIMENSIONS.values()]
+    frame = pd.DataFrame.from_records(
+        [{c: r.get(c) for c in columns} for r in records], columns=columns
+    )
+    amount = pd.to_numeric(frame["subsidy_max_limit"], errors="coerce")
+    # 0 は未設定として扱う（get_subsidy_overview と同じ）
+    frame["amount"] = amount.where(amount != 0)
+    end = pd.to_datetime(frame["acceptance_end_datetime"], utc=True, errors="coerce", format="ISO8601")
+    seconds = (end - pd.Timestamp(now)).dt.total_seconds()
+    frame["days_left"] = np.floor(seconds / 86400)
+    return frame
+
+
+def _amount_bucket(frame: pd.DataFrame, edges: Sequence[float]) -> pd.Series:
+    labels = amount_labels(edges)
+    bucket = pd.cut(frame["amount"], bins=[-np.inf, *edges, np.inf], labels=labels, right=True)
+    return bucket.cat.add_categories([UNSPECIFIED]).fillna(UNSPECIFIED)
+
+
+def _deadline_bucket(frame: pd.DataFrame, edges: Sequence[int]) -> pd.Series:
+    labels = deadline_labels(edges)
+    bucket = pd.cut(frame["days_left"], bins=[-1, *edges, np.inf], labels=labels, right=True)
+    bucket = bucket.cat.add_categories([EXPIRED, UNSPECIFIED])
+    bucket = bucket.mask(frame["days_left"] < 0, EXPIRED)
+    return bucket.fillna(UNSPECIFIED)
+
+
+def _counts(bucket: pd.Series) -> Dict[str, int]:
+    return {str(k): int(v) for k, v in bucket.value_counts(sort=False).items()}
+
+
+def _number(value: Any) -> Optional[float]:
+    return None if value is None or pd.isna(value) else float(value)
+
+
+def _amount_summary(amount: pd.Series, percentiles: Sequence[float]) -> Dict[str, Any]:
+    known = amount.dropna()
+    summary: Dict[str, Any] = {
+        "count": int(known.size),
+        "min": _number(known.min()) if known.size else None,
+        "max": _number(known.max()) if known.size else None,
+        "mean": _number(known.mean()) if known.size else None,
+    }
+    if percentiles:
+        values = known.quantile([p / 100 for p in percentiles]) if known.size else None
+        summary["percentiles"] = {
+            f"p{p:g}": (_number(values.iloc[i]) if values is not None else None)
+            for i, p in enumerate(percentiles)
+        }
+    return summary
+
+
+def aggregate(
+    records: List[Dict[str, Any]],
+    now: datetime,
+    group_by: Optional[str] = None,
+    amount_edges: Sequence[float] = DEFAULT_AMOUNT_EDGES,
+    deadline_edges: Sequence[int] = DEFAULT_DEADLINE_EDGES,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+) -> Dict[str, Any]:
+    """一覧を集計する。
+
+    group_by の項目は「 / 」区切りの複数値をそれぞれの値に数える（複数の地域が対象の補助金は各地域に1件ずつ）。
+    """
+    frame = build_frame(records, now)
+    frame["amount_bucket"] = _amount_bucket(frame, amount_edges)
+    frame["deadline_bucket"] = _deadline_bucket(frame, deadline_edges)
+
+    result: Dict[str, Any] = {
+        "total_count": int(len(frame)),
+        "amount": {
+            "edges": list(amount_edges),
+            "buckets": _counts(frame["amount_bucket"]),
+            **_amount_summary(frame["amount"], percentiles),
+        },
+        "deadline": {
+            "edges": list(deadline_edges),
+            "buckets": _counts(frame["deadline_bucket"]),
+        },
+    }
+
+    if group_by:
+        values = (
+            frame[DIMENSIONS[group_by]]
+            .fillna("")
+            .astype(str)
+            .str.split("/")
+        )
+        exploded = frame.assign(group=values).explode("group")
+        exploded["group"] = exploded["group"].str.strip().replace("", UNKNOWN_GROUP)
+        grouped = exploded.groupby("group", sort=False)
+        sizes = grouped.size().sort_values(ascending=False, kind="stable")
+        medians = grouped["amount"].median()
+        amount_table = pd.crosstab(exploded["group"], exploded["amount_bucket"], dropna=False)
+        deadline_table = pd.crosstab(exploded["group"], exploded["deadline_bucket"], dropna=False)
+        result["group_by"] = group_by
+        result["groups"] = [
+            {
+                "value": group,
+                "count": int(count),
+                "amount_median": _number(medians.get(group)),
+                "amount_buckets": {str(k): int(v) for k, v in amount_table.loc[group].items()},
+                "deadline_buckets": {str(k): int(v) for k, v in deadline_table.loc[group].items()},
+            }
+            for group, count in sizes.items()
+        ]
+
+    return result
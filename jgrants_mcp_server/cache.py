@@ -0,0 +1,253 @@
+"""インメモリのレスポンスキャッシュ（TTL + LRU + 単一フライト + stale-while-revalidate）
+
+同じ検索条件の呼び出しを短時間に何度も行うLLMエージェント向けに、
+上流APIへのリクエストを間引くためのキャッシュです。
+有効期間を過ぎたエントリも stale_ttl の間は保持し、上流が遅い・止まっている場合でも
+古い結果をすぐに返しつつ裏で取り直せるようにします。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(params: Dict[str, Any]) -> str:
+    """パラメータ辞書を正規化してキャッシュキーにする（キー順・前後空白・None を無視）"""
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def estimate_size(value: Any) -> int:
+    """キャッシュ値のおおよそのバイト数（JSONシリアライズ後の長さ）"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value: Any, size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class ResponseCache:
+    """TTL付きLRUキャッシュ。
+
+    - ttl: 有効期間（秒）。0以下でキャッシュ無効
+    - max_entries: 最大エントリ数
+    - max_bytes: 値の合計サイズ上限（estimate_size による概算）
+    - stale_ttl: 有効期間を過ぎてからも古い結果として返してよい期間（秒）。0で無効
+
+    get_or_fetch() は同一キーの同時呼び出しを1回の取得に集約する（単一フライト）。
+    get_or_fetch_stale() は期限切れでも stale_ttl 内ならすぐに返し、裏で取り直す。
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 256,
+        max_bytes: int = 32 * 1024 * 1024,
+        stale_ttl: float = 0.0,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = max(0.0, stale_ttl)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._revalidations: Set[asyncio.Task] = set()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_hits = 0
+        self.revalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """有効なエントリがあれば返す（LRU順を更新）。期限切れは削除する（stale_ttl 内なら残す）"""
+        entry = self._lookup(key)
+        if entry is None or time.monotonic() - entry.stored_at > self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """エントリを返す。古い結果としても使えない（ttl + stale_ttl を過ぎた）ものは削除する"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl + self.stale_ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def set(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, size, time.monotonic())
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """キャッシュにあれば返し、なければ fetch() を1回だけ実行して結果を共有する。
+
+        cacheable(value) が False の結果（エラー応答など）は保存しない。
+        キャッシュ無効時（ttl<=0）も同時呼び出しの集約は行う。
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 先行した呼び出しがキャンセルされた場合は自分で取り直す
+                return await self.get_or_fetch(key, fetch, cacheable)
+
+        self.misses += 1
+        return await self._fetch_shared(key, self._begin(key), fetch, cacheable)
+
+    async def get_or_fetch_stale(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Tuple[Any, Optional[float]]:
+        """get_or_fetch と同じだが、期限切れでも stale_ttl 内のエントリはすぐに返し、裏で取り直す。
+
+        (値, 古い結果を返した場合はその経過秒数 / それ以外は None) を返す。
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.monotonic() - entry.stored_at
+            if age > self.ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._revalidate(key, fetch, cacheable)
+                return entry.value, age
+        return await self.get_or_fetch(key, fetch, cacheable), None
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool]) -> None:
+        """裏で取り直す（同じキーの取得が進行中なら何もしない）"""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            return
+        self.revalidations += 1
+        # タスクの開始を待たずに進行中として登録し、続く呼び出しで重複して取り直さない
+        future = self._begin(key)
+        task = loop.create_task(self._fetch_shared(key, future, fetch, cacheable))
+        self._revalidations.add(task)
+
+        def done(t: asyncio.Task) -> None:
+            self._revalidations.discard(t)
+            if not future.done():
+                # 開始前にキャンセルされた
+                future.cancel()
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning(f"キャッシュの再取得に失敗しました: {t.exception()}")
+
+        task.add_done_callback(done)
+
+    def _begin(self, key: str) -> asyncio.Future:
+        """key の取得を進行中として登録する"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    async def _fetch_shared(
+        self,
+        key: str,
+        future: asyncio.Future,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool],
+    ) -> Any:
+        """fetch() を実行し、結果を future で同じキーの同時呼び出しと共有する"""
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 待機者がいない場合の "exception was never retrieved" 警告を抑止
+            future.exception()
+            raise
+        else:
+            if cacheable(value):
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "stale_ttl_seconds": self.stale_ttl,
+            "stale_hits": self.stale_hits,
+            "revalidations": self.revalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
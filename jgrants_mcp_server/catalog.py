@@ -0,0 +1,334 @@
+"""補助金一覧のローカルミラー（SQLite）
+
+GET /subsidies の結果を定期的に取り込み、検索をローカルで（キーワード・地域・業種・従業員数・
+金額・締切の条件で）処理できるようにします。上流APIが遅い・レート制限中の場合でも検索を続けられます。
+get_subsidy_detail で取得した詳細（業種・利用目的・更新日時など）も取り込み、絞り込みに使います。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# スキーマを変えた場合に上げる（古いカタログは作り直す）
+SCHEMA_VERSION = 1
+
+# 詳細から取り込む項目（添付ファイルなどの大きな値は除く）
+DETAIL_TEXT_KEYS = ("detail", "subsidy_catch_phrase", "use_purpose", "industry", "target_detail")
+
+SORT_COLUMNS = {
+    "acceptance_end_datetime": "end_ts",
+    "acceptance_start_datetime": "start_ts",
+    "created_date": "created_ts",
+}
+
+
+def normalize(text: str) -> str:
+    """表記ゆれ（全角・半角、大文字・小文字）を吸収する"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _amount(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _values(value: Any) -> Optional[str]:
+    """「 / 」区切りの複数値を "|値1|値2|" 形式にする（instr で完全一致を判定するため）"""
+    if value in (None, ""):
+        return None
+    parts = [normalize(part.strip()) for part in str(value).split("/") if part.strip()]
+    return "|" + "|".join(parts) + "|" if parts else None
+
+
+def filter_records(
+    records: List[Dict[str, Any]],
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    deadline_within_days: Optional[int] = None,
+    now: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """一覧APIの結果を金額・締切の条件で絞り込む（APIにない条件をAPI検索の結果にも適用するため）"""
+    now = time.time() if now is None else now
+    filtered = []
+    for record in records:
+        amount = _amount(record.get("subsidy_max_limit"))
+        if min_amount is not None and (amount is None or amount < min_amount):
+            continue
+        if max_amount is not None and (amount is None or amount > max_amount):
+            continue
+        if deadline_within_days is not None:
+            end = _timestamp(record.get("acceptance_end_datetime"))
+            if end is None or not now <= end <= now + deadline_within_days * 86400:
+                continue
+        filtered.append(record)
+    return filtered
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SubsidyCatalog:
+    """補助金一覧のローカルミラー。
+
+    各メソッドはブロッキングI/Oなので、イベントループからはスレッドで呼ぶ。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.executescript("DROP TABLE IF EXISTS subsidies; DROP TABLE IF EXISTS meta;")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS subsidies (
+                    id TEXT PRIMARY KEY,
+                    record TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    search_text TEXT NOT NULL,
+                    areas TEXT,
+                    employees TEXT,
+                    industries TEXT,
+                    purposes TEXT,
+                    amount REAL,
+                    start_ts REAL,
+                    end_ts REAL,
+                    created_ts REAL,
+                    update_datetime TEXT,
+                    detail TEXT,
+                    first_seen_at TEXT NOT NULL,
+                    last_seen_at TEXT NOT NULL,
+                    detail_synced_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS subsidies_end ON subsidies(end_ts);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---- 取り込み ----
+
+    def upsert_listings(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """一覧APIの結果を取り込み、{"added", "updated", "unchanged"} を返す"""
+        counts = {"added": 0, "updated": 0, "unchanged": 0}
+        now = _now_iso()
+        with self._lock, self._conn:
+            for record in records:
+                subsidy_id = record.get("id")
+                if not subsidy_id:
+                    continue
+                content_hash = hashlib.sha256(
+                    json.dumps(record, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+                ).hexdigest()
+                row = self._conn.execute(
+                    "SELECT content_hash, detail FROM subsidies WHERE id = ?", (subsidy_id,)
+                ).fetchone()
+                if row is not None and row[0] == content_hash:
+                    self._conn.execute("UPDATE subsidies SET last_seen_at = ? WHERE id = ?", (now, subsidy_id))
+                    counts["unchanged"] += 1
+                    continue
+                detail = json.loads(row[1]) if row is not None and row[1] else {}
+                self._write(subsidy_id, record, content_hash, detail, now, is_new=row is None)
+                counts["added" if row is None else "updated"] += 1
+        return counts
+
+    def upsert_detail(self, subsidy: Dict[str, Any]) -> None:
+        """詳細APIの結果（スカラー値の項目のみ）を取り込む"""
+        subsidy_id = subsidy.get("id")
+        if not subsidy_id:
+            return
+        detail = {
+            k: v for k, v in subsidy.items()
+            if isinstance(v, (str, int, float, bool)) or v is None
+        }
+        now = _now_iso()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT record, content_hash FROM subsidies WHERE id = ?", (subsidy_id,)
+            ).fetchone()
+            if row is None:
+                # 一覧に未登録の補助金は詳細から一覧相当の項目を作る
+                record = {k: detail.get(k) for k in (
+                    "id", "name", "title", "target_area_search", "subsidy_max_limit",
+                    "acceptance_start_datetime", "acceptance_end_datetime", "target_number_of_employees",
+                ) if k in detail}
+                self._write(subsidy_id, record, "", detail, now, is_new=True)
+            else:
+                self._write(subsidy_id, json.loads(row[0]), row[1], detail, now, is_new=False)
+            self._conn.execute("UPDATE subsidies SET detail_synced_at = ? WHERE id = ?", (now, subsidy_id))
+
+    def _write(
+        self, subsidy_id: str, record: Dict[str, Any], content_hash: str,
+        detail: Dict[str, Any], now: str, is_new: bool
+    ) -> None:
+        merged = {**detail, **record}
+        search_text = normalize(" ".join(
+            str(merged.get(k) or "") for k in ("title", "name") + DETAIL_TEXT_KEYS
+        ))
+        values = (
+            json.dumps(record, ensure_ascii=False),
+            content_hash,
+            search_text,
+            _values(merged.get("target_area_search")),
+            _values(merged.get("target_number_of_employees")),
+            _values(detail.get("industry")),
+            _values(detail.get("use_purpose")),
+            _amount(merged.get("subsidy_max_limit")),
+            _timestamp(merged.get("acceptance_start_datetime")),
+            _timestamp(merged.get("acceptance_end_datetime")),
+            _timestamp(merged.get("created_date")),
+            merged.get("update_datetime"),
+            json.dumps(detail, ensure_ascii=False) if detail else None,
+            now,
+        )
+        if is_new:
+            self._conn.execute(
+                "INSERT INTO subsidies (record, content_hash, search_text, areas, employees, industries, purposes, "
+                "amount, start_ts, end_ts, created_ts, update_datetime, detail, last_seen_at, first_seen_at, id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values + (now, subsidy_id),
+            )
+        else:
+            self._conn.execute(
+                "UPDATE subsidies SET record = ?, content_hash = ?, search_text = ?, areas = ?, employees = ?, "
+                "industries = ?, purposes = ?, amount = ?, start_ts = ?, end_ts = ?, created_ts = ?, "
+                "update_datetime = ?, detail = ?, last_seen_at = ? WHERE id = ?",
+                values + (subsidy_id,),
+            )
+
+    # ---- メタ情報 ----
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+
+    def get_meta(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def last_sync_age(self) -> Optional[float]:
+        """最後に同期が完了してからの秒数（未同期なら None）"""
+        synced = self.get_meta("last_sync_at")
+        return time.time() - _timestamp(synced) if synced else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM subsidies").fetchone()[0]
+
+    # ---- 検索 ----
+
+    def search(
+        self,
+        keyword: Optional[str] = None,
+        use_purpose: Optional[str] = None,
+        industry: Optional[str] = None,
+        target_number_of_employees: Optional[str] = None,
+        target_area_search: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        deadline_within_days: Optional[int] = None,
+        acceptance: int = 1,
+        sort: str = "acceptance_end_datetime",
+        order: str = "ASC",
+        now: Optional[float] = None,
+        with_detail: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """条件に合う補助金を一覧APIと同じ形式で返す（with_detail なら取得済みの詳細の項目も含める）。
+
+        地域・従業員数・業種・利用目的は「 / 」区切りの値のいずれかと一致すれば対象とする。
+        値が未取得（業種・利用目的は詳細を取得した補助金のみ判明）の補助金は除外しない。
+        """
+        now = time.time() if now is None else now
+        clauses: List[str] = []
+        params: List[Any] = []
+        if keyword and keyword.strip():
+            for word in normalize(keyword).split():
+                clauses.append("instr(search_text, ?) > 0")
+                params.append(word)
+        for column, value in (
+            ("areas", target_area_search),
+            ("employees", target_number_of_employees),
+            ("industries", industry),
+            ("purposes", use_purpose),
+        ):
+            wanted = _values(value)
+            if wanted:
+                options = [f"|{v}|" for v in wanted.strip("|").split("|")]
+                clauses.append(
+                    f"({column} IS NULL OR " + " OR ".join(f"instr({column}, ?) > 0" for _ in options) + ")"
+                )
+                params.extend(options)
+        if min_amount is not None:
+            clauses.append("amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("amount <= ?")
+            params.append(max_amount)
+        if acceptance == 1:
+            clauses.append("(start_ts IS NULL OR start_ts <= ?) AND end_ts >= ?")
+            params.extend([now, now])
+        if deadline_within_days is not None:
+            clauses.append("end_ts BETWEEN ? AND ?")
+            params.extend([now, now + deadline_within_days * 86400])
+
+        column = SORT_COLUMNS.get(sort, "end_ts")
+        direction = "DESC" if str(order).upper() == "DESC" else "ASC"
+        sql = "SELECT record, detail FROM subsidies"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        # 値のない補助金は並び順に関係なく末尾へ
+        sql += f" ORDER BY {column} IS NULL, {column} {direction}, id"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if with_detail:
+            return [{**(json.loads(row[1]) if row[1] else {}), **json.loads(row[0])} for row in rows]
+        return [json.loads(row[0]) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.last_sync_age()
+        with self._lock:
+            records, detailed = self._conn.execute(
+                "SELECT COUNT(*), COUNT(detail_synced_at) FROM subsidies"
+            ).fetchone()
+        return {
+            "records": records,
+            "with_detail": detailed,
+            "last_sync_at": self.get_meta("last_sync_at"),
+            "last_sync_age_seconds": round(age, 1) if age is not None else None,
+            "last_sync_result": self.get_meta("last_sync_result"),
+        }
@@ -0,0 +1,337 @@
+"""ドキュメント変換エンジン（MarkItDown / pdfplumber をプロセスプールで実行）
+
+PDF・Office文書のMarkdown変換はCPUを長時間使うため、イベントループから切り離して
+ワーカープロセスで実行します。ワーカー数・ジョブごとのタイムアウト・ファイルサイズ/ページ数の
+上限を設定でき、呼び出し側がキャンセルされた（MCPクライアントが切断した）場合は
+未着手のジョブを取り消します。
+
+タイムアウトはワーカーがジョブを始めてから数えます（ジョブはワーカーの数までしかプールに投げない）。
+スレッドモード（max_workers=0）では実行中の変換を止められないため、タイムアウトは
+呼び出し側が待つのをやめるだけの「ベストエフォート」です（変換は終わるまで裏でCPUを使い続け、
+次のジョブは新しいスレッドで実行します）。
+
+ワーカープロセスでは core を import しないよう、このモジュールは軽量な依存だけで構成しています。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from .lanes import ConcurrencyLane
+
+if TYPE_CHECKING:
+    from markitdown import MarkItDown
+
+# markitdown / pdfplumber は読み込みに時間とメモリがかかるため、変換を実行するワーカーで初めて使うときに読み込む
+# （サーバーの起動時には読み込まない。JGRANTS_PRELOAD_CONVERTERS=1 なら起動後に裏でワーカーに読み込ませる）
+
+logger = logging.getLogger(__name__)
+
+# プロセスモードで呼び出し側が待つ時間の、タイムアウトへの上乗せ（秒）。
+# 打ち切りはワーカー側の SIGALRM に任せ、ワーカーの起動と結果の受け渡しの分だけ余裕を持たせる
+_RESULT_GRACE = 10.0
+
+
+class ConversionRejected(Exception):
+    """サイズ・ページ数の上限を超えたため変換しなかった"""
+
+
+class ConversionTimeout(Exception):
+    """変換がタイムアウトした"""
+
+
+# ========================================
+# ワーカー側（プロセスプール内で実行）
+# ========================================
+
+_MARKITDOWN: Optional["MarkItDown"] = None
+
+
+def _get_markitdown() -> "MarkItDown":
+    """プロセス内で共有するMarkItDownインスタンス（コンバータの初期化は一度だけ）"""
+    global _MARKITDOWN
+    if _MARKITDOWN is None:
+        from markitdown import MarkItDown
+
+        _MARKITDOWN = MarkItDown()
+    return _MARKITDOWN
+
+
+def preload() -> int:
+    """変換ライブラリを読み込んでおく（ワーカーで実行し、そのプロセスIDを返す）"""
+    import pdfplumber  # noqa: F401
+
+    _get_markitdown()
+    return os.getpid()
+
+
+def _raise_timeout(signum, frame):
+    raise ConversionTimeout("変換がタイムアウトしました")
+
+
+def _check_pdf_pages(file_path: Path, max_pages: int) -> None:
+    if max_pages <= 0:
+        return
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        pages = len(pdf.pages)
+    if pages > max_pages:
+        raise ConversionRejected(f"ページ数が上限を超えています（{pages} > {max_pages}ページ）")
+
+
+class _Alarm:
+    """ワーカープロセスのメインスレッドで実行される場合に SIGALRM でタイムアウトを強制する"""
+
+    def __init__(self, timeout: float):
+        self.enabled = (
+            timeout > 0
+            and hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        )
+        self.timeout = timeout
+
+    def __enter__(self):
+        if self.enabled:
+            self.previous = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+
+
+def convert_to_markdown(
+    path: str, file_extension: str, mime_type: str, max_pages: int = 0, timeout: float = 0
+) -> Optional[Tuple[str, str]]:
+    """MarkItDown（PDFは失敗時にpdfplumber）でMarkdownに変換し、(markdown, 抽出方法) を返す"""
+    with _Alarm(timeout):
+        file_path = Path(path)
+        if mime_type == "application/pdf":
+            _check_pdf_pages(file_path, max_pages)
+        return _convert(file_path, file_extension, mime_type)
+
+
+def extract_pdf_pages(
+    path: str, start: int, count: Optional[int], timeout: float = 0
+) -> Tuple[Dict[int, str], int]:
+    """PDFの指定ページ（0始まりで start から count ページ、None は最後まで）だけテキストを抽出し、
+    ({ページ番号: テキスト}, 総ページ数) を返す"""
+    import pdfplumber
+
+    with _Alarm(timeout):
+        with pdfplumber.open(path) as pdf:
+            total = len(pdf.pages)
+            texts = {}
+            for index in range(start, total if count is None else min(start + count, total)):
+                texts[index] = pdf.pages[index].extract_text() or ""
+                # ページごとのキャッシュを解放して巨大PDFでもメモリを抑える
+                pdf.pages[index].close()
+        return texts, total
+
+
+def _convert(file_path: Path, file_extension: str, mime_type: str) -> Optional[Tuple[str, str]]:
+    try:
+        # MarkItDownを使用してMarkdownに変換
+        result = _get_markitdown().convert(str(file_path))
+        extracted_markdown = result.text_content
+
+        if extracted_markdown and extracted_markdown.strip():
+            logger.info(f"{file_extension}からMarkdownを抽出しました: {len(extracted_markdown)} 文字")
+            return extracted_markdown, f"markitdown_{file_extension[1:]}"  # 拡張子から.を除去
+        logger.warning(f"{file_extension}からMarkdownの抽出に失敗しました。BASE64形式で返します。")
+        return None
+    except ConversionTimeout:
+        raise
+    except Exception as e:
+        logger.error(f"MarkItDown変換エラー: {e}")
+        # PDFの場合はpdfplumberにフォールバック
+        if mime_type == "application/pdf":
+            try:
+                import pdfplumber
+
+                with pdfplumber.open(file_path) as pdf:
+                    text_parts = []
+                    for i, page in enumerate(pdf.pages, 1):
+                        page_text = page.extract_text()
+                        if page_text:
+                            text_parts.append(f"## ページ {i}\n\n{page_text}")
+                    extracted_markdown = "\n\n---\n\n".join(text_parts)
+
+                    if extracted_markdown and extracted_markdown.strip():
+                        logger.info(f"pdfplumberでPDFからMarkdownを抽出しました: {len(extracted_markdown)} 文字")
+                        return extracted_markdown, "pdfplumber_markdown"
+            except ConversionTimeout:
+                raise
+            except Exception as e2:
+                logger.error(f"pdfplumber変換エラー: {e2}")
+        return None
+
+
+# ========================================
+# 呼び出し側（イベントループ上）
+# ========================================
+
+class ConversionEngine:
+    """変換ジョブをワーカープールに投げるエンジン。
+
+    - max_workers: ワーカープロセス数。0 の場合はプロセスを使わずスレッド1本で実行（小規模環境・テスト用）
+    - timeout: ジョブごとのタイムアウト（秒、0で無制限。スレッドモードではベストエフォート）
+    - max_bytes: 変換するファイルサイズの上限（0で無制限）
+    - max_pages: 変換するPDFのページ数の上限（0で無制限）
+    """
+
+    def __init__(self, max_workers: int, timeout: float = 0, max_bytes: int = 0, max_pages: int = 0):
+        self.max_workers = max(0, max_workers)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.abandoned = 0
+        self.running = 0
+        self.preloaded_workers = 0
+        # プールに投げるジョブをワーカーの数までにする（プール内で順番を待たせず、投げた時点から実行される）
+        self._slots = ConcurrencyLane("convert", limit=self.max_workers or 1)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.max_workers == 0:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jgrants-convert")
+                else:
+                    # fork はスレッドを持つ親プロセスでは安全でないため spawn で起動する
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+            return self._executor
+
+    async def convert(self, file_path: Path, file_extension: str, mime_type: str) -> Optional[Tuple[str, str]]:
+        """ファイルをMarkdownに変換する。
+
+        Raises:
+            ConversionRejected: サイズ・ページ数の上限超過
+            ConversionTimeout: タイムアウト
+        """
+        size = os.path.getsize(file_path)
+        if self.max_bytes > 0 and size > self.max_bytes:
+            self.rejected += 1
+            raise ConversionRejected(f"ファイルサイズが上限を超えています（{size:,} > {self.max_bytes:,} bytes）")
+
+        return await self._run(
+            convert_to_markdown, str(file_path), file_extension, mime_type, self.max_pages, self.timeout
+        )
+
+    async def extract_pages(
+        self, file_path: Path, start: int, count: Optional[int]
+    ) -> Tuple[Dict[int, str], int]:
+        """PDFの指定ページだけ抽出する（ページ単位なのでファイルサイズの上限は適用しない）。
+
+        count（None は最後まで）は max_pages を上限に切り詰める。
+        """
+        if self.max_pages > 0:
+            count = self.max_pages if count is None else min(count, self.max_pages)
+        return await self._run(extract_pdf_pages, str(file_path), start, count, self.timeout)
+
+    async def _run(self, fn, *args):
+        self.submitted += 1
+        try:
+            # ワーカーが空くまではここで待つ（キャンセルされれば投げずに終わる）
+            async with self._slots.slot():
+                self.running += 1
+                try:
+                    result = await self._submit(fn, *args)
+                finally:
+                    self.running -= 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ConversionTimeout(f"変換がタイムアウトしました（{self.timeout:.0f}秒）")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except ConversionTimeout:
+            self.timeouts += 1
+            raise
+        except ConversionRejected:
+            self.rejected += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    async def _submit(self, fn, *args):
+        """空いているワーカーでジョブを実行し、開始からタイムアウトまで結果を待つ"""
+        executor = self._get_executor()
+        # キャンセル時は wrap_future 経由で未着手のジョブも取り消される
+        wrapped = asyncio.wrap_future(executor.submit(fn, *args))
+        if self.timeout <= 0:
+            return await wrapped
+        if self.max_workers:
+            # 実行中のジョブはワーカー側の SIGALRM で打ち切られる
+            return await asyncio.wait_for(wrapped, timeout=self.timeout + _RESULT_GRACE)
+        try:
+            return await asyncio.wait_for(wrapped, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._abandon(executor)
+            raise
+
+    def _abandon(self, executor: Executor) -> None:
+        """スレッドで実行中の変換は止められないので、そのスレッドは見捨てて次のジョブは新しいスレッドで実行する"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+        self.abandoned += 1
+        logger.warning("変換がタイムアウトしました（スレッドモードのため変換は終わるまで裏で続きます）")
+
+    async def preload(self) -> int:
+        """ワーカーを起動して変換ライブラリを読み込ませておく（最初の変換を待たせない）。
+
+        ワーカーの数だけ読み込みジョブを投げ、読み込んだワーカーの数を返す（プロセスへの割り振りは保証されない）。
+        """
+        executor = self._get_executor()
+        futures = [asyncio.wrap_future(executor.submit(preload)) for _ in range(self.max_workers or 1)]
+        pids = await asyncio.gather(*futures)
+        self.preloaded_workers = len(set(pids))
+        return self.preloaded_workers
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "process" if self.max_workers else "thread",
+            "max_workers": self.max_workers or 1,
+            "timeout_seconds": self.timeout,
+            "max_bytes": self.max_bytes,
+            "max_pages": self.max_pages,
+            "submitted": self.submitted,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "abandoned": self.abandoned,
+            "waiting": self._slots.waiting,
+            "preloaded_workers": self.preloaded_workers,
+        }
@@ -1,17 +1,40 @@
 """jGrants MCP Server - FastMCP with Streamable HTTP"""
 
 import os
+import asyncio
 import base64
+import contextlib
 import csv
 import io
+import json
+import functools
+import hashlib
+import importlib.util
+import inspect
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Awaitable, Callable, Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone
 import logging
 import httpx
-from fastmcp import FastMCP
-import pdfplumber
-from markitdown import MarkItDown
+from fastmcp import Context, FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .cache import ResponseCache, make_cache_key
+from .catalog import SubsidyCatalog, filter_records
+from .converter import ConversionEngine, ConversionRejected, ConversionTimeout
+from .lanes import ConcurrencyLane, LaneFull
+from .overview import OverviewSnapshot
+from .projection import check_detail_fields, check_profile, parse_fields, shape_detail, shape_search
+from .resilience import CircuitBreaker, CircuitOpenError, RateLimiter, UpstreamGuard
+from .search_index import AttachmentIndex, chunk_text
+from .streaming import AttachmentStreamParser, StreamSink
+from .transport import MonitoredTransport, PoolMonitor
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
@@ -21,48 +44,448 @@ logger = logging.getLogger(__name__)
 API_BASE_URL = "https://api.jgrants-portal.go.jp/exp/v1/public"
 
 # FastMCPサーバーの初期化
-mcp = FastMCP("jgrants-mcp-server")
+# 起動時のウォームアップと終了時の後片付けは lifespan（下で定義）で行う
+mcp = FastMCP("jgrants-mcp-server", lifespan=lambda server: lifespan(server))
+
+
+
+def _env_int(name: str, default: int) -> int:
+    """整数の環境変数を読む（未設定・不正値はデフォルト）"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"環境変数 {name} が不正なためデフォルト値 {default} を使用します")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """数値の環境変数を読む（未設定・不正値はデフォルト）"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"環境変数 {name} が不正なためデフォルト値 {default} を使用します")
+        return default
+
+
+def _env_limits(name: str, default: str) -> Dict[str, int]:
+    """「名前=整数」をカンマ区切りで並べた環境変数を読む（不正な項目は無視する）"""
+    limits: Dict[str, int] = {}
+    for item in os.environ.get(name, default).split(","):
+        key, _, value = item.partition("=")
+        if not item.strip():
+            continue
+        try:
+            limits[key.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"環境変数 {name} の項目 {item.strip()!r} が不正なため無視します")
+    return limits
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """真偽値の環境変数を読む（"0" / "false" / 空文字は False）"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
 
 # ファイル保存ディレクトリ（環境変数で設定可能）
 FILES_DIR = Path(os.environ.get("JGRANTS_FILES_DIR", "tmp"))
 FILES_DIR.mkdir(parents=True, exist_ok=True)
 
+# 検索結果キャッシュ（GET /subsidies）。TTLを0にすると無効。
+# TTL切れから JGRANTS_SEARCH_MAX_STALE 秒までは古い結果をすぐに返し、裏で取り直す（0で無効）
+_SEARCH_CACHE = ResponseCache(
+    ttl=_env_float("JGRANTS_SEARCH_CACHE_TTL", 300.0),
+    max_entries=_env_int("JGRANTS_SEARCH_CACHE_MAX_ENTRIES", 256),
+    max_bytes=_env_int("JGRANTS_SEARCH_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+    stale_ttl=_env_float("JGRANTS_SEARCH_MAX_STALE", 3600.0),
+)
+# search_subsidies の1ページの件数（既定値・上限）
+_SEARCH_PAGE_SIZE = max(1, _env_int("JGRANTS_SEARCH_PAGE_SIZE", 50))
+_SEARCH_MAX_PAGE_SIZE = max(_SEARCH_PAGE_SIZE, _env_int("JGRANTS_SEARCH_MAX_PAGE_SIZE", 500))
+# 2ページ目以降を返すために保存する検索結果（TTL が cursor の有効期間）。
+# 上流の結果が変わってもページ送りの途中で件数や順序がずれないよう、1ページ目を返した時点の結果を使う
+_SEARCH_PAGES = ResponseCache(
+    ttl=_env_float("JGRANTS_SEARCH_CURSOR_TTL", 1800.0),
+    max_entries=_env_int("JGRANTS_SEARCH_CURSOR_MAX_ENTRIES", 256),
+    max_bytes=_env_int("JGRANTS_SEARCH_CURSOR_MAX_BYTES", 32 * 1024 * 1024),
+)
+# get_subsidy_detail(metadata_only=True) 用に取得した詳細（添付ファイルは推定サイズのみ）のキャッシュ。TTLを0にすると無効
+_DETAIL_METADATA_CACHE = ResponseCache(
+    ttl=_env_float("JGRANTS_DETAIL_METADATA_TTL", 600.0),
+    max_entries=_env_int("JGRANTS_DETAIL_METADATA_MAX_ENTRIES", 512),
+)
+# get_subsidy_detail で保存済みの結果を新しいものとしてそのまま返す期間（上流で最後に確認できてからの秒数）。
+# この間は上流に問い合わせない。0で無効
+_DETAIL_FRESH_TTL = _env_float("JGRANTS_DETAIL_FRESH_TTL", 600.0)
+# get_subsidy_detail で上流が遅い・エラーの場合に、保存済みの結果を返してよい古さ（秒）。0で無効
+_DETAIL_MAX_STALE = _env_float("JGRANTS_DETAIL_MAX_STALE", 86400.0)
+# 保存済みの詳細がある場合に上流の応答を待つ時間（秒）。0 なら待たずに保存済みの結果を返し、取得は裏で行う。
+# 正の値にすると、その時間内に取得できれば新しい結果を返す（超えたら保存済みの結果を返し、取得は裏で続ける）
+_STALE_GRACE = _env_float("JGRANTS_STALE_GRACE", 0.0)
+
+# search_subsidies_batch / get_subsidy_details_batch の同時実行数（上流APIへの同時リクエスト数）
+_BATCH_CONCURRENCY = max(1, _env_int("JGRANTS_BATCH_CONCURRENCY", 5))
+# search_subsidies_batch に1回で指定できる検索条件の数
+_BATCH_MAX_QUERIES = _env_int("JGRANTS_BATCH_MAX_QUERIES", 20)
+# get_subsidy_details_batch に1回で指定できる補助金IDの数
+_BATCH_MAX_IDS = _env_int("JGRANTS_BATCH_MAX_IDS", 50)
+# search_subsidies_batch の各検索条件に指定できる項目
+_BATCH_QUERY_KEYS = (
+    "keyword", "use_purpose", "industry", "target_number_of_employees", "target_area_search",
+    "min_amount", "max_amount", "deadline_within_days",
+)
+
+# ツールの実行レーン。軽いツール（検索・統計・メタデータのみの詳細）は fast、
+# 添付ファイルのダウンロード・変換・全文検索の索引作成は slow で実行し、重い処理が混んでも検索を待たせない。
+# 同時実行数を超えた呼び出しは優先度順（同じなら先着順）に待ち、待ちが上限に達しているか待ち時間を超えたらエラーを返す（0で無制限）。
+# JGRANTS_TOOL_CONCURRENCY（例: "get_file_content=3,search_attachments=2"）で各レーンの中でのツールごとの同時実行数も制限する
+_TOOL_CONCURRENCY = _env_limits("JGRANTS_TOOL_CONCURRENCY", "get_file_content=3,search_attachments=2")
+_FAST_LANE = ConcurrencyLane(
+    "fast",
+    limit=_env_int("JGRANTS_FAST_LANE_CONCURRENCY", 32),
+    max_queue=_env_int("JGRANTS_FAST_LANE_QUEUE", 256),
+    queue_timeout=_env_float("JGRANTS_FAST_LANE_QUEUE_TIMEOUT", 30.0),
+    tool_limits=_TOOL_CONCURRENCY,
+)
+_SLOW_LANE = ConcurrencyLane(
+    "slow",
+    limit=_env_int("JGRANTS_SLOW_LANE_CONCURRENCY", 4),
+    max_queue=_env_int("JGRANTS_SLOW_LANE_QUEUE", 32),
+    queue_timeout=_env_float("JGRANTS_SLOW_LANE_QUEUE_TIMEOUT", 120.0),
+    tool_limits=_TOOL_CONCURRENCY,
+)
+# レーンの待ちの優先度（小さいほど先に実行する）。利用者が結果を待っている1件の処理を、
+# 複数件をまとめた処理や、Web UI の詳細の先読み・保存済みの詳細の取り直しより先に実行する
+_PRIORITY_INTERACTIVE = 0
+_PRIORITY_BULK = 1
+_PRIORITY_BACKGROUND = 2
+
+
+def _in_lane(select_lane, priority: int = _PRIORITY_INTERACTIVE):
+    """ツールを select_lane(引数の辞書) が返すレーンで実行する（混雑で断った場合は {error: ...} を返す）。
+
+    レーンは呼び出し時に選ぶ（get_subsidy_detail の metadata_only のように引数で重さが変わるツールがあるため）。
+    ツールごとの同時実行数（JGRANTS_TOOL_CONCURRENCY）は関数名で数え、待ちは priority の順に実行する。
+    ツールの中から別のツールを呼ぶと枠を二重に取るので、ツール同士は内部関数で共有すること。
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            try:
+                async with select_lane(bound.arguments).slot(fn.__name__, priority):
+                    return await fn(*args, **kwargs)
+            except LaneFull as e:
+                return {"error": str(e)}
+
+        return wrapper
+
+    return decorate
+
+
+# 補助金一覧のローカルミラー（search_subsidies の source="local" / "auto" で使用）
+_CATALOG_NAME = ".catalog.sqlite3"
+_CATALOG: Optional[SubsidyCatalog] = None
+# カタログ・全文検索インデックスを開く処理の排他
+_STORE_OPEN_LOCK = threading.Lock()
+# 同期の間隔（秒）。これより古いカタログで検索すると裏で同期し直す。0で自動同期しない
+_CATALOG_SYNC_INTERVAL = _env_float("JGRANTS_CATALOG_SYNC_INTERVAL", 3600.0)
+# 同期時に GET /subsidies へ渡すキーワード（カンマ区切り）と受付期間フィルタ
+_CATALOG_SYNC_KEYWORDS = [
+    k.strip() for k in os.environ.get("JGRANTS_CATALOG_SYNC_KEYWORDS", "事業").split(",") if k.strip()
+]
+_CATALOG_SYNC_ACCEPTANCE = _env_int("JGRANTS_CATALOG_SYNC_ACCEPTANCE", 1)
+# カタログ同期・集計対象の一覧の取り直しで、同時の要求を1回にまとめる（キャッシュはしない）
+_CATALOG_SYNC_FLIGHT = ResponseCache(ttl=0)
+# get_subsidy_overview の集計スナップショットと、集計対象の一覧（デフォルト検索）の条件
+_OVERVIEW = OverviewSnapshot()
+_OVERVIEW_REFRESH_INTERVAL = _env_float("JGRANTS_OVERVIEW_REFRESH_INTERVAL", 300.0)
+_OVERVIEW_LISTING = {"keyword": "事業", "sort": "acceptance_end_datetime", "order": "ASC", "acceptance": "1"}
+# 裏で実行中のタスク（GCで消えないよう参照を保持）
+_BACKGROUND_TASKS: set = set()
+
+# 上流APIへの送信の流量制御（トークンバケット）・再試行・サーキットブレーカー（全ツール共通）
+_UPSTREAM = UpstreamGuard(
+    RateLimiter(
+        rate=_env_float("JGRANTS_RATE_LIMIT", 5.0),
+        burst=_env_int("JGRANTS_RATE_BURST", 10),
+    ),
+    CircuitBreaker(
+        failure_threshold=_env_int("JGRANTS_CIRCUIT_FAILURE_THRESHOLD", 5),
+        reset_timeout=_env_float("JGRANTS_CIRCUIT_RESET_TIMEOUT", 30.0),
+    ),
+    max_retries=_env_int("JGRANTS_MAX_RETRIES", 3),
+    backoff_base=_env_float("JGRANTS_RETRY_BACKOFF_BASE", 0.5),
+    backoff_max=_env_float("JGRANTS_RETRY_BACKOFF_MAX", 30.0),
+    retry_after_max=_env_float("JGRANTS_RETRY_AFTER_MAX", 60.0),
+)
+
+# 前回のレスポンスの ETag / Last-Modified で条件付きGETを送り、304 なら前回の結果を使う
+_CONDITIONAL_REQUESTS = _env_flag("JGRANTS_CONDITIONAL_REQUESTS", True)
+# GET /subsidies など（_get_json）の検証子と前回のレスポンス（URL・クエリごと、LRU）。
+# 詳細APIの検証子は補助金ごとのマニフェストに保存する
+_VALIDATORS = ResponseCache(
+    ttl=float("inf"),
+    max_entries=_env_int("JGRANTS_VALIDATOR_CACHE_MAX_ENTRIES", 512),
+    max_bytes=_env_int("JGRANTS_VALIDATOR_CACHE_MAX_BYTES", 32 * 1024 * 1024),
+)
+# HTTP/2 で接続を多重化する（h2 パッケージが必要。未インストールなら HTTP/1.1）
+_HTTP2 = _env_flag("JGRANTS_HTTP2", False)
+# Accept-Encoding（"auto" は httpx の既定 = インストール済みのデコーダすべて。"identity" で圧縮なし）
+_ACCEPT_ENCODING = os.environ.get("JGRANTS_ACCEPT_ENCODING", "auto")
+# 上流との通信量の統計（get_server_stats）
+_HTTP_STATS = {"responses": 0, "not_modified": 0, "bytes_downloaded": 0}
+# 上流APIへの接続プールとタイムアウト（秒）。CLI の --http-* でも指定できる
+_HTTP_MAX_CONNECTIONS = max(1, _env_int("JGRANTS_HTTP_MAX_CONNECTIONS", 20))
+_HTTP_MAX_KEEPALIVE = max(0, _env_int("JGRANTS_HTTP_MAX_KEEPALIVE", 10))
+_HTTP_KEEPALIVE_EXPIRY = _env_float("JGRANTS_HTTP_KEEPALIVE_EXPIRY", 5.0)
+_HTTP_CONNECT_TIMEOUT = _env_float("JGRANTS_HTTP_CONNECT_TIMEOUT", 10.0)
+_HTTP_READ_TIMEOUT = _env_float("JGRANTS_HTTP_READ_TIMEOUT", 30.0)
+_HTTP_WRITE_TIMEOUT = _env_float("JGRANTS_HTTP_WRITE_TIMEOUT", 10.0)
+# 接続プールが埋まっているときに空きを待つ時間
+_HTTP_POOL_TIMEOUT = _env_float("JGRANTS_HTTP_POOL_TIMEOUT", 5.0)
+# 名前解決の結果を再利用する時間。0でキャッシュしない
+_DNS_CACHE_TTL = _env_float("JGRANTS_DNS_CACHE_TTL", 0.0)
+# 接続プールの使用状況（使用中・空き待ち・確保までの待ち時間）
+_POOL_MONITOR = PoolMonitor()
+
 _HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+_HTTP_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_HTTP_TRANSPORT: Optional[MonitoredTransport] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 を使うか（有効でも h2 が未インストールなら使わない）"""
+    if not _HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("h2 パッケージがないため HTTP/1.1 で接続します（pip install 'httpx[http2]'）")
+        return False
+    return True
+
+
+def _accept_encoding_header() -> Optional[str]:
+    """JGRANTS_ACCEPT_ENCODING を Accept-Encoding ヘッダーの値にする（"auto" なら None = httpx の既定）。
+
+    デコーダがインストールされていない方式（br: brotli, zstd: zstandard）は除く。
+    """
+    value = _ACCEPT_ENCODING.strip().lower()
+    if value in ("", "auto"):
+        return None
+    decoders = {"br": ("brotli", "brotlicffi"), "zstd": ("zstandard",)}
+    encodings = []
+    for encoding in (e.strip() for e in value.split(",")):
+        if encoding in ("gzip", "deflate", "identity"):
+            encodings.append(encoding)
+        elif encoding in decoders and any(importlib.util.find_spec(m) for m in decoders[encoding]):
+            encodings.append(encoding)
+        elif encoding:
+            logger.warning(f"Accept-Encoding から {encoding} を除きます（未対応またはデコーダ未インストール）")
+    return ", ".join(encodings) or "identity"
 
 
 def _get_http_client() -> httpx.AsyncClient:
-    """モジュール内で共有するHTTPクライアント（Keep-Alive、接続プール再利用）。"""
-    global _HTTP_CLIENT
-    if _HTTP_CLIENT is None:
-        timeout = httpx.Timeout(connect=10.0, read=30.0, write=10.0, pool=5.0)
-        limits = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    """モジュール内で共有するHTTPクライアント（Keep-Alive、接続プール再利用）。
+
+    プール内の接続は作成時のイベントループに紐づくため、別のループから
+    呼ばれた場合（asyncio.run() の多用など）はクライアントを作り直す。
+    """
+    global _HTTP_CLIENT, _HTTP_CLIENT_LOOP, _HTTP_TRANSPORT
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _HTTP_CLIENT is None or (loop is not None and _HTTP_CLIENT_LOOP is not loop):
+        timeout = httpx.Timeout(
+            connect=_HTTP_CONNECT_TIMEOUT,
+            read=_HTTP_READ_TIMEOUT,
+            write=_HTTP_WRITE_TIMEOUT,
+            pool=_HTTP_POOL_TIMEOUT,
+        )
+        limits = httpx.Limits(
+            max_connections=_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=_HTTP_KEEPALIVE_EXPIRY,
+        )
+        headers = {
+            "User-Agent": "jgrants-mcp-server/0.1 (+https://github.com/yourusername/jgrants-mcp-server)"
+        }
+        accept_encoding = _accept_encoding_header()
+        if accept_encoding is not None:
+            headers["Accept-Encoding"] = accept_encoding
+        _HTTP_TRANSPORT = MonitoredTransport(
+            _POOL_MONITOR,
+            dns_cache_ttl=_DNS_CACHE_TTL,
+            limits=limits,
+            http2=_http2_available(),
+        )
         _HTTP_CLIENT = httpx.AsyncClient(
             timeout=timeout,
-            limits=limits,
+            transport=_HTTP_TRANSPORT,
             follow_redirects=True,
-            headers={
-                "User-Agent": "jgrants-mcp-server/0.1 (+https://github.com/yourusername/jgrants-mcp-server)"
-            },
+            headers=headers,
         )
+        _HTTP_CLIENT_LOOP = loop
     return _HTTP_CLIENT
 
 
-async def _get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """共通のHTTP GET(JSON) クライアント。エラーは {error: ...} を返す。"""
-    try:
-        client = _get_http_client()
-        resp = await client.get(url, params=params)
-        resp.raise_for_status()
-        return resp.json()
-    except httpx.ReadTimeout as e:
+def _http_error(e: Exception) -> Dict[str, Any]:
+    """HTTPクライアントの例外を {error: ...} 形式に変換する"""
+    if isinstance(e, CircuitOpenError):
+        return {"error": f"{str(e)}（しばらくしてから再試行してください）"}
+    if isinstance(e, httpx.PoolTimeout):
+        return {
+            "error": f"上流APIへの同時リクエストが多すぎるため、{_HTTP_POOL_TIMEOUT:g}秒以内に接続を確保できませんでした"
+            f"（接続数の上限 {_HTTP_MAX_CONNECTIONS}。JGRANTS_HTTP_MAX_CONNECTIONS / JGRANTS_HTTP_POOL_TIMEOUT で調整できます）"
+        }
+    if isinstance(e, httpx.ReadTimeout):
         return {"error": f"リクエストがタイムアウトしました: {str(e)}"}
-    except httpx.ConnectError as e:
+    if isinstance(e, httpx.ConnectError):
         return {"error": f"APIサーバーへの接続に失敗しました: {str(e)}"}
-    except httpx.HTTPStatusError as e:
+    if isinstance(e, httpx.HTTPStatusError):
         status = e.response.status_code if e.response is not None else 0
         return {"error": f"HTTPエラー: {status}"}
+    return {"error": f"エラーが発生しました: {str(e)}"}
+
+
+def _conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """保存した検証子から条件付きGETのヘッダーを作る"""
+    headers = {}
+    if _CONDITIONAL_REQUESTS and validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(resp: httpx.Response) -> Dict[str, str]:
+    """レスポンスの ETag / Last-Modified（なければ空）"""
+    validators = {}
+    if resp.headers.get("etag"):
+        validators["etag"] = resp.headers["etag"]
+    if resp.headers.get("last-modified"):
+        validators["last_modified"] = resp.headers["last-modified"]
+    return validators
+
+
+def _count_response(resp: httpx.Response) -> None:
+    _HTTP_STATS["responses"] += 1
+    _HTTP_STATS["bytes_downloaded"] += resp.num_bytes_downloaded
+    if resp.status_code == 304:
+        _HTTP_STATS["not_modified"] += 1
+
+
+async def _get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """共通のHTTP GET(JSON) クライアント。エラーは {error: ...} を返す。
+
+    前回のレスポンスに ETag / Last-Modified があれば条件付きGETを送り、304 なら前回の結果を返す。
+    """
+    key = make_cache_key({"url": url, **(params or {})})
+    stored = _VALIDATORS.get(key) if _CONDITIONAL_REQUESTS else None
+    headers = _conditional_headers(stored["validators"] if stored else None)
+    try:
+        client = _get_http_client()
+        resp = await _UPSTREAM.send(lambda: client.get(url, params=params, headers=headers))
+        _count_response(resp)
+        if resp.status_code == 304 and stored is not None:
+            return stored["body"]
+        resp.raise_for_status()
+        body = resp.json()
     except Exception as e:
-        return {"error": f"エラーが発生しました: {str(e)}"}
+        return _http_error(e)
+    validators = _response_validators(resp)
+    if _CONDITIONAL_REQUESTS and validators:
+        _VALIDATORS.set(key, {"validators": validators, "body": body}, size=len(resp.content))
+    return body
+
+
+@contextlib.asynccontextmanager
+async def _stream_get(url: str, headers: Optional[Dict[str, str]] = None):
+    """GET のレスポンスをボディを読まずに返す（流量制御・再試行つき。抜けるときに接続を返す）"""
+    client = _get_http_client()
+    resp = await _UPSTREAM.send(lambda: client.send(client.build_request("GET", url, headers=headers), stream=True))
+    try:
+        yield resp
+    finally:
+        await resp.aclose()
+        _count_response(resp)
+
+
+# 条件付きGETで上流のデータが変わっていなかった（304）ことを表す _get_detail_json の戻り値
+_NOT_MODIFIED: Dict[str, Any] = {"not_modified": True}
+
+
+async def _get_detail_json(
+    url: str, subsidy_dir: Path, spools: list, validators: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """補助金詳細APIを取得する。エラーは {error: ...} を返す。
+
+    レスポンスが JGRANTS_STREAM_DETAIL_MIN_BYTES 以上（またはサイズ不明）の場合は逐次パースし、
+    添付ファイルの data をメモリに溜めずに保存先ディレクトリの一時ファイルへ直接デコードする。
+    その場合 data は _StreamedAttachment に置き換わり、作成した一時ファイルは spools に追加される。
+
+    validators（前回の ETag / Last-Modified）があれば条件付きGETを送り、304 なら _NOT_MODIFIED を返す。
+    取得できた場合、validators はレスポンスの検証子に置き換わる。
+    """
+    parser = None
+    try:
+        async with _stream_get(url, _conditional_headers(validators)) as resp:
+            if resp.status_code == 304 and validators:
+                return _NOT_MODIFIED
+            resp.raise_for_status()
+            if validators is not None:
+                validators.clear()
+                validators.update(_response_validators(resp))
+            length = resp.headers.get("content-length")
+            # 圧縮されている場合の Content-Length は展開後のサイズではないので逐次パースする
+            compressed = resp.headers.get("content-encoding", "identity").lower() != "identity"
+            if length is not None and length.isdigit() and int(length) < _STREAM_DETAIL_MIN_BYTES and not compressed:
+                await resp.aread()
+                return resp.json()
+
+            def open_spool(file_type: str, index: int) -> _AttachmentSpool:
+                spool = _AttachmentSpool(subsidy_dir)
+                spools.append(spool)
+                return spool
+
+            # デコード・ハッシュ計算・ディスクへの書き込みはイベントループの外で行う（チャンクは順に1つずつ渡す）
+            loop = asyncio.get_running_loop()
+            parser = AttachmentStreamParser(open_spool)
+            async for chunk in resp.aiter_bytes():
+                await loop.run_in_executor(_FILE_EXECUTOR, parser.feed, chunk)
+            return await loop.run_in_executor(_FILE_EXECUTOR, parser.close)
+    except Exception as e:
+        if parser is not None:
+            parser.abort()
+        return _http_error(e)
+
+
+async def _get_detail_metadata_json(url: str) -> Dict[str, Any]:
+    """補助金詳細APIを添付ファイルのデータを読み捨てながら取得する。エラーは {error: ...} を返す。
+
+    添付ファイルの data はデコードもディスクへの書き込みもせず、BASE64の長さから見積もった
+    サイズを持つ _EstimatedAttachment に置き換わる。
+    """
+    parser = None
+    try:
+        async with _stream_get(url) as resp:
+            resp.raise_for_status()
+            # BASE64の読み飛ばしも大きな添付ファイルでは時間がかかるので、イベントループの外で行う
+            loop = asyncio.get_running_loop()
+            parser = AttachmentStreamParser(lambda file_type, index: _SizeSink())
+            async for chunk in resp.aiter_bytes():
+                await loop.run_in_executor(_FILE_EXECUTOR, parser.feed, chunk)
+            return await loop.run_in_executor(_FILE_EXECUTOR, parser.close)
+    except Exception as e:
+        if parser is not None:
+            parser.abort()
+        return _http_error(e)
 
 
 # 内部関数（ツール間で共有）
@@ -95,24 +518,190 @@ async def _search_subsidies_internal(
         params["target_area_search"] = target_area_search
     
     url = f"{API_BASE_URL}/subsidies"
-    
-    
-    data = await _get_json(url, params=params)
+
+    async def fetch() -> Dict[str, Any]:
+        fetched = await _get_json(url, params=params)
+        if isinstance(fetched.get("result"), list):
+            # 上流から取得した一覧はローカルカタログ・集計スナップショットにも取り込む
+            # （カタログへの書き込みは検索の応答を待たせないよう裏で行う）
+            _run_in_background(_ingest_catalog(fetched["result"]))
+            _on_listing_fetched(params, fetched["result"])
+        return fetched
+
+    # 同じ検索条件はキャッシュから返し、同時の同一検索は1回の上流リクエストにまとめる。
+    # TTL切れの結果も許容範囲内なら待たずに返し、裏で取り直す
+    data, stale_age = await _SEARCH_CACHE.get_or_fetch_stale(
+        make_cache_key({"url": url, **params}),
+        fetch,
+        cacheable=lambda d: "error" not in d,
+    )
     if "error" in data:
         return data
 
     # レスポンスを整形
     if "result" in data:
-        return {
+        result = {
             "total_count": len(data["result"]),
             "subsidies": data["result"],
             "search_conditions": {k: v for k, v in params.items() if k not in ["limit"]},
         }
-    return {"subsidies": [], "total_count": 0}
+    else:
+        result = {"subsidies": [], "total_count": 0}
+    if stale_age is not None:
+        result["stale"] = True
+        result["age_seconds"] = round(stale_age, 1)
+    return result
+
+
+def _get_catalog() -> SubsidyCatalog:
+    """共有カタログ（FILES_DIR が変わった場合は開き直す）"""
+    global _CATALOG
+    db_path = FILES_DIR / _CATALOG_NAME
+    # 複数のスレッドから同時に呼ばれても開くのは1回だけ（同じDBを同時に初期化しない）
+    with _STORE_OPEN_LOCK:
+        if _CATALOG is None or _CATALOG.db_path != db_path:
+            if _CATALOG is not None:
+                _CATALOG.close()
+            _CATALOG = SubsidyCatalog(db_path)
+        return _CATALOG
+
+
+async def _ingest_catalog(records: list) -> None:
+    """一覧APIの結果をカタログに取り込む（失敗しても検索には影響させない）"""
+    loop = asyncio.get_running_loop()
+    try:
+        catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+        await loop.run_in_executor(_FILE_EXECUTOR, catalog.upsert_listings, records)
+    except Exception as e:
+        logger.warning(f"カタログへの取り込みに失敗しました: {e}")
+
+
+async def _ingest_catalog_detail(subsidy: Dict[str, Any]) -> None:
+    """詳細APIの結果（業種・利用目的・更新日時など）をカタログに取り込む"""
+    loop = asyncio.get_running_loop()
+    try:
+        catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+        await loop.run_in_executor(_FILE_EXECUTOR, catalog.upsert_detail, subsidy)
+    except Exception as e:
+        logger.warning(f"カタログへの取り込みに失敗しました: {e}")
+
+
+async def _sync_catalog() -> Dict[str, Any]:
+    """カタログを上流APIと同期する（同時の同期要求は1回にまとめる）"""
+    return await _CATALOG_SYNC_FLIGHT.get_or_fetch("sync", _run_catalog_sync)
+
+
+async def _run_catalog_sync() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+    started = time.monotonic()
+    url = f"{API_BASE_URL}/subsidies"
+    records: Dict[str, Dict[str, Any]] = {}
+    for keyword in _CATALOG_SYNC_KEYWORDS:
+        params = {
+            "keyword": keyword,
+            "sort": "acceptance_end_datetime",
+            "order": "ASC",
+            "acceptance": str(_CATALOG_SYNC_ACCEPTANCE),
+        }
+        data = await _get_json(url, params=params)
+        if "error" in data:
+            result = {"error": f"カタログの同期に失敗しました: {data['error']}"}
+            await loop.run_in_executor(_FILE_EXECUTOR, catalog.set_meta, "last_sync_result", result)
+            return result
+        for record in data.get("result", []):
+            if record.get("id"):
+                records[record["id"]] = record
+        _on_listing_fetched(params, data.get("result", []))
+
+    counts = await loop.run_in_executor(_FILE_EXECUTOR, catalog.upsert_listings, list(records.values()))
+    result = {
+        "fetched": len(records),
+        **counts,
+        "keywords": _CATALOG_SYNC_KEYWORDS,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
+    await loop.run_in_executor(_FILE_EXECUTOR, catalog.set_meta, "last_sync_at", datetime.now(timezone.utc).isoformat())
+    await loop.run_in_executor(_FILE_EXECUTOR, catalog.set_meta, "last_sync_result", result)
+    logger.info(f"カタログを同期しました: {result}")
+    return result
+
+
+def _on_listing_fetched(params: Dict[str, Any], records: list) -> None:
+    """上流から一覧を取得したとき、集計対象と同じ条件なら集計スナップショットに差分を反映する"""
+    if all(params.get(k) == v for k, v in _OVERVIEW_LISTING.items()):
+        changes = _OVERVIEW.apply(records)
+        logger.info(f"集計スナップショットを更新しました: {changes} 件の変更")
+
+
+async def _refresh_overview() -> Optional[Dict[str, Any]]:
+    """集計対象の一覧を取り直す（同時の要求は1回にまとめる）。失敗時はエラーを返す"""
+    async def refresh() -> Dict[str, Any]:
+        before = _OVERVIEW.updated_at
+        result = await _search_subsidies_internal(
+            keyword=_OVERVIEW_LISTING["keyword"],
+            sort=_OVERVIEW_LISTING["sort"],
+            order=_OVERVIEW_LISTING["order"],
+            acceptance=int(_OVERVIEW_LISTING["acceptance"]),
+        )
+        if "error" not in result and _OVERVIEW.updated_at == before:
+            # 検索結果キャッシュから返された場合も取り込む（変化がなければ差し替えはない）
+            _OVERVIEW.apply(result.get("subsidies", []))
+        return result
+
+    result = await _CATALOG_SYNC_FLIGHT.get_or_fetch("overview", refresh)
+    return result if "error" in result else None
+
+
+def _run_in_background(coro) -> asyncio.Task:
+    """応答を待たせずに実行する（例外はログに記録）"""
+    task = asyncio.get_running_loop().create_task(coro)
+    _BACKGROUND_TASKS.add(task)
+
+    def done(t: asyncio.Task) -> None:
+        _BACKGROUND_TASKS.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.error(f"バックグラウンド処理でエラーが発生しました: {t.exception()}")
+
+    task.add_done_callback(done)
+    return task
+
+
+async def _ensure_catalog() -> Optional[Dict[str, Any]]:
+    """未同期なら同期を待ち、古くなっていれば裏で同期し直す。使えるカタログがない場合はエラーを返す"""
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+    age = await loop.run_in_executor(_FILE_EXECUTOR, catalog.last_sync_age)
+    if age is None:
+        result = await _sync_catalog()
+        if "error" in result and await loop.run_in_executor(_FILE_EXECUTOR, catalog.count) == 0:
+            return result
+    elif _CATALOG_SYNC_INTERVAL > 0 and age > _CATALOG_SYNC_INTERVAL:
+        _run_in_background(_sync_catalog())
+    return None
+
+
+async def _search_catalog(conditions: Dict[str, Any]) -> Dict[str, Any]:
+    """ローカルカタログで検索する（_search_subsidies_internal と同じ形式で返す）"""
+    error = await _ensure_catalog()
+    if error is not None:
+        return error
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+    subsidies = await loop.run_in_executor(_FILE_EXECUTOR, lambda: catalog.search(**conditions))
+    stats = await loop.run_in_executor(_FILE_EXECUTOR, catalog.stats)
+    return {
+        "total_count": len(subsidies),
+        "subsidies": subsidies,
+        "search_conditions": {k: v for k, v in conditions.items() if v is not None},
+        "source": "local",
+        "catalog_synced_at": stats["last_sync_at"],
+    }
 
 
 # ツール定義: search_subsidies
 @mcp.tool()
+@_in_lane(lambda args: _FAST_LANE)
 async def search_subsidies(
     keyword: str,
     use_purpose: Optional[str] = None,
@@ -121,7 +710,16 @@ async def search_subsidies(
     target_area_search: Optional[str] = None,
     sort: str = "acceptance_end_datetime",
     order: str = "ASC",
-    acceptance: int = 1
+    acceptance: int = 1,
+    source: str = "api",
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    deadline_within_days: Optional[int] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    profile: str = "full",
+    ctx: Optional[Context] = None
 ) -> Dict[str, Any]:
     """
     高度な検索条件で補助金を検索します。
@@ -157,10 +755,36 @@ async def search_subsidies(
     - target_area_search: 補助対象地域
         "全国" "北海道地方" "東北地方" "関東・甲信越地方" "東海・北陸地方" "近畿地方" "中国地方" "四国地方" "九州・沖縄地方" "北海道" "青森県" "岩手県" "宮城県" "秋田県" "山形県" "福島県" "茨城県" "栃木県" "群馬県" "埼玉県" "千葉県" "東京都" "神奈川県" "新潟県" "富山県" "石川県" "福井県" "山梨県" "長野県" "岐阜県" "静岡県" "愛知県" "三重県" "滋賀県" "京都府" "大阪府" "兵庫県" "奈良県" "和歌山県" "鳥取県" "島根県" "岡山県" "広島県" "山口県" "徳島県" "香川県" "愛媛県" "高知県" "福岡県" "佐賀県" "長崎県" "熊本県" "大分県" "宮崎県" "鹿児島県" "沖縄県"
 
+    本ツール独自のパラメータ
+    - source: 検索先
+        "api"（デフォルト）: 上流APIで検索
+        "local": ローカルに同期した補助金カタログで検索（ミリ秒で応答。未同期の場合は初回に同期）
+        "auto": 上流APIで検索し、エラー（タイムアウト・レート制限など）の場合はローカルカタログで検索
+    - min_amount / max_amount: 補助上限額（subsidy_max_limit、円）の範囲
+    - deadline_within_days: 今日から指定日数以内に受付が終了するものに限定
+    - page_size: 1ページの件数（既定 JGRANTS_SEARCH_PAGE_SIZE=50、上限 JGRANTS_SEARCH_MAX_PAGE_SIZE）
+    - cursor: 前回の next_cursor。指定すると検索条件は無視し、1ページ目を返した時点の検索結果の続きを返す
+      （有効期間は JGRANTS_SEARCH_CURSOR_TTL 秒）
+    - fields: 各補助金で返す項目（カンマ区切り）。例: "id,title,acceptance_end_datetime,subsidy_max_limit"
+      （id は常に含める。指定すると profile より優先）
+    - profile: "full"（デフォルト、上流の全項目）または "compact"（id, title, acceptance_end_datetime, subsidy_max_limit のみ）。
+      候補を絞り込む段階では compact を使うと応答が数分の1になります
+
+    ローカルカタログでの検索について
+    - keyword はタイトル等に含まれるか（全角・半角、大文字・小文字を区別しない）で判定します
+    - industry / use_purpose は get_subsidy_detail で詳細を取得済みの補助金のみ判定でき、未取得の補助金は除外しません
+
     レスポンス（API resultのラップ）
-    - subsidies: APIの result 配列をそのまま返却
-    - total_count: 件数
+    - subsidies: APIの result 配列のうち、このページの分（page_size 件まで）
+    - total_count: 全ページの件数
+    - page: {"offset": このページの先頭位置, "page_size": int, "returned": このページの件数}
+    - next_cursor: 続きがある場合に cursor に指定する値（最後のページでは null）
     - search_conditions: 最終的にAPIへ渡した検索条件
+    - source: 実際の検索先（"api" または "local"）
+    - stale / age_seconds: キャッシュの有効期間を過ぎた結果を返した場合のみ（true と取得からの経過秒数）。
+      上流が遅い・止まっていても待たずに返し、裏で取り直す（許容する古さは JGRANTS_SEARCH_MAX_STALE）
+
+    進捗通知（MCP の progress）で、検索を始めたときと結果を受け取ったとき（件数）を送ります。
 
     注意
     - 本ツールはAPI仕様に準拠します。詳細は上記の公式ドキュメントを参照してください。
@@ -178,6 +802,81 @@ async def search_subsidies(
     - use_purpose, industry, target_number_of_employees, target_area_search, sort, order
     
     """
+    if page_size is None:
+        page_size = _SEARCH_PAGE_SIZE
+    if not isinstance(page_size, int) or not 1 <= page_size <= _SEARCH_MAX_PAGE_SIZE:
+        return {"error": f"page_size は1〜{_SEARCH_MAX_PAGE_SIZE}で指定してください"}
+    try:
+        field_names = parse_fields(fields)
+        check_profile(profile)
+    except ValueError as e:
+        return {"error": str(e)}
+    if cursor:
+        page = _next_search_page(cursor, page_size)
+        return page if "error" in page else shape_search(page, field_names, profile)
+
+    if ctx is not None:
+        await ctx.report_progress(0, 1, message=f"{'ローカルカタログ' if source == 'local' else '上流API'}で検索しています")
+    result = await _search_subsidies(
+        keyword, use_purpose, industry, target_number_of_employees, target_area_search,
+        sort, order, acceptance, source, min_amount, max_amount, deadline_within_days,
+    )
+    if ctx is not None:
+        status = f"エラー: {result['error']}" if "error" in result else f"{result.get('total_count', 0)}件"
+        await ctx.report_progress(1, 1, message=status)
+    if "error" in result:
+        return result
+    return shape_search(_search_page(result, page_size), field_names, profile)
+
+
+def _search_page(result: Dict[str, Any], page_size: int, offset: int = 0, token: Optional[str] = None) -> Dict[str, Any]:
+    """検索結果の offset から page_size 件を返す。
+
+    続きがあれば検索結果を保存し（token がなければ新しく発行する）、続きを指す next_cursor を付ける。
+    """
+    subsidies = result.get("subsidies", [])
+    end = offset + page_size
+    next_cursor = None
+    if end < len(subsidies):
+        if token is None:
+            token = uuid.uuid4().hex
+            _SEARCH_PAGES.set(token, result)
+        next_cursor = f"{token}:{end}"
+    page = subsidies[offset:end]
+    return {
+        **result,
+        "subsidies": page,
+        "page": {"offset": offset, "page_size": page_size, "returned": len(page)},
+        "next_cursor": next_cursor,
+    }
+
+
+def _next_search_page(cursor: str, page_size: int) -> Dict[str, Any]:
+    """cursor（"<token>:<offset>"）が指す保存済みの検索結果の続きを返す"""
+    token, _, offset = str(cursor).strip().partition(":")
+    if not token or not offset.isdigit():
+        return {"error": "cursor が不正です。前回の next_cursor をそのまま指定してください"}
+    result = _SEARCH_PAGES.get(token)
+    if result is None:
+        return {"error": "cursor の有効期限が切れています。検索し直してください"}
+    return _search_page(result, page_size, int(offset), token)
+
+
+async def _search_subsidies(
+    keyword: str,
+    use_purpose: Optional[str] = None,
+    industry: Optional[str] = None,
+    target_number_of_employees: Optional[str] = None,
+    target_area_search: Optional[str] = None,
+    sort: str = "acceptance_end_datetime",
+    order: str = "ASC",
+    acceptance: int = 1,
+    source: str = "api",
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    deadline_within_days: Optional[int] = None
+) -> Dict[str, Any]:
+    """search_subsidies / search_subsidies_batch の共通処理（検証・検索先の選択・金額と締切の絞り込み）"""
     # 必須パラメータのバリデーション（API仕様準拠）
     if not isinstance(keyword, str) or not keyword.strip() or not (2 <= len(keyword.strip()) <= 255):
         return {"error": "keyword は2〜255文字の非空文字列で指定してください"}
@@ -188,17 +887,176 @@ async def search_subsidies(
         return {"error": "sort は created_date / acceptance_start_datetime / acceptance_end_datetime から選択してください"}
     if str(order).upper() not in {"ASC", "DESC"}:
         return {"error": "order は ASC または DESC を指定してください"}
+    if source not in {"api", "local", "auto"}:
+        return {"error": "source は api / local / auto から選択してください"}
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        return {"error": "min_amount は max_amount 以下を指定してください"}
+    if deadline_within_days is not None and deadline_within_days < 0:
+        return {"error": "deadline_within_days は0以上を指定してください"}
+
+    conditions = {
+        "keyword": keyword.strip(),
+        "use_purpose": use_purpose,
+        "industry": industry,
+        "target_number_of_employees": target_number_of_employees,
+        "target_area_search": target_area_search,
+        "sort": sort,
+        "order": str(order).upper(),
+        "acceptance": acceptance,
+    }
+    local_filters = {
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "deadline_within_days": deadline_within_days,
+    }
 
-    return await _search_subsidies_internal(
-        keyword=keyword,
-        use_purpose=use_purpose,
-        industry=industry,
-        target_number_of_employees=target_number_of_employees,
-        target_area_search=target_area_search,
-        sort=sort,
-        order=str(order).upper(),
-        acceptance=acceptance
-    )
+    if source == "local":
+        return await _search_catalog({**conditions, **local_filters})
+
+    result = await _search_subsidies_internal(keyword=keyword, **{k: v for k, v in conditions.items() if k != "keyword"})
+    if "error" in result:
+        if source == "auto":
+            logger.warning(f"上流APIでの検索に失敗したためローカルカタログで検索します: {result['error']}")
+            fallback = await _search_catalog({**conditions, **local_filters})
+            if "error" not in fallback:
+                return {**fallback, "fallback_reason": result["error"]}
+        return result
+
+    if any(v is not None for v in local_filters.values()):
+        subsidies = filter_records(result.get("subsidies", []), **local_filters)
+        result = {
+            **result,
+            "subsidies": subsidies,
+            "total_count": len(subsidies),
+            "search_conditions": {
+                **result.get("search_conditions", {}),
+                **{k: v for k, v in local_filters.items() if v is not None}
+            },
+        }
+    return {**result, "source": "api"}
+
+
+@mcp.tool()
+@_in_lane(lambda args: _FAST_LANE, priority=_PRIORITY_BULK)
+async def search_subsidies_batch(
+    queries: List[Dict[str, Any]],
+    sort: str = "acceptance_end_datetime",
+    order: str = "ASC",
+    acceptance: int = 1,
+    source: str = "api",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    複数の検索条件で補助金をまとめて検索し、結果を1つに統合します。
+
+    上流APIはキーワードを1つしか受け付けないため、「IT導入」「DX」「デジタル化」のように
+    複数の語で探す場合に使います。各検索は並行して実行し（同時実行数は JGRANTS_BATCH_CONCURRENCY）、
+    結果は補助金IDで重複を除いて、どの検索条件に一致したかを matched_queries に記録します。
+    検索が1件終わるごとに進捗通知（MCP の progress）で「何件目・どの検索条件が完了したか」を送ります。
+
+    Args:
+        queries: 検索条件のリスト（最大 JGRANTS_BATCH_MAX_QUERIES 件）。各要素は search_subsidies と同じ
+            keyword（必須）, use_purpose, industry, target_number_of_employees, target_area_search,
+            min_amount, max_amount, deadline_within_days を持つ辞書
+            例: [{"keyword": "IT導入"}, {"keyword": "DX", "target_area_search": "東京都"}]
+        sort: 統合後の並び順フィールド（created_date / acceptance_start_datetime / acceptance_end_datetime）
+        order: ソート順（ASC / DESC）
+        acceptance: 受付期間フィルタ（0 または 1）
+        source: 検索先（"api" / "local" / "auto"、search_subsidies と同じ）
+
+    Returns:
+        {
+            "total_count": int,              # 重複を除いた件数
+            "subsidies": [                   # 各要素は search_subsidies の結果に matched_queries を加えたもの
+                {..., "matched_queries": [0, 2]}   # 一致した queries の添字
+            ],
+            "queries": [                     # 検索条件ごとの結果
+                {"index": int, "search_conditions": {...}, "total_count": int, "source": str,
+                 "error": str}               # 失敗した場合のみ error
+            ],
+            "failed_queries": int,
+            "duration_seconds": float
+        }
+        一部の検索が失敗しても、成功した検索の結果を返します（すべて失敗した場合は error）。
+
+    必須パラメータ
+    - queries
+    """
+    if not isinstance(queries, list) or not queries:
+        return {"error": "queries には1件以上の検索条件を指定してください"}
+    if len(queries) > _BATCH_MAX_QUERIES:
+        return {"error": f"queries は{_BATCH_MAX_QUERIES}件以下で指定してください"}
+    for index, query in enumerate(queries):
+        if not isinstance(query, dict) or "keyword" not in query:
+            return {"error": f"queries[{index}] は keyword を含む辞書で指定してください"}
+        unknown = sorted(set(query) - set(_BATCH_QUERY_KEYS))
+        if unknown:
+            return {"error": f"queries[{index}] に指定できない項目があります: {', '.join(unknown)}"}
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    completed = 0
+
+    async def run(query: Dict[str, Any]) -> Dict[str, Any]:
+        nonlocal completed
+        async with semaphore:
+            result = await _search_subsidies(
+                **query, sort=sort, order=order, acceptance=acceptance, source=source
+            )
+        completed += 1
+        if ctx is not None:
+            status = f"エラー: {result['error']}" if "error" in result else f"{result.get('total_count', 0)}件"
+            await ctx.report_progress(completed, len(queries), message=f"{query['keyword']}: {status}")
+        return result
+
+    results = await asyncio.gather(*(run(query) for query in queries))
+
+    provenance = []
+    for index, (query, result) in enumerate(zip(queries, results)):
+        entry = {
+            "index": index,
+            "search_conditions": result.get("search_conditions", query),
+            "total_count": result.get("total_count", 0),
+            "source": result.get("source"),
+        }
+        if "error" in result:
+            entry["error"] = result["error"]
+        if "fallback_reason" in result:
+            entry["fallback_reason"] = result["fallback_reason"]
+        provenance.append(entry)
+    failed = sum(1 for entry in provenance if "error" in entry)
+    if failed == len(queries):
+        return {"error": "すべての検索に失敗しました", "queries": provenance}
+
+    subsidies = _merge_batch_results(results, sort, str(order).upper())
+    return {
+        "total_count": len(subsidies),
+        "subsidies": subsidies,
+        "queries": provenance,
+        "failed_queries": failed,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
+
+
+def _merge_batch_results(results: List[Dict[str, Any]], sort: str, order: str) -> List[Dict[str, Any]]:
+    """検索結果を補助金IDで統合し、sort の項目で並べ直す（値のない補助金は末尾、同順位は検索条件の順）"""
+    merged: Dict[Any, Dict[str, Any]] = {}
+    for index, result in enumerate(results):
+        if "error" in result:
+            continue
+        for position, subsidy in enumerate(result.get("subsidies", [])):
+            key = subsidy.get("id") or (index, position)
+            entry = merged.get(key)
+            if entry is None:
+                # キャッシュ上の結果を書き換えないようコピーする
+                merged[key] = {**subsidy, "matched_queries": [index]}
+            elif entry["matched_queries"][-1] != index:
+                entry["matched_queries"].append(index)
+    subsidies = list(merged.values())
+    dated = [s for s in subsidies if s.get(sort)]
+    dated.sort(key=lambda s: str(s[sort]), reverse=order == "DESC")
+    return dated + [s for s in subsidies if not s.get(sort)]
 
 
 @mcp.tool()
@@ -222,14 +1080,145 @@ async def ping() -> Dict[str, Any]:
 
 
 @mcp.tool()
+async def get_server_stats() -> Dict[str, Any]:
+    """
+    サーバー内部の統計情報（キャッシュのヒット率など）を返します。
+
+    Returns:
+        {
+            "search_cache": {            # 検索結果キャッシュ（GET /subsidies）
+                "entries": int,          # 保持しているエントリ数
+                "bytes": int,            # 保持しているデータの概算バイト数
+                "hits": int,             # キャッシュヒット数
+                "misses": int,           # 上流APIへ問い合わせた回数
+                "coalesced": int,        # 同時の同一検索を1回にまとめた回数
+                "evictions": int,        # LRUで追い出した件数
+                "stale_ttl_seconds": float,  # 有効期間切れの結果を返してよい期間
+                "stale_hits": int,       # 有効期間切れの結果を返した回数
+                "revalidations": int,    # 裏で取り直した回数
+                "hit_ratio": float
+            },
+            "search_pages": {...},       # ページ送り用に保存した検索結果（search_cache と同じ項目）
+            "detail_metadata_cache": {...},  # metadata_only の詳細のキャッシュ（search_cache と同じ項目）
+            "lanes": {                   # ツールの実行レーン（fast: 検索・統計など、slow: ダウンロード・変換）
+                "fast": {"limit": int, "active": int, "waiting": int, "rejected": int, "timeouts": int,
+                         "wait_ms": {"p50": float, "p95": float, "p99": float, "max": float}, ...},
+                "slow": {...}
+            },
+            "converter": {               # ドキュメント変換エンジン（get_file_content）
+                "mode": str,             # "process" / "thread"
+                "running": int,          # 実行中・待機中のジョブ数
+                "completed": int,
+                "failed": int,
+                "rejected": int,         # サイズ・ページ数の上限で拒否した件数
+                "timeouts": int,
+                "cancelled": int         # クライアント切断などで取り消した件数
+            },
+            "catalog": {                 # 補助金一覧のローカルミラー
+                "records": int,
+                "with_detail": int,      # 詳細を取り込み済みの件数
+                "last_sync_at": str | None,
+                "last_sync_age_seconds": float | None,
+                "last_sync_result": dict | None
+            },
+            "upstream": {                # 上流APIへの送信（流量制御・再試行・サーキットブレーカー）
+                "requests": int,         # 送信回数（再試行を含む）
+                "retries": int,
+                "rate_limiter": {"rate": float, "max_rate": float, "burst": int, "throttled": int},
+                "circuit_breaker": {"state": str, "consecutive_failures": int, "short_circuited": int}
+            },
+            "http": {                    # 上流との通信量
+                "responses": int,
+                "not_modified": int,     # 条件付きGETで 304（ダウンロードなし）だった回数
+                "bytes_downloaded": int, # 受信したボディのバイト数（圧縮されたままのサイズ）
+                "http2": bool,
+                "accept_encoding": str,
+                "pool": {                # 接続プール（上限の見直しに使う）
+                    "max_connections": int,
+                    "max_keepalive_connections": int,
+                    "in_use": int,       # 接続を使用中のリクエスト数
+                    "waiting": int,      # 空きを待っているリクエスト数
+                    "peak_in_use": int,
+                    "peak_waiting": int,
+                    "acquired": int,
+                    "pool_timeouts": int,  # 空きを待ちきれなかった回数
+                    "acquire_latency_ms": {"p50": float, "p95": float, "max": float}  # 接続を確保するまでの待ち時間
+                },
+                "dns_cache": {"ttl_seconds": float, "entries": int, "hits": int, "misses": int} | None
+            },
+            "timestamp": str
+        }
+
+    必須パラメータ
+    - なし
+    """
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+    return {
+        "search_cache": _SEARCH_CACHE.stats(),
+        "search_pages": _SEARCH_PAGES.stats(),
+        "detail_metadata_cache": _DETAIL_METADATA_CACHE.stats(),
+        "lanes": {"fast": _FAST_LANE.stats(), "slow": _SLOW_LANE.stats()},
+        "converter": _CONVERTER.stats(),
+        "catalog": await loop.run_in_executor(_FILE_EXECUTOR, catalog.stats),
+        "upstream": _UPSTREAM.stats(),
+        "http": {
+            **_HTTP_STATS,
+            "http2": _HTTP2 and importlib.util.find_spec("h2") is not None,
+            "accept_encoding": _get_http_client().headers.get("accept-encoding", ""),
+            "pool": {
+                "max_connections": _HTTP_MAX_CONNECTIONS,
+                "max_keepalive_connections": _HTTP_MAX_KEEPALIVE,
+                **_POOL_MONITOR.stats(),
+            },
+            "dns_cache": _HTTP_TRANSPORT.dns_cache.stats() if _HTTP_TRANSPORT and _HTTP_TRANSPORT.dns_cache else None,
+        },
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+@mcp.tool()
+@_in_lane(lambda args: _SLOW_LANE, priority=_PRIORITY_BULK)
+async def sync_catalog() -> Dict[str, Any]:
+    """
+    補助金一覧のローカルカタログを上流APIと同期します。
+
+    search_subsidies(source="local") はこのカタログで検索します。通常は検索時に自動で同期されるため
+    （未同期なら初回に、古くなっていれば裏で）、すぐに最新の状態にしたい場合だけ使ってください。
+
+    Returns:
+        {
+            "fetched": int,              # 上流APIから取得した件数
+            "added": int,                # 新規に追加した件数
+            "updated": int,              # 内容が変わって更新した件数
+            "unchanged": int,            # 変化のなかった件数
+            "duration_seconds": float,
+            "catalog": {...}             # 同期後のカタログの状態（get_server_stats の catalog と同じ）
+        }
+
+    必須パラメータ
+    - なし
+    """
+    result = await _sync_catalog()
+    if "error" in result:
+        return result
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(_FILE_EXECUTOR, _get_catalog)
+    return {**result, "catalog": await loop.run_in_executor(_FILE_EXECUTOR, catalog.stats)}
+
+
+@mcp.tool()
+@_in_lane(lambda args: _FAST_LANE)
 async def get_subsidy_overview(output_format: str = "json") -> Dict[str, Any]:
     """
     補助金の最新状況を把握します。締切期間別、金額規模別の集計を提供。
 
     実装メモ（APIに存在しない集計のため、サーバー内で算出）
-    - まず search_subsidies（GET /subsidies）を呼び、取得結果に対して集計します。
+    - search_subsidies（GET /subsidies、キーワード「事業」・受付中）の結果を集計します。
     - 受付中や締切までの日数は、acceptance_end_datetime を現在時刻と比較して算出します。
     - 金額は subsidy_max_limit を数値化して分類します（未設定は "unspecified"）。
+    - 集計は一覧の取得時（カタログ同期・同条件の検索を含む）に差分で更新したスナップショットから返します。
+      JGRANTS_OVERVIEW_REFRESH_INTERVAL 秒より古い場合は、応答後に裏で一覧を取り直します。
 
     参考
     - jGrants ポータル: https://www.jgrants-portal.go.jp/
@@ -247,88 +1236,18 @@ async def get_subsidy_overview(output_format: str = "json") -> Dict[str, Any]:
     必須パラメータ
     - なし
     """
-    # まず検索して統計を計算（デフォルトキーワードで検索）
-    subsidies = await _search_subsidies_internal()
-
-    if "error" in subsidies:
-        return subsidies
-
-    stats = {
-        "total_count": subsidies.get("total_count", 0),
-        "by_deadline_period": {
-            "accepting": 0,
-            "this_month": 0,
-            "next_month": 0,
-            "after_next_month": 0
-        },
-        "by_amount_range": {
-            "under_1m": 0,
-            "under_10m": 0,
-            "under_100m": 0,
-            "over_100m": 0,
-            "unspecified": 0
-        },
-        "urgent_deadlines": [],
-        "high_amount_subsidies": [],
-        "statistics_generated_at": datetime.now(timezone.utc).isoformat()
-    }
-
-    # タイムゾーン付きの日時で比較（UTC）
-    now = datetime.now(timezone.utc)
-
-    for subsidy in subsidies.get("subsidies", []):
-        # 締切による分類
-        if subsidy.get("acceptance_end_datetime"):
-            try:
-                end_date = datetime.fromisoformat(
-                    subsidy["acceptance_end_datetime"].replace("Z", "+00:00")
-                )
-                days_left = (end_date - now).days
-
-                if days_left < 0:
-                    continue
-                elif days_left <= 30:
-                    stats["by_deadline_period"]["this_month"] += 1
-                elif days_left <= 60:
-                    stats["by_deadline_period"]["next_month"] += 1
-                else:
-                    stats["by_deadline_period"]["after_next_month"] += 1
-
-                # 緊急案件（14日以内）
-                if 0 <= days_left <= 14:
-                    stats["urgent_deadlines"].append({
-                        "id": subsidy.get("id"),
-                        "title": subsidy.get("title"),
-                        "days_left": days_left
-                    })
-            except Exception:
-                pass
-
-        # 金額による分類
-        max_limit = subsidy.get("subsidy_max_limit")
-        if max_limit:
-            try:
-                amount = float(max_limit)
-                if amount <= 1000000:
-                    stats["by_amount_range"]["under_1m"] += 1
-                elif amount <= 10000000:
-                    stats["by_amount_range"]["under_10m"] += 1
-                elif amount <= 100000000:
-                    stats["by_amount_range"]["under_100m"] += 1
-                else:
-                    stats["by_amount_range"]["over_100m"] += 1
-
-                # 高額補助金（5000万円以上）
-                if amount >= 50000000:
-                    stats["high_amount_subsidies"].append({
-                        "id": subsidy.get("id"),
-                        "title": subsidy.get("title"),
-                        "max_amount": amount
-                    })
-            except:
-                stats["by_amount_range"]["unspecified"] += 1
-        else:
-            stats["by_amount_range"]["unspecified"] += 1
+    # 集計はスナップショットから読むだけ（未取得なら取得を待ち、古ければ裏で更新する）
+    if not _OVERVIEW.ready:
+        error = await _refresh_overview()
+        if error is not None:
+            return error
+    elif (
+        _OVERVIEW_REFRESH_INTERVAL > 0
+        and (datetime.now(timezone.utc) - _OVERVIEW.updated_at).total_seconds() > _OVERVIEW_REFRESH_INTERVAL
+    ):
+        _run_in_background(_refresh_overview())
+
+    stats = _OVERVIEW.read()
 
     if output_format.lower() == "csv":
         return _convert_statistics_to_csv(stats)
@@ -406,16 +1325,111 @@ def _convert_statistics_to_csv(stats: Dict[str, Any]) -> Dict[str, Any]:
     return csv_data
 
 
+@mcp.tool()
+@_in_lane(lambda args: _FAST_LANE)
+async def aggregate_subsidies(
+    group_by: Optional[str] = None,
+    amount_edges: Optional[List[float]] = None,
+    deadline_edges: Optional[List[int]] = None,
+    percentiles: Optional[List[float]] = None,
+    keyword: Optional[str] = None,
+    acceptance: int = 1
+) -> Dict[str, Any]:
+    """
+    補助金一覧を集計します。区分の区切りと内訳の軸を指定できる get_subsidy_overview の拡張版です。
+
+    実装メモ（APIに存在しない集計のため、サーバー内で算出）
+    - ローカルカタログ（search_subsidies(source="local") と同じ）の一覧を pandas で列形式に読み込み、まとめて集計します。
+    - 業種・利用目的は get_subsidy_detail で詳細を取得した補助金のみ判明します（未取得は「未設定」）。
+    - 地域などの複数値（「 / 」区切り）は、それぞれの値に1件ずつ数えます。
+
+    Args:
+        group_by: 内訳の軸 ("area" / "industry" / "employees" / "purpose")。省略時は全体のみ
+        amount_edges: 金額区分の区切り（円、昇順）。区間は上限を含む。デフォルトは [1000000, 10000000, 100000000]
+        deadline_edges: 締切区分の区切り（締切までの日数、昇順）。デフォルトは [14, 30, 60]
+        percentiles: 補助上限額（subsidy_max_limit）のパーセンタイル（0〜100）。デフォルトは [25, 50, 75, 90]
+        keyword: 集計対象を絞り込むキーワード（省略時はカタログ全体）
+        acceptance: 1 なら受付中のみ、0 なら受付終了を含む（締切超過は "expired" に数える）
+
+    Returns:
+        {
+            "total_count": int,
+            "amount": {"edges": [...], "buckets": {区分: 件数}, "count": int, "min": float, "max": float,
+                       "mean": float, "percentiles": {"p50": float, ...}},
+            "deadline": {"edges": [...], "buckets": {区分: 件数}},
+            "group_by": str,                 # group_by 指定時のみ
+            "groups": [                      # 件数の多い順
+                {"value": str, "count": int, "amount_median": float,
+                 "amount_buckets": {...}, "deadline_buckets": {...}}
+            ],
+            "catalog_synced_at": str,
+            "statistics_generated_at": str
+        }
+
+    必須パラメータ
+    - なし
+    """
+    # pandas の読み込みは重いため、集計を使うときだけ読み込む
+    from . import aggregation
+
+    if group_by is not None and group_by not in aggregation.DIMENSIONS:
+        return {"error": f"group_by は {', '.join(aggregation.DIMENSIONS)} のいずれかを指定してください"}
+    amount_edges = list(amount_edges) if amount_edges is not None else list(aggregation.DEFAULT_AMOUNT_EDGES)
+    deadline_edges = list(deadline_edges) if deadline_edges is not None else list(aggregation.DEFAULT_DEADLINE_EDGES)
+    percentiles = list(percentiles) if percentiles is not None else list(aggregation.DEFAULT_PERCENTILES)
+    for name, edges in (("amount_edges", amount_edges), ("deadline_edges", deadline_edges)):
+        error = aggregation.validate_edges(edges, name)
+        if error is not None:
+            return {"error": error}
+    if any(not 0 <= p <= 100 for p in percentiles):
+        return {"error": "percentiles には0〜100の値を指定してください"}
+    if acceptance not in (0, 1):
+        return {"error": "acceptance は 0 または 1 を指定してください"}
+
+    result = await _search_catalog({"keyword": keyword, "acceptance": acceptance, "with_detail": True})
+    if "error" in result:
+        return result
+
+    now = datetime.now(timezone.utc)
+    loop = asyncio.get_running_loop()
+    stats = await loop.run_in_executor(
+        _FILE_EXECUTOR,
+        lambda: aggregation.aggregate(
+            result["subsidies"], now,
+            group_by=group_by,
+            amount_edges=amount_edges,
+            deadline_edges=deadline_edges,
+            percentiles=percentiles,
+        ),
+    )
+    return {
+        **stats,
+        "catalog_synced_at": result["catalog_synced_at"],
+        "statistics_generated_at": now.isoformat(),
+    }
 
 
 # ツール定義: get_subsidy_detail（統合版）
 @mcp.tool()
-async def get_subsidy_detail(subsidy_id: str) -> Dict[str, Any]:
+@_in_lane(lambda args: _FAST_LANE if args["metadata_only"] else _SLOW_LANE)
+async def get_subsidy_detail(
+    subsidy_id: str,
+    metadata_only: bool = False,
+    fields: Optional[str] = None,
+    profile: str = "full"
+) -> Dict[str, Any]:
     """
     補助金の詳細情報を取得し、添付ファイルを自動的にダウンロードします。
     
     Args:
         subsidy_id: 補助金ID（例: "a0WJ200000CDR9HMAX"）
+        metadata_only: True の場合は添付ファイルを保存せず、ファイル名と推定サイズだけを返す（軽量モード）。
+            ファイルは get_file_content で要求された時点でダウンロード・保存される
+        fields: 返す項目（カンマ区切り、id は常に含める）。例: "title,status,acceptance_end,target.area"
+            （target.area のようにドットで入れ子の項目も指定できる。指定すると profile の項目から絞り込む）
+        profile: "full"（デフォルト）または "compact"。compact は description をタグを除いた
+            300文字までのテキストにし、files をファイル名とサイズだけにする（original_name / mcp_access などを省き、
+            get_file_content の案内を file_access に1回だけ付ける）。save_directory は返さない
     
     Returns:
         以下の構造を持つ辞書:
@@ -438,10 +1452,10 @@ async def get_subsidy_detail(subsidy_id: str) -> Dict[str, Any]:
             "files": {                    # ダウンロードしたファイル情報
                 "application_guidelines": [ # 申請ガイドライン
                     {
-                        "name": str,      # ファイル名
-                        "url": str,       # file://形式のローカルURL
-                        "path": str,      # ローカルファイルパス
-                        "size": int       # ファイルサイズ（バイト）
+                        "name": str,          # 保存したファイル名
+                        "original_name": str, # 上流APIでのファイル名
+                        "size": int,          # ファイルサイズ（バイト）
+                        "mcp_access": {...}   # get_file_content で内容を取得するための呼び出し方
                     }
                 ],
                 "outline_of_grant": [...], # 補助金概要（同上の構造）
@@ -449,6 +1463,14 @@ async def get_subsidy_detail(subsidy_id: str) -> Dict[str, Any]:
             },
             "save_directory": str         # ファイル保存先ディレクトリ
         }
+        保存に失敗したファイルは {"name": str, "error": str} になる。
+        metadata_only=True の場合、files の各ファイルは次の形式（url / path は保存済みの場合のみ）:
+            {"name": str, "estimated_size": int, "downloaded": bool, "mcp_access": {...}, "url": str, "path": str}
+        保存済みの前回の結果が JGRANTS_DETAIL_FRESH_TTL 秒以内に上流で確認したものなら、上流に問い合わせずにそのまま返す。
+        それより古ければ、上流を待たずに "stale": true, "age_seconds": float
+        （上流で最後に確認できてからの秒数）, "stale_reason": str を付けて返し、取得は裏で行って保存し直す
+        （許容する古さは JGRANTS_DETAIL_MAX_STALE。JGRANTS_STALE_GRACE を指定すると、その秒数までは上流の応答を待ち、
+        取得できれば新しい結果を返す）。上流で見つからなくなった（404）補助金の保存済みの結果は返さない
 
     このツールは jGrants 公開APIの "補助金詳細" をラップしています。
     - ベースURL: https://api.jgrants-portal.go.jp/exp/v1/public
@@ -461,6 +1483,10 @@ async def get_subsidy_detail(subsidy_id: str) -> Dict[str, Any]:
     - file://形式のURLを生成してMCPクライアントに返却
     - PDF、ZIP等の各種ファイル形式に対応
     - ファイル名の自動サニタイズ（安全な文字のみ使用）
+    - 保存先の .manifest.json に update_datetime と各ファイルのサイズ・ハッシュを記録し、
+      内容が変わっていない添付ファイルは再デコード・再書き込みしない
+    - デコード・書き込みはスレッドプールで並列に行い、他のリクエストの処理を妨げない
+    - 大きなレスポンスは逐次パースし、添付ファイルをメモリに溜めずにディスクへ直接デコードする
 
     注意事項:
     - ファイルはローカルのtmpディレクトリに保存されます。補助金の情報はファイルに詳細が含まれることが多いため、すべてのfile urlをリンク(ブラウザから開けるリンク)として表示してあげてください
@@ -473,156 +1499,1042 @@ async def get_subsidy_detail(subsidy_id: str) -> Dict[str, Any]:
     # 入力バリデーション（API仕様準拠）
     if not isinstance(subsidy_id, str) or not subsidy_id.strip():
         return {"error": "subsidy_id は非空の文字列で指定してください"}
+    try:
+        field_names = _detail_fields(fields, profile)
+    except ValueError as e:
+        return {"error": str(e)}
 
+    result = await _get_subsidy_detail(subsidy_id, download_files=not metadata_only)
+    return shape_detail(result, field_names, profile)
+
+
+def _detail_fields(fields: Any, profile: str) -> Optional[List[str]]:
+    """詳細の fields / profile を検証し、項目名のリストを返す（不正なら ValueError）"""
+    field_names = parse_fields(fields)
+    check_detail_fields(field_names)
+    check_profile(profile)
+    return field_names
+
+
+async def _get_subsidy_detail(subsidy_id: str, download_files: bool = True) -> Dict[str, Any]:
+    """get_subsidy_detail / get_subsidy_details_batch の共通処理（download_files=False ならメタデータのみ）"""
     # 個別の詳細エンドポイントを使用
     url = f"{API_BASE_URL}/subsidies/id/{subsidy_id}"
+    subsidy_dir = FILES_DIR / subsidy_id
+
+    if not download_files:
+        # 同じ補助金のメタデータは JGRANTS_DETAIL_METADATA_TTL の間キャッシュし、同時の取得は1回にまとめる
+        data = await _DETAIL_METADATA_CACHE.get_or_fetch(
+            make_cache_key({"detail_metadata": subsidy_id}),
+            lambda: _get_detail_metadata_json(url),
+            cacheable=lambda d: "error" not in d,
+        )
+        if "error" in data:
+            if data["error"].startswith("HTTPエラー: 404"):
+                return {"error": f"補助金ID '{subsidy_id}' が見つかりません"}
+            return data
+        subsidy = _detail_record(data)
+        if subsidy is None:
+            return {"error": "予期しないレスポンス形式"}
+        await _ingest_catalog_detail(subsidy)
+        return await _build_metadata_result(subsidy, subsidy_id, subsidy_dir)
+
+    async def fetch() -> Dict[str, Any]:
+        # 同じ補助金への同時の取得は1回にまとめる（同じ保存先へ同時に書き込まない）
+        return await _DETAIL_FLIGHT.get_or_fetch(
+            make_cache_key({"detail": subsidy_id}),
+            lambda: _fetch_subsidy_detail(url, subsidy_id, subsidy_dir),
+        )
 
-    data = await _get_json(url)
-    if "error" in data:
-        if data["error"].startswith("HTTPエラー: 404"):
-            return {"error": f"補助金ID '{subsidy_id}' が見つかりません"}
-        return data
+    max_age = max(_DETAIL_FRESH_TTL, _DETAIL_MAX_STALE)
+    saved = await _saved_detail_result(subsidy_dir, max_age) if max_age > 0 else None
+    if saved is None:
+        return await fetch()
+    stale, age = saved
+    # 確認してから JGRANTS_DETAIL_FRESH_TTL 秒以内なら、上流に問い合わせずにそのまま返す
+    if age <= _DETAIL_FRESH_TTL:
+        return stale
+    if age > _DETAIL_MAX_STALE:
+        return await fetch()
+    stale["stale"] = True
+    stale["age_seconds"] = round(age, 1)
+
+    # 保存済みの結果を返し、取得は裏で行って保存し直す（同じ補助金の取り直しは同時に1つまで）
+    task = _revalidate_detail(subsidy_id, fetch)
+    if _STALE_GRACE <= 0:
+        stale["stale_reason"] = "保存済みの結果を返しています（上流APIからの取得は裏で行っています）"
+        return stale
+    done, _ = await asyncio.wait({task}, timeout=_STALE_GRACE)
+    if not done:
+        stale["stale_reason"] = f"上流APIの応答が{_STALE_GRACE:g}秒以内になかったため、保存済みの結果を返しています"
+        return stale
+    result = task.result()
+    if "error" in result and not result["error"].endswith("が見つかりません"):
+        stale["stale_reason"] = f"上流APIの取得に失敗したため、保存済みの結果を返しています（{result['error']}）"
+        return stale
+    return result
+
+
+async def _fetch_subsidy_detail(url: str, subsidy_id: str, subsidy_dir: Path) -> Dict[str, Any]:
+    """詳細APIを呼び出し、添付ファイルを保存した結果を返す。
+
+    保存済みの結果が揃っていれば前回の検証子で条件付きGETを送り、304 ならダウンロードせずにそれを返す。
+    """
+    loop = asyncio.get_running_loop()
+    validators, stored = await loop.run_in_executor(_FILE_EXECUTOR, _revalidatable_detail, subsidy_dir)
+    spools: list = []
+    try:
+        data = await _get_detail_json(url, subsidy_dir, spools, validators)
+        if data is _NOT_MODIFIED:
+            await loop.run_in_executor(_FILE_EXECUTOR, _touch_manifest, subsidy_dir)
+            return stored
+        if "error" in data:
+            if data["error"].startswith("HTTPエラー: 404"):
+                # 取り下げられた補助金: 保存済みの結果を古い結果としても返さないようにする
+                await loop.run_in_executor(_FILE_EXECUTOR, _forget_saved_detail, subsidy_dir)
+                return {"error": f"補助金ID '{subsidy_id}' が見つかりません"}
+            return data
+
+        return await _build_detail_result(data, subsidy_id, subsidy_dir, validators)
+    finally:
+        # 保存に使われなかった一時ファイルを片付ける（保存済みのものは移動済みなので何もしない）
+        for spool in spools:
+            spool.abort()
+
+
+def _revalidatable_detail(subsidy_dir: Path) -> Tuple[Dict[str, str], Optional[Dict[str, Any]]]:
+    """条件付きGETに使う検証子と、304 のときに返す保存済みの結果（使えなければ空の検証子）"""
+    manifest = _load_manifest(subsidy_dir)
+    validators = manifest.get("validators")
+    if not _CONDITIONAL_REQUESTS or not isinstance(validators, dict) or not validators:
+        return {}, None
+    stored = _stored_detail_result(manifest, subsidy_dir)
+    if stored is None:
+        return {}, None
+    return dict(validators), stored
+
+
+def _touch_manifest(subsidy_dir: Path) -> None:
+    """上流で確認できた時刻として記録する（保存済みの結果を古い結果として返すときの古さ）"""
+    try:
+        os.utime(subsidy_dir / _MANIFEST_NAME)
+    except OSError:
+        pass
+
+
+def _forget_saved_detail(subsidy_dir: Path) -> None:
+    """保存済みの結果（マニフェスト）を消す。添付ファイルは次に取得できたときに整理される"""
+    try:
+        (subsidy_dir / _MANIFEST_NAME).unlink()
+    except OSError:
+        pass
+
+
+async def _saved_detail_result(subsidy_dir: Path, max_age: float) -> Optional[Tuple[Dict[str, Any], float]]:
+    """前回保存した結果が全ファイル揃っていて、古さが max_age 秒以内なら (結果, 古さ) を返す。
+
+    古さはマニフェストの更新時刻（上流で最後に確認できた時刻）から計算する。
+    """
+    def load() -> Optional[Tuple[Dict[str, Any], float]]:
+        try:
+            age = max(0.0, time.time() - (subsidy_dir / _MANIFEST_NAME).stat().st_mtime)
+        except OSError:
+            return None
+        if age > max_age:
+            return None
+        result = _stored_detail_result(_load_manifest(subsidy_dir), subsidy_dir)
+        return None if result is None else (result, age)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_FILE_EXECUTOR, load)
+
+
+# 補助金ごとの裏での取り直し（同じ補助金の取り直しは同時に1つまで）
+_DETAIL_REVALIDATIONS: Dict[str, asyncio.Task] = {}
+
+
+def _revalidate_detail(subsidy_id: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> asyncio.Task:
+    """保存済みの詳細を裏で取り直す（実行中の取り直しがあればそれを返す）"""
+    task = _DETAIL_REVALIDATIONS.get(subsidy_id)
+    if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+        return task
+
+    async def revalidate() -> Dict[str, Any]:
+        # 裏での取り直しも添付ファイルのダウンロードを伴うので slow レーンの枠で行う
+        # （呼び出し元が枠を持ったまま待つのは JGRANTS_STALE_GRACE 秒までなので、枠が足りなくても詰まらない）
+        try:
+            async with _SLOW_LANE.slot("get_subsidy_detail", _PRIORITY_BACKGROUND):
+                return await fetch()
+        except LaneFull as e:
+            return {"error": str(e)}
+
+    task = _run_in_background(revalidate())
+    _DETAIL_REVALIDATIONS[subsidy_id] = task
+    task.add_done_callback(
+        lambda t: _DETAIL_REVALIDATIONS.pop(subsidy_id, None) if _DETAIL_REVALIDATIONS.get(subsidy_id) is t else None
+    )
+    return task
 
+
+@mcp.tool()
+@_in_lane(lambda args: _SLOW_LANE if args["download_files"] else _FAST_LANE, priority=_PRIORITY_BULK)
+async def get_subsidy_details_batch(
+    subsidy_ids: List[str],
+    download_files: bool = True,
+    fields: Optional[str] = None,
+    profile: str = "full",
+    ctx: Optional[Context] = None
+) -> Dict[str, Any]:
+    """
+    複数の補助金の詳細情報をまとめて取得します（検索結果の候補を一括で確認する場合に使用）。
+
+    各補助金の取得は並行して実行し（同時実行数は JGRANTS_BATCH_CONCURRENCY）、
+    取得できたものから順に進捗通知（MCP の progress）で「何件目・どの補助金が完了したか」を送ります。
+
+    Args:
+        subsidy_ids: 補助金IDのリスト（最大 JGRANTS_BATCH_MAX_IDS 件、重複は1回だけ取得）
+        download_files: False の場合は添付ファイルを保存せず、ファイル名と推定サイズだけを返す
+            （get_subsidy_detail の metadata_only=True と同じ）
+        fields / profile: 各結果で返す項目と形式（get_subsidy_detail と同じ）
+
+    Returns:
+        {
+            "results": [                 # subsidy_ids の順。各要素は get_subsidy_detail の結果
+                {"id": str, ...},        # 失敗した場合は {"id": str, "error": str}
+            ],
+            "completed_order": [str],    # 取得が完了した順の補助金ID
+            "succeeded": int,
+            "failed": int,
+            "duration_seconds": float
+        }
+
+    必須パラメータ
+    - subsidy_ids
+    """
+    if not isinstance(subsidy_ids, list) or not subsidy_ids:
+        return {"error": "subsidy_ids には1件以上の補助金IDを指定してください"}
+    if any(not isinstance(i, str) or not i.strip() for i in subsidy_ids):
+        return {"error": "subsidy_ids には非空の文字列を指定してください"}
+    ids = list(dict.fromkeys(i.strip() for i in subsidy_ids))
+    if len(ids) > _BATCH_MAX_IDS:
+        return {"error": f"subsidy_ids は{_BATCH_MAX_IDS}件以下で指定してください"}
+    try:
+        field_names = _detail_fields(fields, profile)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def fetch(subsidy_id: str) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                return subsidy_id, await _get_subsidy_detail(subsidy_id, download_files)
+            except Exception as e:
+                # 1件の失敗で一括取得全体を止めない
+                logger.exception(f"補助金詳細の取得に失敗しました: {subsidy_id}")
+                return subsidy_id, {"error": f"予期しないエラー: {e}"}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    completed_order = []
+    # 指定された順にタスクを作り、同時実行数の上限内では先頭のIDから取得する
+    tasks = [asyncio.ensure_future(fetch(i)) for i in ids]
+    try:
+        for future in asyncio.as_completed(tasks):
+            subsidy_id, result = await future
+            if "error" in result:
+                result = {"id": subsidy_id, "error": result["error"]}
+            results[subsidy_id] = result
+            completed_order.append(subsidy_id)
+            if ctx is not None:
+                status = f"エラー: {result['error']}" if "error" in result else "完了"
+                await ctx.report_progress(len(completed_order), len(ids), message=f"{subsidy_id}: {status}")
+    finally:
+        # 呼び出し元がキャンセルされた場合は残りの取得もやめる
+        for task in tasks:
+            task.cancel()
+
+    failed = sum(1 for r in results.values() if "error" in r)
+    return {
+        "results": [shape_detail(results[i], field_names, profile) for i in ids],
+        "completed_order": completed_order,
+        "succeeded": len(ids) - failed,
+        "failed": failed,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
+
+
+async def _build_detail_result(
+    data: Dict[str, Any],
+    subsidy_id: str,
+    subsidy_dir: Path,
+    validators: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """詳細APIのレスポンスを整形し、添付ファイルを保存する（validators は次回の条件付きGET用に記録）"""
     # レスポンスを整形
+    subsidy = _detail_record(data)
+    if subsidy is not None:
+        loop = asyncio.get_running_loop()
+        await _ingest_catalog_detail(subsidy)
+
+        # update_datetime が前回と同じで添付ファイルも揃っていれば、デコード・書き込みを省略
+        manifest, cached = await loop.run_in_executor(
+            _FILE_EXECUTOR, _reuse_saved_detail, subsidy_dir, subsidy.get("update_datetime"), validators
+        )
+        if cached is not None:
+            return cached
+
+        formatted_result = _format_subsidy(subsidy, subsidy_id)
+        saved_files, manifest_files = await _save_attachments(subsidy, subsidy_id, subsidy_dir, manifest)
+
+        formatted_result["files"] = saved_files
+        formatted_result["save_directory"] = str(subsidy_dir)
+
+        await loop.run_in_executor(_FILE_EXECUTOR, _write_manifest, subsidy_dir, manifest, {
+            "subsidy_id": subsidy_id,
+            "update_datetime": subsidy.get("update_datetime"),
+            "files": manifest_files,
+            "result": formatted_result,
+            "validators": validators or {},
+        })
+
+        return formatted_result
+
+    return {"error": "予期しないレスポンス形式"}
+
+
+def _reuse_saved_detail(
+    subsidy_dir: Path, update_datetime: Any, validators: Optional[Dict[str, str]]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """保存済みのマニフェストと、更新されていなければ保存済みの結果を返す（再利用する場合は確認時刻・検証子を記録）"""
+    subsidy_dir.mkdir(exist_ok=True)
+    manifest = _load_manifest(subsidy_dir)
+    cached = _cached_detail_result(manifest, update_datetime, subsidy_dir)
+    if cached is not None:
+        if validators and manifest.get("validators") != validators:
+            _write_manifest(subsidy_dir, manifest, {**manifest, "validators": validators})
+        else:
+            _touch_manifest(subsidy_dir)
+    return manifest, cached
+
+
+def _detail_record(data: Any) -> Optional[Dict[str, Any]]:
+    """詳細APIのレスポンスから補助金のレコードを取り出す（形式が想定外なら None）"""
     if isinstance(data, dict):
         result = data.get("result", data)
         if isinstance(result, list) and len(result) > 0:
-            subsidy = result[0]
-        elif isinstance(result, dict):
-            subsidy = result
-        else:
-            return {"error": "予期しないレスポンス形式"}
+            return result[0]
+        if isinstance(result, dict):
+            return result
+    return None
 
-        # ステータス判定（締切日が未来なら受付中）
-        status = "受付終了"
-        end_raw = subsidy.get("acceptance_end_datetime")
-        if end_raw:
-            try:
-                end_dt = datetime.fromisoformat(end_raw.replace("Z", "+00:00"))
-                if end_dt >= datetime.now(end_dt.tzinfo):
-                    status = "受付中"
-            except Exception:
+
+async def _build_metadata_result(subsidy: Dict[str, Any], subsidy_id: str, subsidy_dir: Path) -> Dict[str, Any]:
+    """添付ファイルを保存せずに整形し、ファイル名と推定サイズを返す。
+
+    一覧を保存先の .attachments.json に記録しておき、get_file_content で要求されたときに保存する。
+    """
+    formatted_result = _format_subsidy(subsidy, subsidy_id)
+    files: Dict[str, list] = {}
+    listing: Dict[str, Dict[str, Any]] = {}
+    for file_type, base_name in _FILE_TYPE_NAMES.items():
+        for idx, file_data in enumerate(subsidy.get(file_type) or []):
+            if not isinstance(file_data, dict):
+                continue
+            file_base64 = file_data.get("data") or file_data.get("file_data")
+            if not file_base64:
+                continue
+            file_name = file_data.get("name") or file_data.get("file_name", f"{base_name}_{idx+1}.pdf")
+            safe_file_name = _sanitize_filename(file_name, f"{base_name}_{idx+1}.pdf")
+            estimated_size = file_base64.size if isinstance(file_base64, _EstimatedAttachment) else _estimate_decoded_size(file_base64)
+            file_path = subsidy_dir / safe_file_name
+            entry = {
+                "name": safe_file_name,
+                "estimated_size": estimated_size,
+                "downloaded": file_path.exists(),
+                "mcp_access": _file_access_info(subsidy_id, safe_file_name),
+            }
+            if entry["downloaded"]:
+                entry["url"] = f"file://{file_path.absolute()}"
+                entry["path"] = str(file_path.absolute())
+            files.setdefault(file_type, []).append(entry)
+            listing[safe_file_name] = {"type": file_type, "estimated_size": estimated_size}
+
+    formatted_result["files"] = files
+    formatted_result["save_directory"] = str(subsidy_dir)
+    formatted_result["metadata_only"] = True
+    if listing:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_FILE_EXECUTOR, _write_attachment_listing, subsidy_dir, {
+            "subsidy_id": subsidy_id,
+            "update_datetime": subsidy.get("update_datetime"),
+            "files": listing,
+        })
+    return formatted_result
+
+
+def _estimate_decoded_size(value: Any) -> int:
+    """BASE64文字列からデコード後のサイズを見積もる（区切り文字は数えない）"""
+    if not isinstance(value, str):
+        return 0
+    data = "".join(value.split())
+    return len(data) * 3 // 4 - (len(data) - len(data.rstrip("=")))
+
+
+def _write_attachment_listing(subsidy_dir: Path, listing: Dict[str, Any]) -> None:
+    subsidy_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = subsidy_dir / (_ATTACHMENTS_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(listing, f, ensure_ascii=False)
+    os.replace(tmp_path, subsidy_dir / _ATTACHMENTS_NAME)
+
+
+def _listed_attachment(subsidy_dir: Path, filename: str) -> bool:
+    """メタデータのみ取得した補助金の添付ファイル一覧に filename が含まれるか"""
+    try:
+        with open(subsidy_dir / _ATTACHMENTS_NAME, "r", encoding="utf-8") as f:
+            listing = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(listing, dict) and filename in listing.get("files", {})
+
+
+async def _materialize_attachment(subsidy_id: str, filename: str) -> bool:
+    """メタデータのみ取得した補助金の添付ファイルを、要求された時点でダウンロード・保存する。
+
+    同じ補助金への同時の要求は1回の取得にまとめる。保存できれば True を返す。
+    """
+    subsidy_dir = FILES_DIR / subsidy_id
+    if not _listed_attachment(subsidy_dir, filename):
+        return False
+    logger.info(f"メタデータのみ取得した添付ファイルを保存します: {subsidy_id}/{filename}")
+    # 同じ補助金への同時の要求は _get_subsidy_detail の中で1回の取得にまとまる
+    result = await _get_subsidy_detail(subsidy_id)
+    if "error" in result:
+        logger.warning(f"添付ファイルの保存に失敗しました: {subsidy_id}: {result['error']}")
+    return (subsidy_dir / filename).exists()
+
+
+# 添付ファイルの種類と表示名
+_FILE_TYPE_NAMES = {
+    "application_guidelines": "申請ガイドライン",
+    "outline_of_grant": "補助金概要",
+    "application_form": "申請書"
+}
+
+# 補助金ごとの保存ディレクトリに置くマニフェスト（前回保存時の update_datetime とファイル情報）
+_MANIFEST_NAME = ".manifest.json"
+# メタデータのみ取得した補助金の添付ファイル一覧（get_file_content で要求されたときに保存する）
+_ATTACHMENTS_NAME = ".attachments.json"
+# 詳細の取得（添付ファイルの保存を含む）で、同じ補助金への同時の要求を1回にまとめる（キャッシュはしない）
+_DETAIL_FLIGHT = ResponseCache(ttl=0)
+
+# 添付ファイルのデコード・書き込み用スレッドプール（同時に処理するファイル数の上限）
+_FILE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, _env_int("JGRANTS_FILE_WORKERS", 4)),
+    thread_name_prefix="jgrants-file",
+)
+# 1回に処理するBASE64の文字数
+_DECODE_CHUNK_CHARS = 256 * 1024
+# このサイズ以上（またはサイズ不明）の詳細レスポンスは逐次パースして添付ファイルを直接ディスクへ書く
+_STREAM_DETAIL_MIN_BYTES = _env_int("JGRANTS_STREAM_DETAIL_MIN_BYTES", 8 * 1024 * 1024)
+
+
+def _acceptance_status(end_raw: Optional[str]) -> str:
+    """ステータス判定（締切日が未来なら受付中）"""
+    status = "受付終了"
+    if end_raw:
+        try:
+            end_dt = datetime.fromisoformat(end_raw.replace("Z", "+00:00"))
+            if end_dt >= datetime.now(end_dt.tzinfo):
                 status = "受付中"
+        except Exception:
+            status = "受付中"
+    return status
 
-        formatted_result = {
-            "id": subsidy.get("id", subsidy_id),
-            "title": subsidy.get("title", ""),
-            "description": subsidy.get("detail", subsidy.get("description", "")),
-            "subsidy_max_limit": subsidy.get("subsidy_max_limit"),
-            "acceptance_start": subsidy.get("acceptance_start_datetime"),
-            "acceptance_end": subsidy.get("acceptance_end_datetime"),
-            "target": {
-                "area": subsidy.get("target_area_search"),
-                "industry": subsidy.get("target_industry"),
-                "employees": subsidy.get("target_number_of_employees"),
-                "purpose": subsidy.get("use_purpose")
-            },
-            "application_url": subsidy.get("inquiry_url"),
-            "last_updated": subsidy.get("update_datetime"),
-            "status": status
-        }
 
-        # ファイルを保存してURLを生成
-        files_data = {
-            "application_guidelines": subsidy.get("application_guidelines", []),
-            "outline_of_grant": subsidy.get("outline_of_grant", []),
-            "application_form": subsidy.get("application_form", [])
-        }
+def _format_subsidy(subsidy: Dict[str, Any], subsidy_id: str) -> Dict[str, Any]:
+    """APIの補助金詳細レコードをツールの返却形式に整形（添付ファイル以外）"""
+    return {
+        "id": subsidy.get("id", subsidy_id),
+        "title": subsidy.get("title", ""),
+        "description": subsidy.get("detail", subsidy.get("description", "")),
+        "subsidy_max_limit": subsidy.get("subsidy_max_limit"),
+        "acceptance_start": subsidy.get("acceptance_start_datetime"),
+        "acceptance_end": subsidy.get("acceptance_end_datetime"),
+        "target": {
+            "area": subsidy.get("target_area_search"),
+            "industry": subsidy.get("target_industry"),
+            "employees": subsidy.get("target_number_of_employees"),
+            "purpose": subsidy.get("use_purpose")
+        },
+        "application_url": subsidy.get("inquiry_url"),
+        "last_updated": subsidy.get("update_datetime"),
+        "status": _acceptance_status(subsidy.get("acceptance_end_datetime"))
+    }
+
+
+def _sanitize_filename(file_name: str, fallback: str) -> str:
+    """ファイル名のサニタイズ（日本語を保持）"""
+    # 日本語文字（ひらがな、カタカナ、漢字）を保持しつつ、危険な文字を除去
+    # Windowsで使えない文字: < > : " | ? * \ /
+    # パス区切り文字も除去
+    dangerous_chars = r'[<>:"|?*\\/]'
+    safe_file_name = re.sub(dangerous_chars, '_', file_name)
+
+    # 空白を_に変換
+    safe_file_name = safe_file_name.replace(' ', '_')
+
+    # ファイル名が空になった場合のフォールバック（隠しファイル名もマニフェスト等と衝突するため避ける）
+    if not safe_file_name or safe_file_name == '_' or safe_file_name.startswith('.'):
+        safe_file_name = fallback
+    return safe_file_name
+
+
+def _file_access_info(subsidy_id: str, safe_file_name: str) -> Dict[str, Any]:
+    return {
+        "tool": "get_file_content",
+        "params": {
+            "subsidy_id": subsidy_id,
+            "filename": safe_file_name
+        },
+        "description": f"このファイルにアクセスするには get_file_content ツールを使用してください"
+    }
 
-        subsidy_dir = FILES_DIR / subsidy_id
-        subsidy_dir.mkdir(exist_ok=True)
 
-        saved_files = {}
-        file_type_names = {
-            "application_guidelines": "申請ガイドライン",
-            "outline_of_grant": "補助金概要",
-            "application_form": "申請書"
+def _load_manifest(subsidy_dir: Path) -> Dict[str, Any]:
+    """保存済みマニフェストを読む（なければ空）"""
+    try:
+        with open(subsidy_dir / _MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(subsidy_dir: Path, old_manifest: Dict[str, Any], manifest: Dict[str, Any]) -> None:
+    """マニフェストを書き換え、上流から消えた添付ファイルを削除する"""
+    for name in set(old_manifest.get("files", {})) - set(manifest.get("files", {})):
+        file_path = subsidy_dir / name
+        for path in (file_path, _markdown_cache_path(file_path), _page_cache_path(file_path)):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+    tmp_path = subsidy_dir / (_MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, subsidy_dir / _MANIFEST_NAME)
+
+
+def _manifest_file_ok(subsidy_dir: Path, name: str, entry: Dict[str, Any]) -> bool:
+    """マニフェストに記録したファイルがディスク上に同じサイズで存在するか"""
+    try:
+        return (subsidy_dir / name).stat().st_size == entry.get("size")
+    except OSError:
+        return False
+
+
+def _cached_detail_result(
+    manifest: Dict[str, Any], update_datetime: Optional[str], subsidy_dir: Path
+) -> Optional[Dict[str, Any]]:
+    """update_datetime が一致し、全ファイルが揃っていれば前回の整形結果を返す"""
+    if not update_datetime or manifest.get("update_datetime") != update_datetime:
+        return None
+    return _stored_detail_result(manifest, subsidy_dir)
+
+
+def _stored_detail_result(manifest: Dict[str, Any], subsidy_dir: Path) -> Optional[Dict[str, Any]]:
+    """マニフェストに記録した整形結果を返す（ファイルが欠けている・エラーがあれば None）"""
+    result = manifest.get("result")
+    if not isinstance(result, dict):
+        return None
+    files = manifest.get("files", {})
+    if not all(_manifest_file_ok(subsidy_dir, name, entry) for name, entry in files.items()):
+        return None
+    if any("error" in f for file_list in result.get("files", {}).values() for f in file_list):
+        return None
+    # ステータスは現在時刻に依存するため再計算する
+    result["status"] = _acceptance_status(result.get("acceptance_end"))
+    result["save_directory"] = str(subsidy_dir)
+    return result
+
+
+class _StreamedAttachment:
+    """逐次パースで一時ファイルにデコード済みの添付ファイル（data 文字列の代わりに入る）"""
+
+    __slots__ = ("path", "size", "sha256", "source_sha256")
+
+    def __init__(self, path: Path, size: int, sha256: str, source_sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.source_sha256 = source_sha256
+
+
+class _EstimatedAttachment:
+    """メタデータのみの取得で読み捨てた添付ファイル（data 文字列の代わりに入る）"""
+
+    __slots__ = ("size",)
+
+    def __init__(self, size: int):
+        self.size = size
+
+
+class _SizeSink(StreamSink):
+    """添付ファイルの data をデコードせずに読み捨て、BASE64の長さから元のサイズを見積もるシンク"""
+
+    def __init__(self):
+        self._chars = 0
+        self._padding = 0
+
+    def write(self, data: bytes) -> None:
+        data = data.translate(None, b" \t\r\n")
+        if not data:
+            return
+        self._chars += len(data)
+        stripped = data.rstrip(b"=")
+        if stripped:
+            self._padding = len(data) - len(stripped)
+        else:
+            # "=" だけのチャンク（パディングがチャンクの境界で分かれた場合）
+            self._padding += len(data)
+
+    def close(self) -> _EstimatedAttachment:
+        return _EstimatedAttachment(self._chars * 3 // 4 - self._padding)
+
+
+class _AttachmentSpool(StreamSink):
+    """添付ファイルの data を受け取りながら一時ファイルへデコードするシンク"""
+
+    def __init__(self, subsidy_dir: Path):
+        subsidy_dir.mkdir(parents=True, exist_ok=True)
+        self.path = subsidy_dir / f".stream-{uuid.uuid4().hex}.part"
+        self._file = open(self.path, "wb")
+        self._decoder = _Base64ChunkDecoder()
+        self._digest = hashlib.sha256()
+        self._source_digest = hashlib.sha256()
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        self._source_digest.update(data)
+        chunk = self._decoder.feed(data)
+        if chunk:
+            self._file.write(chunk)
+            self._digest.update(chunk)
+            self._size += len(chunk)
+
+    def close(self) -> _StreamedAttachment:
+        try:
+            self._decoder.flush()
+        finally:
+            self._file.close()
+        return _StreamedAttachment(self.path, self._size, self._digest.hexdigest(), self._source_digest.hexdigest())
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+class _Base64ChunkDecoder:
+    """BASE64文字列を分割して少しずつデコードする（改行など区切り文字を含んでいてもよい）"""
+
+    _ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+
+    def __init__(self):
+        self._carry = b""
+
+    def feed(self, text: Any) -> bytes:
+        raw = text.encode("ascii") if isinstance(text, str) else bytes(text)
+        junk = raw.translate(None, self._ALPHABET)
+        if junk:
+            raw = raw.translate(None, junk)
+        raw = self._carry + raw
+        usable = len(raw) - len(raw) % 4
+        self._carry = raw[usable:]
+        return base64.b64decode(raw[:usable]) if usable else b""
+
+    def flush(self) -> bytes:
+        if self._carry:
+            raise ValueError("BASE64データの長さが不正です")
+        return b""
+
+
+def _store_attachment(
+    subsidy_dir: Path, safe_file_name: str, file_base64: str, previous: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """（ファイルI/O用スレッドで実行）BASE64をデコードして保存し、マニフェスト用の情報を返す。
+
+    BASE64文字列のハッシュが前回と同じでファイルも残っていれば、デコード・書き込みを省略する。
+    ハッシュ計算・デコードはチャンク単位で行い、1回あたりのGIL保持時間を短く保つ。
+    """
+    # 前後の空白はデコーダが読み飛ばすため、巨大な文字列をコピーする strip() はしない
+    data = file_base64
+    chunks = range(0, len(data), _DECODE_CHUNK_CHARS)
+
+    source_digest = hashlib.sha256()
+    for offset in chunks:
+        source_digest.update(data[offset:offset + _DECODE_CHUNK_CHARS].encode("ascii", "replace"))
+    source_sha256 = source_digest.hexdigest()
+    if (
+        previous
+        and previous.get("source_sha256") == source_sha256
+        and _manifest_file_ok(subsidy_dir, safe_file_name, previous)
+    ):
+        # 前回と同じ内容がディスクにあるので再デコードしない
+        return previous
+
+    file_path = subsidy_dir / safe_file_name
+    tmp_path = subsidy_dir / f".{safe_file_name}.part"
+    decoder = _Base64ChunkDecoder()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for offset in chunks:
+                # BASE64デコード
+                chunk = decoder.feed(data[offset:offset + _DECODE_CHUNK_CHARS])
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            decoder.flush()
+
+        # 空ファイルチェック
+        if size == 0:
+            raise ValueError("デコード後のファイルが空です")
+
+        os.replace(tmp_path, file_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    return {
+        "size": size,
+        "sha256": digest.hexdigest(),
+        "source_sha256": source_sha256,
+    }
+
+
+def _commit_streamed_attachment(
+    subsidy_dir: Path, safe_file_name: str, streamed: _StreamedAttachment, previous: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """（ファイルI/O用スレッドで実行）逐次デコード済みの一時ファイルを保存先に移動する。
+
+    前回と同じ内容なら保存済みファイルには触れず、一時ファイルを捨てる。
+    """
+    if (
+        previous
+        and previous.get("source_sha256") == streamed.source_sha256
+        and _manifest_file_ok(subsidy_dir, safe_file_name, previous)
+    ):
+        streamed.path.unlink()
+        return previous
+
+    # 空ファイルチェック
+    if streamed.size == 0:
+        raise ValueError("デコード後のファイルが空です")
+
+    os.replace(streamed.path, subsidy_dir / safe_file_name)
+    return {
+        "size": streamed.size,
+        "sha256": streamed.sha256,
+        "source_sha256": streamed.source_sha256,
+    }
+
+
+async def _save_attachments(
+    subsidy: Dict[str, Any], subsidy_id: str, subsidy_dir: Path, manifest: Dict[str, Any]
+) -> Tuple[Dict[str, list], Dict[str, Dict[str, Any]]]:
+    """添付ファイルを保存し、(返却用ファイル情報, マニフェスト用ファイル情報) を返す。
+
+    デコードと書き込みはファイルI/O用のスレッドプールで並列に行い、イベントループを塞がない。
+    """
+    files_data = {
+        file_type: subsidy.get(file_type, [])
+        for file_type in _FILE_TYPE_NAMES
+    }
+    previous_files = manifest.get("files", {})
+    loop = asyncio.get_running_loop()
+
+    saved_files = {}
+    manifest_files = {}
+    jobs = []  # (file_type, 返却リスト内の位置, 元ファイル名, 保存ファイル名, future)
+
+    debug_files = os.environ.get("JGRANTS_DEBUG_FILES", "0") not in ("0", "false", "False", "")
+    for file_type, file_list in files_data.items():
+        if file_list:
+            saved_files[file_type] = []
+            base_name = _FILE_TYPE_NAMES[file_type]
+
+            for idx, file_data in enumerate(file_list):
+                if isinstance(file_data, dict):
+                    # APIレスポンスのキー名に合わせる（name, data）
+                    file_name = file_data.get("name") or file_data.get("file_name", f"{base_name}_{idx+1}.pdf")
+                    file_base64 = file_data.get("data") or file_data.get("file_data", "")
+
+                    # デバッグログ（環境変数で有効化時のみ）
+                    if debug_files:
+                        with open("/tmp/jgrants_debug.log", "a") as debug_log:
+                            debug_log.write(
+                                f"DEBUG: file_name={file_name}, file_base64 length={len(file_base64) if isinstance(file_base64, str) else 0}\n"
+                            )
+                    if isinstance(file_base64, _StreamedAttachment):
+                        safe_file_name = _sanitize_filename(file_name, f"{base_name}_{idx+1}.pdf")
+                        future = loop.run_in_executor(
+                            _FILE_EXECUTOR,
+                            _commit_streamed_attachment,
+                            subsidy_dir,
+                            safe_file_name,
+                            file_base64,
+                            previous_files.get(safe_file_name),
+                        )
+                        jobs.append((file_type, len(saved_files[file_type]), file_name, safe_file_name, future))
+                        saved_files[file_type].append(None)
+                    elif file_base64:
+                        # BASE64データの検証
+                        if not isinstance(file_base64, str) or file_base64.isspace():
+                            saved_files[file_type].append({
+                                "name": file_name,
+                                "error": f"保存失敗 ({file_name}): 無効なBASE64データ"
+                            })
+                            continue
+
+                        safe_file_name = _sanitize_filename(file_name, f"{base_name}_{idx+1}.pdf")
+                        future = loop.run_in_executor(
+                            _FILE_EXECUTOR,
+                            _store_attachment,
+                            subsidy_dir,
+                            safe_file_name,
+                            file_base64,
+                            previous_files.get(safe_file_name),
+                        )
+                        jobs.append((file_type, len(saved_files[file_type]), file_name, safe_file_name, future))
+                        saved_files[file_type].append(None)
+
+    results = await asyncio.gather(*(job[-1] for job in jobs), return_exceptions=True)
+    for (file_type, position, file_name, safe_file_name, _), entry in zip(jobs, results):
+        if isinstance(entry, BaseException):
+            saved_files[file_type][position] = {
+                "name": file_name,
+                "error": f"保存失敗 ({file_name}): {str(entry)}"
+            }
+            continue
+
+        manifest_files[safe_file_name] = {
+            **entry,
+            "file_type": file_type,
+            "original_name": file_name,
+        }
+        # ファイル情報を保存
+        saved_files[file_type][position] = {
+            "name": safe_file_name,
+            "original_name": file_name,  # オリジナルのファイル名も保持
+            "size": entry["size"],
+            "mcp_access": _file_access_info(subsidy_id, safe_file_name)
         }
 
-        debug_files = os.environ.get("JGRANTS_DEBUG_FILES", "0") not in ("0", "false", "False", "")
-        for file_type, file_list in files_data.items():
-            if file_list:
-                saved_files[file_type] = []
-                base_name = file_type_names[file_type]
-
-                for idx, file_data in enumerate(file_list):
-                    if isinstance(file_data, dict):
-                        # APIレスポンスのキー名に合わせる（name, data）
-                        file_name = file_data.get("name") or file_data.get("file_name", f"{base_name}_{idx+1}.pdf")
-                        file_base64 = file_data.get("data") or file_data.get("file_data", "")
-
-                        # デバッグログ（環境変数で有効化時のみ）
-                        if debug_files:
-                            with open("/tmp/jgrants_debug.log", "a") as debug_log:
-                                debug_log.write(
-                                    f"DEBUG: file_name={file_name}, file_base64 length={len(file_base64) if file_base64 else 0}\n"
-                                )
-                        if file_base64:
-                            try:
-                                # BASE64データの検証
-                                if not isinstance(file_base64, str) or len(file_base64.strip()) == 0:
-                                    raise ValueError("無効なBASE64データ")
-                                
-                                # ファイル名のサニタイズ（日本語を保持）
-                                import re
-                                
-                                # 日本語文字（ひらがな、カタカナ、漢字）を保持しつつ、危険な文字を除去
-                                # Windowsで使えない文字: < > : " | ? * \ /
-                                # パス区切り文字も除去
-                                dangerous_chars = r'[<>:"|?*\\/]'
-                                safe_file_name = re.sub(dangerous_chars, '_', file_name)
-                                
-                                # 空白を_に変換
-                                safe_file_name = safe_file_name.replace(' ', '_')
-                                
-                                # ファイル名が空になった場合のフォールバック
-                                if not safe_file_name or safe_file_name == '_':
-                                    safe_file_name = f"{base_name}_{idx+1}.pdf"
-                                
-                                # BASE64デコード
-                                file_content = base64.b64decode(file_base64.strip())
-                                
-                                # 空ファイルチェック
-                                if len(file_content) == 0:
-                                    raise ValueError("デコード後のファイルが空です")
-                                
-                                file_path = subsidy_dir / safe_file_name
-
-                                with open(file_path, "wb") as f:
-                                    f.write(file_content)
-
-                                # ファイル情報を保存
-                                saved_files[file_type].append({
-                                    "name": safe_file_name,
-                                    "original_name": file_name,  # オリジナルのファイル名も保持
-                                    "size": len(file_content),
-                                    "mcp_access": {
-                                        "tool": "get_file_content",
-                                        "params": {
-                                            "subsidy_id": subsidy_id,
-                                            "filename": safe_file_name
-                                        },
-                                        "description": f"このファイルにアクセスするには get_file_content ツールを使用してください"
-                                    }
-                                })
-                            except Exception as e:
-                                error_msg = f"保存失敗 ({file_name}): {str(e)}"
-                                saved_files[file_type].append({
-                                    "name": file_name,
-                                    "error": error_msg
-                                })
+    return saved_files, manifest_files
 
-        formatted_result["files"] = saved_files
-        formatted_result["save_directory"] = str(subsidy_dir)
 
-        return formatted_result
 
-    return {"error": "予期しないレスポンス形式"}
+# Markdown変換結果のキャッシュ（各補助金ディレクトリの .markdown/ に保存、再起動後も有効）
+_MARKDOWN_CACHE_DIR = ".markdown"
+# キャッシュ形式を変えた場合に上げる
+_MARKDOWN_CACHE_FORMAT = 1
+
+# MarkItDownがサポートする形式
+_MARKDOWN_EXTENSIONS = {
+    '.pdf', '.docx', '.doc', '.xlsx', '.xls', '.pptx', '.ppt',
+    '.html', '.htm', '.xml', '.rtf', '.txt', '.csv', '.md',
+    '.zip'  # ZIPファイルも対応
+}
+_CONVERTER_VERSION: Optional[str] = None
+# (パス, mtime, サイズ) -> SHA-256。同じファイルを何度もハッシュしない
+_FILE_HASHES: Dict[Tuple[str, int, int], str] = {}
+
+# MarkItDown / pdfplumber による変換はCPUを長時間使うため、ワーカープロセスで実行する
+_CONVERTER = ConversionEngine(
+    max_workers=_env_int("JGRANTS_CONVERT_WORKERS", min(4, os.cpu_count() or 1)),
+    timeout=_env_float("JGRANTS_CONVERT_TIMEOUT", 120.0),
+    max_bytes=_env_int("JGRANTS_CONVERT_MAX_BYTES", 50 * 1024 * 1024),
+    max_pages=_env_int("JGRANTS_CONVERT_MAX_PAGES", 500),
+)
+
+
+def _converter_version() -> str:
+    """変換結果に影響するライブラリのバージョン（キャッシュキーに含める）"""
+    global _CONVERTER_VERSION
+    if _CONVERTER_VERSION is None:
+        from importlib.metadata import PackageNotFoundError, version
+
+        parts = []
+        for package in ("markitdown", "pdfplumber"):
+            try:
+                parts.append(f"{package}-{version(package)}")
+            except PackageNotFoundError:
+                parts.append(f"{package}-unknown")
+        parts.append(f"format-{_MARKDOWN_CACHE_FORMAT}")
+        _CONVERTER_VERSION = "/".join(parts)
+    return _CONVERTER_VERSION
+
+
+def _file_sha256(file_path: Path) -> str:
+    """ファイルのSHA-256（mtime・サイズが変わらない限り再計算しない）"""
+    stat = file_path.stat()
+    key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+    digest = _FILE_HASHES.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _FILE_HASHES[key] = digest
+    return digest
+
+
+def _content_key(file_path: Path) -> str:
+    """ファイル内容とコンバータのバージョンから決まるキー（変換キャッシュ・全文検索インデックスで共通）"""
+    return f"{_file_sha256(file_path)}:{_converter_version()}"
+
+
+def _markdown_cache_path(file_path: Path) -> Path:
+    return file_path.parent / _MARKDOWN_CACHE_DIR / f"{file_path.name}.json"
+
 
+def _page_cache_path(file_path: Path) -> Path:
+    return file_path.parent / _MARKDOWN_CACHE_DIR / f"{file_path.name}.pages.json"
+
+
+def _read_markdown_cache(file_path: Path) -> Tuple[str, Optional[Tuple[str, str]]]:
+    """（ファイルI/O用スレッドで実行）(キャッシュキー, キャッシュ済みの (markdown, 抽出方法) または None)"""
+    cache_key = _content_key(file_path)
+    try:
+        with open(_markdown_cache_path(file_path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == cache_key:
+            return cache_key, (cached["content_markdown"], cached["extraction_method"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return cache_key, None
+
+
+def _write_markdown_cache(file_path: Path, cache_key: str, markdown: str, extraction_method: str) -> None:
+    """（ファイルI/O用スレッドで実行）変換結果をキャッシュに保存"""
+    cache_path = _markdown_cache_path(file_path)
+    cache_path.parent.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "key": cache_key,
+            "extraction_method": extraction_method,
+            "content_markdown": markdown,
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+async def _convert_with_cache(file_path: Path, file_extension: str, mime_type: str) -> Optional[Tuple[str, str]]:
+    """ディスク上の変換キャッシュ（ファイルハッシュ + コンバータのバージョン）を使ってMarkdownに変換"""
+    loop = asyncio.get_running_loop()
+    cache_key, cached = await loop.run_in_executor(_FILE_EXECUTOR, _read_markdown_cache, file_path)
+    if cached is not None:
+        logger.info(f"Markdown変換キャッシュを使用しました: {file_path}")
+        return cached
+
+    converted = await _CONVERTER.convert(file_path, file_extension, mime_type)
+    if converted is not None:
+        try:
+            await loop.run_in_executor(_FILE_EXECUTOR, _write_markdown_cache, file_path, cache_key, *converted)
+        except OSError as e:
+            logger.warning(f"Markdown変換キャッシュの保存に失敗しました: {e}")
+    return converted
+
+
+def _read_page_cache(file_path: Path) -> Tuple[str, Dict[int, str], Optional[int]]:
+    """（ファイルI/O用スレッドで実行）(キャッシュキー, {ページ番号: テキスト}, 総ページ数)"""
+    cache_key = _content_key(file_path)
+    try:
+        with open(_page_cache_path(file_path), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == cache_key:
+            return cache_key, {int(k): v for k, v in cached["pages"].items()}, cached["total_pages"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return cache_key, {}, None
+
+
+def _write_page_cache(file_path: Path, cache_key: str, pages: Dict[int, str], total_pages: int) -> None:
+    """（ファイルI/O用スレッドで実行）抽出済みページをキャッシュに保存"""
+    cache_path = _page_cache_path(file_path)
+    cache_path.parent.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "key": cache_key,
+            "total_pages": total_pages,
+            "pages": {str(k): v for k, v in sorted(pages.items())},
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+async def _extract_pages_with_cache(
+    file_path: Path, start: int, count: Optional[int]
+) -> Tuple[Dict[int, str], int]:
+    """PDFの指定ページ（count=None は最後まで）のテキストを、抽出済みページのキャッシュを使いながら取得"""
+    loop = asyncio.get_running_loop()
+    cache_key, pages, total = await loop.run_in_executor(_FILE_EXECUTOR, _read_page_cache, file_path)
+    end = None if count is None else start + count
+    if total is not None:
+        end = total if end is None else min(end, total)
+    missing = [] if end is None else [i for i in range(start, end) if i not in pages]
+    if missing or total is None:
+        first = missing[0] if missing else start
+        last = missing[-1] + 1 if missing else end
+        extracted, total = await _CONVERTER.extract_pages(file_path, first, None if last is None else last - first)
+        pages.update(extracted)
+        try:
+            await loop.run_in_executor(_FILE_EXECUTOR, _write_page_cache, file_path, cache_key, pages, total)
+        except OSError as e:
+            logger.warning(f"ページ抽出キャッシュの保存に失敗しました: {e}")
+
+    result = {}
+    for i in range(start, total if end is None else min(end, total)):
+        if i not in pages:
+            break  # 上限で切り詰められた場合は連続した範囲だけ返す
+        result[i] = pages[i]
+    return result, total
+
+
+def _read_byte_range(file_path: Path, offset: int, limit: Optional[int]) -> bytes:
+    """（ファイルI/O用スレッドで実行）ファイルの指定範囲だけ読む"""
+    with open(file_path, "rb") as f:
+        f.seek(offset)
+        return f.read() if limit is None else f.read(limit)
+
+
+def _range_info(unit: str, offset: int, limit: Optional[int], returned: int, total: int) -> Dict[str, Any]:
+    """取得範囲と、続きを取得するための next_cursor（次の offset、最後まで返した場合は None）"""
+    end = offset + returned
+    return {
+        "range": {"unit": unit, "offset": offset, "limit": limit, "returned": returned, "total": total},
+        "next_cursor": end if end < total else None,
+    }
 
 
 @mcp.tool()
-async def get_file_content(subsidy_id: str, filename: str, return_format: str = "markdown") -> Dict[str, Any]:
+@_in_lane(lambda args: _SLOW_LANE)
+async def get_file_content(
+    subsidy_id: str,
+    filename: str,
+    return_format: str = "markdown",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    unit: str = "chars"
+) -> Dict[str, Any]:
     """
     保存されたファイルの内容を取得（Markdown形式またはBASE64形式）
 
@@ -633,33 +2545,64 @@ async def get_file_content(subsidy_id: str, filename: str, return_format: str =
     - subsidy_id: 補助金ID
     - filename: ファイル名
     - return_format: "markdown" (デフォルト) または "base64"
+    - offset: 取得開始位置（0始まり。前回の next_cursor をそのまま指定できます）
+    - limit: 取得する量（省略時は最後まで）
+    - unit: offset/limit の単位
+        - "chars" (デフォルト): Markdownの文字数
+        - "pages": PDFのページ（Markdown形式のみ。指定ページだけを抽出するため大きなPDFでも高速）
+        - base64形式では常にバイト単位（"bytes"）
+        - Markdownに変換できずbase64で返すファイルに文字数の offset/limit を指定した場合はエラー
+          （return_format="base64" でバイト単位の範囲を指定し直してください）
 
     戻り値（Markdown形式の場合）:
     - filename: ファイル名
-    - content_markdown: Markdown形式のテキスト内容
+    - content_markdown: Markdown形式のテキスト内容（指定範囲のみ）
     - mime_type: MIMEタイプ
     - size_bytes: ファイルサイズ（バイト）
     - extraction_method: 抽出方法
 
     戻り値（BASE64形式の場合）:
     - filename: ファイル名
-    - content_base64: BASE64エンコードされたファイル内容
+    - content_base64: BASE64エンコードされたファイル内容（指定範囲のみ）
     - mime_type: MIMEタイプ
     - size_bytes: ファイルサイズ（バイト）
 
+    共通:
+    - range: {"unit", "offset", "limit", "returned", "total"} 今回返した範囲と全体の量
+    - next_cursor: 続きがある場合に次の offset に指定する値（最後まで返した場合は null）
+
+    変換結果は補助金ディレクトリの .markdown/ に（ファイルのハッシュ + コンバータのバージョンをキーとして）
+    キャッシュされ、同じファイルの2回目以降は変換せずに返します（サーバー再起動後も有効）。
+    変換はワーカープロセスで実行され、サイズ・ページ数の上限超過やタイムアウトの場合はエラーを返します。
+
+    get_subsidy_detail(metadata_only=True) で一覧だけ取得したファイルは、このツールで最初に要求された時点で
+    ダウンロード・保存します（その補助金の添付ファイルをまとめて保存）。
+
     使用例:
     1. get_subsidy_detail で補助金詳細を取得
     2. files フィールドから必要なファイル名を確認
-    3. このツールでファイル内容を取得
+    3. このツールでファイル内容を取得（大きなPDFは unit="pages", limit=10 などで分割取得）
     """
     try:
         # デバッグ: パラメータを確認
-        logger.info(f"get_file_content called with subsidy_id={subsidy_id}, filename={filename}, return_format={return_format}")
+        logger.info(
+            f"get_file_content called with subsidy_id={subsidy_id}, filename={filename}, "
+            f"return_format={return_format}, offset={offset}, limit={limit}, unit={unit}"
+        )
+
+        if offset < 0:
+            return {"error": "offset は0以上を指定してください"}
+        if limit is not None and limit <= 0:
+            return {"error": "limit は1以上を指定してください"}
+        if unit not in ("chars", "pages", "bytes"):
+            return {"error": "unit は chars / pages / bytes のいずれかを指定してください"}
+        requested_format = return_format
 
         file_path = FILES_DIR / subsidy_id / filename
         logger.info(f"Looking for file at: {file_path}")
 
-        if not file_path.exists():
+        # メタデータのみ取得した補助金の添付ファイルは、ここで初めてダウンロード・保存する
+        if not file_path.exists() and not await _materialize_attachment(subsidy_id, filename):
             return {"error": f"ファイルが見つかりません: {subsidy_id}/{filename}"}
 
         # MIMEタイプの判定
@@ -671,81 +2614,66 @@ async def get_file_content(subsidy_id: str, filename: str, return_format: str =
         # ファイルサイズを取得
         file_size = file_path.stat().st_size
 
-        # Markdown形式が要求された場合、MarkItDownで対応可能なファイル形式をチェック
-        if return_format == "markdown":
-            # MarkItDownがサポートする形式
-            supported_extensions = {
-                '.pdf', '.docx', '.doc', '.xlsx', '.xls', '.pptx', '.ppt',
-                '.html', '.htm', '.xml', '.rtf', '.txt', '.csv', '.md',
-                '.zip'  # ZIPファイルも対応
+        if unit == "pages" and (return_format != "markdown" or mime_type != "application/pdf"):
+            return {"error": "unit=\"pages\" はPDFのMarkdown取得でのみ指定できます"}
+        if unit == "bytes" and return_format == "markdown":
+            return {"error": "unit=\"bytes\" はbase64形式でのみ指定できます"}
+
+        # PDFのページ単位取得: 指定ページだけを抽出する
+        if unit == "pages":
+            try:
+                pages, total_pages = await _extract_pages_with_cache(file_path, offset, limit)
+            except (ConversionRejected, ConversionTimeout) as e:
+                return {"error": f"ページ抽出を中止しました: {e}"}
+            return {
+                "filename": filename,
+                "content_markdown": "\n\n---\n\n".join(f"## ページ {i + 1}\n\n{text}" for i, text in pages.items()),
+                "mime_type": mime_type,
+                "size_bytes": file_size,
+                "extraction_method": "pdfplumber_pages",
+                **_range_info("pages", offset, limit, len(pages), total_pages)
             }
 
+        # Markdown形式が要求された場合、MarkItDownで対応可能なファイル形式をチェック
+        if return_format == "markdown":
             file_extension = Path(filename).suffix.lower()
 
-            if file_extension in supported_extensions:
+            if file_extension in _MARKDOWN_EXTENSIONS:
                 try:
-                    # MarkItDownを使用してMarkdownに変換
-                    converter = MarkItDown()
-                    result = converter.convert(str(file_path))
-                    extracted_markdown = result.text_content
-
-                    if extracted_markdown and extracted_markdown.strip():
-                        logger.info(f"{file_extension}からMarkdownを抽出しました: {len(extracted_markdown)} 文字")
-                        return {
-                            "filename": filename,
-                            "content_markdown": extracted_markdown,
-                            "mime_type": mime_type,
-                            "size_bytes": file_size,
-                            "extraction_method": f"markitdown_{file_extension[1:]}"  # 拡張子から.を除去
-                        }
-                    else:
-                        logger.warning(f"{file_extension}からMarkdownの抽出に失敗しました。BASE64形式で返します。")
-                        return_format = "base64"  # フォールバック
-                except Exception as e:
-                    logger.error(f"MarkItDown変換エラー: {e}")
-                    # PDFの場合はpdfplumberにフォールバック
+                    converted = await _convert_with_cache(file_path, file_extension, mime_type)
+                except (ConversionRejected, ConversionTimeout) as e:
+                    hint = "return_format=\"base64\" を指定すると元ファイルを取得できます"
                     if mime_type == "application/pdf":
-                        try:
-                            with pdfplumber.open(file_path) as pdf:
-                                text_parts = []
-                                for i, page in enumerate(pdf.pages, 1):
-                                    page_text = page.extract_text()
-                                    if page_text:
-                                        text_parts.append(f"## ページ {i}\n\n{page_text}")
-                                extracted_markdown = "\n\n---\n\n".join(text_parts)
-
-                                if extracted_markdown and extracted_markdown.strip():
-                                    logger.info(f"pdfplumberでPDFからMarkdownを抽出しました: {len(extracted_markdown)} 文字")
-                                    return {
-                                        "filename": filename,
-                                        "content_markdown": extracted_markdown,
-                                        "mime_type": mime_type,
-                                        "size_bytes": file_size,
-                                        "extraction_method": "pdfplumber_markdown"
-                                    }
-                        except Exception as e2:
-                            logger.error(f"pdfplumber変換エラー: {e2}")
-                    return_format = "base64"  # フォールバック
+                        hint = "unit=\"pages\" と limit を指定するとページ単位で取得できます。" + hint
+                    return {"error": f"Markdown変換を中止しました: {e}", "hint": hint}
+                if converted is not None:
+                    extracted_markdown, extraction_method = converted
+                    return _markdown_slice(
+                        filename, extracted_markdown, mime_type, file_size, extraction_method, offset, limit
+                    )
+                return_format = "base64"  # フォールバック
 
         # テキストファイルの場合は直接読み込み
         if return_format == "markdown" and mime_type and mime_type.startswith("text/"):
             try:
                 with open(file_path, "r", encoding="utf-8") as f:
                     text_content = f.read()
-                return {
-                    "filename": filename,
-                    "content_markdown": text_content,
-                    "mime_type": mime_type,
-                    "size_bytes": file_size,
-                    "extraction_method": "text_file"
-                }
+                return _markdown_slice(filename, text_content, mime_type, file_size, "text_file", offset, limit)
             except Exception as e:
                 logger.error(f"テキストファイル読み込みエラー: {e}")
                 return_format = "base64"  # フォールバック
 
-        # その他のファイル形式の場合はBASE64
-        with open(file_path, "rb") as f:
-            content = f.read()
+        # その他のファイル形式の場合はBASE64（指定されたバイト範囲だけを読み込んでエンコード）
+        if unit == "chars" and (offset or limit):
+            if requested_format == "markdown":
+                # 文字数の範囲をバイトとして読むと next_cursor の意味が変わってしまうので断る
+                return {
+                    "error": "このファイルはMarkdownに変換できないため、文字数（unit=\"chars\"）で範囲を指定できません",
+                    "hint": "return_format=\"base64\" を指定し、offset / limit をバイト数で指定してください",
+                }
+            unit = "bytes"  # base64形式の offset / limit はバイト単位
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(_FILE_EXECUTOR, _read_byte_range, file_path, offset, limit)
 
         content_base64 = base64.b64encode(content).decode('utf-8')
 
@@ -754,7 +2682,8 @@ async def get_file_content(subsidy_id: str, filename: str, return_format: str =
             "content_base64": content_base64,
             "mime_type": mime_type,
             "size_bytes": len(content),
-            "data_uri": f"data:{mime_type};base64,{content_base64[:100]}..." if len(content_base64) > 100 else f"data:{mime_type};base64,{content_base64}"
+            "data_uri": f"data:{mime_type};base64,{content_base64[:100]}..." if len(content_base64) > 100 else f"data:{mime_type};base64,{content_base64}",
+            **_range_info("bytes", offset, limit, len(content), file_size)
         }
 
     except Exception as e:
@@ -762,6 +2691,152 @@ async def get_file_content(subsidy_id: str, filename: str, return_format: str =
         return {"error": f"ファイル読み込みエラー: {str(e)}"}
 
 
+def _markdown_slice(
+    filename: str,
+    markdown: str,
+    mime_type: str,
+    file_size: int,
+    extraction_method: str,
+    offset: int,
+    limit: Optional[int]
+) -> Dict[str, Any]:
+    """Markdownの指定範囲（文字数）だけを返す"""
+    content = markdown[offset:] if limit is None else markdown[offset:offset + limit]
+    return {
+        "filename": filename,
+        "content_markdown": content,
+        "mime_type": mime_type,
+        "size_bytes": file_size,
+        "extraction_method": extraction_method,
+        **_range_info("chars", offset, limit, len(content), len(markdown))
+    }
+
+
+# 添付ファイルの全文検索インデックス（FILES_DIR/.index.sqlite3）
+_INDEX_NAME = ".index.sqlite3"
+_ATTACHMENT_INDEX: Optional[AttachmentIndex] = None
+
+
+def _get_attachment_index() -> AttachmentIndex:
+    """共有インデックス（FILES_DIR が変わった場合は開き直す）"""
+    global _ATTACHMENT_INDEX
+    db_path = FILES_DIR / _INDEX_NAME
+    with _STORE_OPEN_LOCK:
+        if _ATTACHMENT_INDEX is None or _ATTACHMENT_INDEX.db_path != db_path:
+            if _ATTACHMENT_INDEX is not None:
+                _ATTACHMENT_INDEX.close()
+            _ATTACHMENT_INDEX = AttachmentIndex(db_path)
+        return _ATTACHMENT_INDEX
+
+
+def _scan_attachments(subsidy_id: Optional[str]) -> list:
+    """（ファイルI/O用スレッドで実行）索引対象のファイル [(path, subsidy_id, filename, content_key)]"""
+    entries = []
+    subsidy_dirs = [FILES_DIR / subsidy_id] if subsidy_id else sorted(FILES_DIR.iterdir())
+    for subsidy_dir in subsidy_dirs:
+        if not subsidy_dir.is_dir() or subsidy_dir.name.startswith("."):
+            continue
+        for file_path in sorted(subsidy_dir.iterdir()):
+            if (
+                file_path.is_file()
+                and not file_path.name.startswith(".")
+                and file_path.suffix.lower() in _MARKDOWN_EXTENSIONS
+            ):
+                entries.append((str(file_path), subsidy_dir.name, file_path.name, _content_key(file_path)))
+    return entries
+
+
+async def _index_attachment(index: AttachmentIndex, entry: Tuple[str, str, str, str]) -> None:
+    """1ファイルを変換（キャッシュ利用）して索引に登録する。PDFはページ単位で登録する"""
+    path, subsidy_id, filename, content_key = entry
+    file_path = Path(path)
+    chunks = []
+    try:
+        if file_path.suffix.lower() == ".pdf":
+            pages, _ = await _extract_pages_with_cache(file_path, 0, None)
+            chunks = [(i + 1, None, text) for i, text in pages.items() if text.strip()]
+        else:
+            import mimetypes
+            mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            converted = await _convert_with_cache(file_path, file_path.suffix.lower(), mime_type)
+            if converted is not None:
+                chunks = [(None, offset, text) for offset, text in chunk_text(converted[0])]
+    except Exception as e:
+        # 変換できないファイル（上限超過・タイムアウト・壊れたPDFなど）も空の文書として記録し、
+        # 内容が変わるまで再試行しない（1ファイルの失敗で検索全体を失敗させない）
+        logger.warning(f"全文検索インデックスに登録できませんでした: {path}: {e}")
+        chunks = []
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        _FILE_EXECUTOR, index.replace_document, path, subsidy_id, filename, content_key, chunks
+    )
+
+
+@mcp.tool()
+@_in_lane(lambda args: _SLOW_LANE)
+async def search_attachments(query: str, subsidy_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """
+    ダウンロード済みの添付ファイル（募集要項・申請様式など）を全文検索します。
+
+    get_subsidy_detail で保存されたファイルをMarkdownに変換して索引し、
+    キーワードを含む箇所を関連度の高い順に返します。ファイルを1つずつ get_file_content で
+    読む代わりに、どの補助金のどのファイル・ページに記載があるかを一度に調べられます。
+    新しいファイル・内容が変わったファイルは検索時に自動で索引に追加されます。
+
+    パラメータ:
+    - query: 検索語（必須）。空白区切りで複数指定するとすべてを含む箇所を返します（例: "賃上げ 加点"）
+    - subsidy_id: 指定した補助金のファイルだけを検索（省略時は全補助金）
+    - limit: 返す件数（1〜100、デフォルト20）
+
+    戻り値:
+    {
+        "query": str,
+        "results": [
+            {
+                "subsidy_id": str,
+                "filename": str,
+                "page": int | null,        # PDFのページ番号（1始まり）
+                "char_offset": int | null, # PDF以外の場合、Markdown内の文字位置
+                "score": float,            # 関連度（BM25、大きいほど関連が高い）
+                "snippet": str             # 一致箇所の前後（一致部分は **強調**）
+            }
+        ],
+        "indexed_files": int,              # 索引済みのファイル数
+        "newly_indexed": int               # 今回の検索で索引に追加・更新したファイル数
+    }
+
+    続きを読む場合は get_file_content に offset=page-1, limit=1, unit="pages"（PDF）
+    または offset=char_offset（その他）を指定してください。
+    """
+    if not query or not query.strip():
+        return {"error": "検索語を指定してください"}
+    if not 1 <= limit <= 100:
+        return {"error": "limit は1〜100の範囲で指定してください"}
+    if subsidy_id is not None and not (FILES_DIR / subsidy_id).is_dir():
+        return {"error": f"補助金ID '{subsidy_id}' のファイルは保存されていません。先に get_subsidy_detail を実行してください"}
+
+    try:
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(_FILE_EXECUTOR, _get_attachment_index)
+        entries = await loop.run_in_executor(_FILE_EXECUTOR, _scan_attachments, subsidy_id)
+        stale = await loop.run_in_executor(_FILE_EXECUTOR, index.stale_documents, entries, subsidy_id)
+        if stale:
+            logger.info(f"全文検索インデックスを更新します: {len(stale)} ファイル")
+            await asyncio.gather(*[_index_attachment(index, entry) for entry in stale])
+
+        results = await loop.run_in_executor(_FILE_EXECUTOR, index.search, query, subsidy_id, limit)
+        stats = await loop.run_in_executor(_FILE_EXECUTOR, index.stats)
+        return {
+            "query": query,
+            "results": results,
+            "indexed_files": stats["documents"],
+            "newly_indexed": len(stale)
+        }
+    except Exception as e:
+        logger.error(f"search_attachments error: {e}", exc_info=True)
+        return {"error": f"全文検索エラー: {str(e)}"}
+
+
 
 
 
@@ -846,6 +2921,129 @@ async def usage_guidelines():
 - エラーが発生した場合は時間を置いて再試行してください
 """
 
+# ========================================
+# サーバーのライフサイクル（起動時のウォームアップ・終了時の後片付け）
+# ========================================
+
+# 起動時に上流APIへあらかじめ開いておく接続の数（DNS・TLSハンドシェイクを最初の利用者に待たせない）。0で開かない
+_WARMUP_CONNECTIONS = max(0, _env_int("JGRANTS_WARMUP_CONNECTIONS", 2))
+# 起動時にカタログを同期しておく（未同期・同期の間隔より古い場合のみ）。
+# 未同期なら一覧の全件取得になり、再起動のたびに上流へ負荷をかけるので既定では行わない
+_WARMUP_CATALOG = _env_flag("JGRANTS_WARMUP_CATALOG", False)
+# ウォームアップを待つ上限（秒）。超えたら打ち切って ready にする
+_WARMUP_TIMEOUT = _env_float("JGRANTS_WARMUP_TIMEOUT", 30.0)
+# 起動後に変換ワーカーへ markitdown / pdfplumber を読み込ませておく（既定では最初の変換時に読み込む）
+_PRELOAD_CONVERTERS = _env_flag("JGRANTS_PRELOAD_CONVERTERS", False)
+# /healthz が返す状態
+_READINESS: Dict[str, Any] = {"ready": False, "started_at": None, "ready_at": None, "warmup": None}
+
+
+async def _warm_connections(count: int) -> int:
+    """上流APIへ count 本の接続を同時に開いてプールに残す（開けた本数を返す）。
+
+    接続を開くだけの HEAD なので _UPSTREAM（レート制限・サーキットブレーカー）を通さず、再試行もしない
+    （起動直後の失敗でブレーカーを開いたり、利用者の呼び出しの送信枠を使ったりしない）。
+    """
+    client = _get_http_client()
+
+    async def open_one() -> bool:
+        try:
+            resp = await client.head(API_BASE_URL)
+        except Exception as e:
+            logger.warning(f"ウォームアップの接続に失敗しました: {e}")
+            return False
+        _count_response(resp)
+        return True
+
+    # Keep-Alive で残せる数より多く開いても閉じられるだけ
+    results = await asyncio.gather(*(open_one() for _ in range(min(count, _HTTP_MAX_KEEPALIVE))))
+    return sum(results)
+
+
+async def _warm_up() -> None:
+    """接続とカタログを温めてから ready にする（失敗しても ready にする）"""
+    started = time.monotonic()
+    summary: Dict[str, Any] = {"connections": 0, "catalog": None}
+
+    async def run() -> None:
+        if _WARMUP_CONNECTIONS > 0:
+            summary["connections"] = await _warm_connections(_WARMUP_CONNECTIONS)
+        if _WARMUP_CATALOG:
+            error = await _ensure_catalog()
+            summary["catalog"] = error["error"] if error else "ok"
+
+    try:
+        await asyncio.wait_for(run(), timeout=_WARMUP_TIMEOUT if _WARMUP_TIMEOUT > 0 else None)
+    except asyncio.TimeoutError:
+        summary["timed_out"] = True
+        logger.warning(f"ウォームアップが{_WARMUP_TIMEOUT:g}秒で終わらなかったため打ち切りました")
+    except Exception as e:
+        summary["error"] = str(e)
+        logger.exception("ウォームアップでエラーが発生しました")
+    summary["duration_seconds"] = round(time.monotonic() - started, 3)
+    _READINESS.update(ready=True, ready_at=datetime.now(timezone.utc).isoformat(), warmup=summary)
+    logger.info(f"ウォームアップが完了しました: {summary}")
+
+
+async def _preload_converters() -> None:
+    """変換ワーカーを起動してライブラリを読み込ませる（ready の判定には含めない）"""
+    started = time.monotonic()
+    try:
+        workers = await _CONVERTER.preload()
+    except Exception:
+        logger.exception("変換ライブラリの事前読み込みに失敗しました")
+        return
+    logger.info(f"変換ライブラリを読み込みました（ワーカー {workers} 個, {time.monotonic() - started:.2f}秒）")
+
+
+async def startup() -> None:
+    """起動時: 共有HTTPクライアントをこのイベントループで作り、裏でウォームアップする"""
+    _READINESS.update(ready=False, started_at=datetime.now(timezone.utc).isoformat(), ready_at=None, warmup=None)
+    _get_http_client()
+    _run_in_background(_warm_up())
+    if _PRELOAD_CONVERTERS:
+        _run_in_background(_preload_converters())
+
+
+async def shutdown() -> None:
+    """終了時: 裏の処理を止め、共有HTTPクライアントの接続と変換ワーカーを閉じる"""
+    global _HTTP_CLIENT, _HTTP_CLIENT_LOOP, _HTTP_TRANSPORT
+    _READINESS["ready"] = False
+    tasks = list(_BACKGROUND_TASKS)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+    _HTTP_CLIENT = _HTTP_CLIENT_LOOP = _HTTP_TRANSPORT = None
+    # 変換ワーカー（プロセス）を残さない。終了を待たず、未着手の変換は取り消す（次に使うときに作り直す）
+    _CONVERTER.shutdown(wait=False)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Any = None):
+    """ASGIアプリ（FastMCP / Gradio）の lifespan: 起動時に startup()、終了時に shutdown()"""
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+
+def health() -> Tuple[int, Dict[str, Any]]:
+    """ヘルスチェックの (HTTPステータス, 本文)。ウォームアップが終わるまでは 503"""
+    return (200 if _READINESS["ready"] else 503), {
+        "status": "ready" if _READINESS["ready"] else "warming_up",
+        **_READINESS,
+    }
+
+
+@mcp.custom_route("/healthz", methods=["GET"])
+async def healthz(request: Request) -> JSONResponse:
+    status, body = health()
+    return JSONResponse(body, status_code=status)
+
+
 def main():
     """メインエントリーポイント（Streamable HTTPサーバーモード）"""
     import argparse
@@ -860,11 +3058,26 @@ def main():
     mcp.run(transport="streamable-http", host=args.host, port=args.port)
 
 
-# ASGIアプリケーションをエクスポート
-app = mcp.http_app()
-# FastMCPアプリケーションの名前を設定
-if hasattr(app, '__setattr__'):
-    app.name = "jgrants-mcp-server"
+# ASGIアプリケーション（uvicorn jgrants_mcp_server.core:app などで参照された時点で作る）
+_APP: Optional[Any] = None
+
+
+def create_app() -> Any:
+    """FastMCP の ASGIアプリを返す（import 時には作らず、最初の呼び出しで1回だけ作る）"""
+    global _APP
+    if _APP is None:
+        _APP = mcp.http_app()
+        # FastMCPアプリケーションの名前を設定
+        if hasattr(_APP, '__setattr__'):
+            _APP.name = "jgrants-mcp-server"
+    return _APP
+
+
+def __getattr__(name: str) -> Any:
+    # 従来どおり core.app でASGIアプリを参照できるようにする
+    if name == "app":
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
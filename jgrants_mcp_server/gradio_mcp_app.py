@@ -4,37 +4,72 @@ This module provides both a web UI and MCP server functionality using Gradio 5's
 Simply launch with mcp_server=True to enable both modes simultaneously.
 """
 
-import gradio as gr
 import asyncio
+import contextlib
+import gradio as gr
 import json
 import pandas as pd
-from typing import Dict, Any, Optional, Tuple
-from datetime import datetime
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from datetime import datetime, timezone
 from pathlib import Path
 
+from . import core
+from .lanes import ConcurrencyLane, LaneFull
+
 # Import core functions
 from .core import (
+    _SEARCH_MAX_PAGE_SIZE,
+    _SEARCH_PAGE_SIZE,
+    _env_int,
+    _get_subsidy_detail,
+    _next_search_page,
+    _search_page,
+    _search_subsidies,
     _search_subsidies_internal,
     get_subsidy_detail,
     get_subsidy_overview,
     get_file_content,
+    get_server_stats,
+    search_attachments,
     ping,
+    health,
+    lifespan,
     FILES_DIR
 )
 
+# FastMCP 2.x の @mcp.tool() は FunctionTool を返すため、元のコルーチン関数を取り出して呼ぶ
+get_subsidy_detail = getattr(get_subsidy_detail, "fn", get_subsidy_detail)
+get_subsidy_overview = getattr(get_subsidy_overview, "fn", get_subsidy_overview)
+get_file_content = getattr(get_file_content, "fn", get_file_content)
+ping = getattr(ping, "fn", ping)
+get_server_stats = getattr(get_server_stats, "fn", get_server_stats)
+search_attachments = getattr(search_attachments, "fn", search_attachments)
+
+# ストリーミング検索で、表を表示した後に詳細（業種・添付ファイル数）を先読みする上位の件数。0で先読みしない。
+# 検索1回ごとに上流への詳細取得がこの件数だけ増えるため、既定では先読みしない
+_PREFETCH_DETAILS = max(0, _env_int("JGRANTS_UI_PREFETCH_DETAILS", 0))
+# 先読みの同時実行数
+_PREFETCH_CONCURRENCY = 3
+# Gradio の待ち行列に溜められるイベントの数（超えたら「混雑中」で断る）。0で無制限
+_UI_QUEUE_MAX_SIZE = max(0, _env_int("JGRANTS_UI_QUEUE_MAX_SIZE", 128))
+
 
 # ========================================
-# Sync wrapper functions for Gradio
+# Async wrapper functions for Gradio
 # ========================================
+# Gradioは async 関数をサーバーのイベントループ上でそのまま実行する。
+# asyncio.run() でリクエストごとにループを作り直すと、共有HTTPクライアントの
+# Keep-Alive接続が閉じたループに取り残されるため、ここでは常に await する。
 
-def search_subsidies(
+async def search_subsidies(
     keyword: str,
     industry: str = "",
     target_area: str = "",
     employees: str = "",
     sort: str = "acceptance_end_datetime",
     order: str = "ASC",
-    acceptance: int = 1
+    acceptance: int = 1,
+    source: str = "api"
 ) -> Tuple[str, pd.DataFrame]:
     """
     補助金を検索します。
@@ -47,53 +82,224 @@ def search_subsidies(
         sort: ソート順（acceptance_end_datetime/acceptance_start_datetime/created_date）
         order: 昇順/降順（ASC/DESC）
         acceptance: 受付状態（0=全て、1=受付中のみ）
+        source: 検索先（api=JグランツAPI、local=ローカルカタログ、auto=API失敗時にローカル）
 
     Returns:
         検索結果のサマリーとデータフレーム
     """
     try:
-        result = asyncio.run(_search_subsidies_internal(
-            keyword=keyword or "事業",
-            industry=industry if industry else None,
-            target_area_search=target_area if target_area else None,
-            target_number_of_employees=employees if employees else None,
-            sort=sort,
-            order=order,
-            acceptance=acceptance
-        ))
+        result = await _run_search(keyword, industry, target_area, employees, sort, order, acceptance, source)
 
         if "error" in result:
             return f"❌ エラー: {result['error']}", pd.DataFrame()
 
-        subsidies = result.get("subsidies", [])
-        total = result.get("total_count", 0)
-
-        if total == 0:
+        if result.get("total_count", 0) == 0:
             return "⚠️ 検索結果が見つかりませんでした。", pd.DataFrame()
 
-        # テーブル用データを作成
-        table_data = []
-        for s in subsidies[:50]:
-            table_data.append({
-                "ID": s.get("id", ""),
-                "タイトル": s.get("title", ""),
-                "受付開始": s.get("acceptance_start_datetime", "")[:10] if s.get("acceptance_start_datetime") else "",
-                "受付終了": s.get("acceptance_end_datetime", "")[:10] if s.get("acceptance_end_datetime") else "",
-                "補助上限額": s.get("subsidy_max_limit", ""),
-                "対象地域": s.get("target_area_search", ""),
-            })
+        page = _search_page(result, _SEARCH_PAGE_SIZE)
+        return _search_summary(page), pd.DataFrame(_table_rows(page["subsidies"]))
 
-        df = pd.DataFrame(table_data)
-        summary = f"✅ 検索結果: {total}件（最初の{min(50, total)}件を表示）\n"
-        summary += f"📋 検索条件: {json.dumps(result.get('search_conditions', {}), ensure_ascii=False, indent=2)}"
+    except Exception as e:
+        return f"❌ エラーが発生しました: {str(e)}", pd.DataFrame()
+
+
+async def search_subsidies_stream(
+    keyword: str,
+    industry: str = "",
+    target_area: str = "",
+    employees: str = "",
+    sort: str = "acceptance_end_datetime",
+    order: str = "ASC",
+    acceptance: int = 1,
+    source: str = "api",
+    page_size: int = _SEARCH_PAGE_SIZE
+) -> AsyncIterator[Tuple[str, pd.DataFrame, str]]:
+    """
+    補助金を検索します（結果が届いた段階から順に表示を更新します）。
 
-        return summary, df
+    Args:
+        keyword: 検索キーワード（必須、2文字以上）
+        industry: 業種（オプション）
+        target_area: 対象地域（オプション）
+        employees: 従業員数制約（オプション）
+        sort: ソート順（acceptance_end_datetime/acceptance_start_datetime/created_date）
+        order: 昇順/降順（ASC/DESC）
+        acceptance: 受付状態（0=全て、1=受付中のみ）
+        source: 検索先（api=JグランツAPI、local=ローカルカタログ、auto=API失敗時にローカル）
+        page_size: 1ページの件数
 
+    Returns:
+        検索結果のサマリー、1ページ目のデータフレーム、次のページのカーソル（最後のページなら空文字）。
+        最後に返すものが最終結果
+    """
+    yield "🔍 検索中...", pd.DataFrame(), ""
+    try:
+        result = await _run_search(keyword, industry, target_area, employees, sort, order, acceptance, source)
     except Exception as e:
-        return f"❌ エラーが発生しました: {str(e)}", pd.DataFrame()
+        yield f"❌ エラーが発生しました: {str(e)}", pd.DataFrame(), ""
+        return
+
+    if "error" in result:
+        yield f"❌ エラー: {result['error']}", pd.DataFrame(), ""
+        return
+    if result.get("total_count", 0) == 0:
+        yield "⚠️ 検索結果が見つかりませんでした。", pd.DataFrame(), ""
+        return
+
+    page = _search_page(result, _page_size(page_size))
+    async for summary, df in _stream_page(page):
+        yield summary, df, page["next_cursor"] or ""
+
+
+async def search_subsidies_next_page(
+    cursor: str,
+    page_size: int = _SEARCH_PAGE_SIZE
+) -> AsyncIterator[Tuple[str, pd.DataFrame, str]]:
+    """
+    検索結果の次のページを表示します。
 
+    Args:
+        cursor: 前のページで返された次のページのカーソル
+        page_size: 1ページの件数
 
-def get_detail(subsidy_id: str) -> str:
+    Returns:
+        検索結果のサマリー、そのページのデータフレーム、次のページのカーソル（最後のページなら空文字）
+    """
+    if not cursor:
+        yield "⚠️ 次のページはありません。検索を実行してください。", pd.DataFrame(), ""
+        return
+    page = _next_search_page(cursor, _page_size(page_size))
+    if "error" in page:
+        yield f"❌ エラー: {page['error']}", pd.DataFrame(), ""
+        return
+    async for summary, df in _stream_page(page):
+        yield summary, df, page["next_cursor"] or ""
+
+
+def _page_size(value: Any) -> int:
+    """UI・MCPから渡された件数を1〜上限に収める"""
+    try:
+        return max(1, min(int(value), _SEARCH_MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return _SEARCH_PAGE_SIZE
+
+
+async def _stream_page(page: Dict[str, Any]) -> AsyncIterator[Tuple[str, pd.DataFrame]]:
+    """検索結果の1ページを表にする。まず一覧の内容だけで表を出し、上位の補助金の詳細は届いた順に埋める"""
+    summary = _search_summary(page)
+    rows = _table_rows(page.get("subsidies", []))
+    targets = [row for row in rows if row["ID"]][:_PREFETCH_DETAILS]
+    pending = {row["ID"] for row in targets}
+    for row in rows:
+        row["業種"] = row["添付"] = "⏳" if row["ID"] in pending else ""
+    if not targets:
+        yield summary, pd.DataFrame(rows)
+        return
+    yield f"{summary}\n⏳ 上位{len(targets)}件の詳細を取得中...", pd.DataFrame(rows)
+
+    semaphore = asyncio.Semaphore(_PREFETCH_CONCURRENCY)
+
+    async def prefetch(row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        async with semaphore:
+            try:
+                # 添付ファイルは保存しない（取得した詳細はローカルカタログにも記録される）。
+                # メタデータのみの詳細と同じく fast レーンで、利用者が待っている呼び出しより後に実行する
+                async with core._FAST_LANE.slot("get_subsidy_detail", core._PRIORITY_BACKGROUND):
+                    return row, await _get_subsidy_detail(row["ID"], download_files=False)
+            except Exception as e:
+                return row, {"error": str(e)}
+
+    tasks = [asyncio.ensure_future(prefetch(row)) for row in targets]
+    try:
+        for done, future in enumerate(asyncio.as_completed(tasks), 1):
+            row, detail = await future
+            if "error" in detail:
+                row["業種"] = row["添付"] = "❌"
+            else:
+                row["業種"] = (detail.get("target") or {}).get("industry") or ""
+                row["添付"] = sum(len(files) for files in (detail.get("files") or {}).values())
+            progress = "" if done == len(targets) else f"\n⏳ 上位{len(targets)}件の詳細を取得中... ({done}/{len(targets)})"
+            yield summary + progress, pd.DataFrame(rows)
+    finally:
+        # 新しい検索などで打ち切られた場合は残りの先読みもやめる
+        for task in tasks:
+            task.cancel()
+
+
+async def _run_search(
+    keyword: str,
+    industry: str,
+    target_area: str,
+    employees: str,
+    sort: str,
+    order: str,
+    acceptance: int,
+    source: str
+) -> Dict[str, Any]:
+    """Web UI の入力で検索する（source=api は検索先の切り替えを通さずに直接呼ぶ。どちらも fast レーンで実行する）。
+
+    ページ分けは呼び出し側（_search_page）で行うため、ツールではなくページ分けしない内部関数を使う。
+    """
+    conditions = dict(
+        keyword=keyword or "事業",
+        industry=industry if industry else None,
+        target_area_search=target_area if target_area else None,
+        target_number_of_employees=employees if employees else None,
+        sort=sort,
+        order=order,
+        acceptance=acceptance
+    )
+    try:
+        async with core._FAST_LANE.slot("search_subsidies", core._PRIORITY_INTERACTIVE):
+            if source == "api":
+                return await _search_subsidies_internal(**conditions)
+            return await _search_subsidies(**conditions, source=source)
+    except LaneFull as e:
+        return {"error": str(e)}
+
+
+def _days_left(value: Optional[str], now: Optional[datetime] = None) -> Any:
+    """受付終了日時までの残り日数（終了済みは「終了」、日時がなければ空欄）"""
+    if not value:
+        return ""
+    try:
+        end = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return ""
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    days = (end - (now or datetime.now(timezone.utc))).days
+    return "終了" if days < 0 else days
+
+
+def _table_rows(subsidies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """検索結果をテーブルの行にする"""
+    table_data = []
+    for s in subsidies:
+        table_data.append({
+            "ID": s.get("id", ""),
+            "タイトル": s.get("title", ""),
+            "受付開始": s.get("acceptance_start_datetime", "")[:10] if s.get("acceptance_start_datetime") else "",
+            "受付終了": s.get("acceptance_end_datetime", "")[:10] if s.get("acceptance_end_datetime") else "",
+            "残り日数": _days_left(s.get("acceptance_end_datetime")),
+            "補助上限額": s.get("subsidy_max_limit", ""),
+            "対象地域": s.get("target_area_search", ""),
+        })
+    return table_data
+
+
+def _search_summary(page: Dict[str, Any]) -> str:
+    """検索結果の1ページ（_search_page の戻り値）のサマリー"""
+    total = page.get("total_count", 0)
+    offset = page["page"]["offset"]
+    summary = f"✅ 検索結果: {total}件（{offset + 1}〜{offset + page['page']['returned']}件目を表示）\n"
+    if page.get("source") == "local":
+        summary += f"🗂️ ローカルカタログから検索（同期: {page.get('catalog_synced_at') or '未同期'}）\n"
+    summary += f"📋 検索条件: {json.dumps(page.get('search_conditions', {}), ensure_ascii=False, indent=2)}"
+    return summary
+
+
+async def get_detail(subsidy_id: str) -> str:
     """
     補助金の詳細情報を取得します。
 
@@ -107,7 +313,7 @@ def get_detail(subsidy_id: str) -> str:
         if not subsidy_id or not subsidy_id.strip():
             return "⚠️ 補助金IDを入力してください。"
 
-        result = asyncio.run(get_subsidy_detail(subsidy_id.strip()))
+        result = await get_subsidy_detail(subsidy_id.strip())
 
         if "error" in result:
             return f"❌ エラー: {result['error']}"
@@ -160,7 +366,7 @@ def get_detail(subsidy_id: str) -> str:
         return f"❌ エラーが発生しました: {str(e)}"
 
 
-def get_overview(output_format: str = "json") -> str:
+async def get_overview(output_format: str = "json") -> str:
     """
     補助金の統計情報を取得します。
 
@@ -171,7 +377,7 @@ def get_overview(output_format: str = "json") -> str:
         統計情報（Markdown形式）
     """
     try:
-        result = asyncio.run(get_subsidy_overview(output_format))
+        result = await get_subsidy_overview(output_format)
 
         if "error" in result:
             return f"❌ エラー: {result['error']}"
@@ -231,7 +437,7 @@ def get_overview(output_format: str = "json") -> str:
         return f"❌ エラーが発生しました: {str(e)}"
 
 
-def get_file(subsidy_id: str, filename: str, return_format: str = "markdown") -> str:
+async def get_file(subsidy_id: str, filename: str, return_format: str = "markdown") -> str:
     """
     保存されたファイルの内容を取得します。
 
@@ -247,11 +453,11 @@ def get_file(subsidy_id: str, filename: str, return_format: str = "markdown") ->
         if not subsidy_id or not filename:
             return "⚠️ 補助金IDとファイル名を入力してください。"
 
-        result = asyncio.run(get_file_content(
+        result = await get_file_content(
             subsidy_id.strip(),
             filename.strip(),
             return_format
-        ))
+        )
 
         if "error" in result:
             return f"❌ エラー: {result['error']}"
@@ -275,6 +481,40 @@ def get_file(subsidy_id: str, filename: str, return_format: str = "markdown") ->
         return f"❌ エラーが発生しました: {str(e)}"
 
 
+async def search_files(query: str, subsidy_id: str = "") -> str:
+    """
+    ダウンロード済みファイルを全文検索します。
+
+    Args:
+        query: 検索語（空白区切りで複数指定するとすべてを含む箇所を検索）
+        subsidy_id: 補助金ID（空欄の場合は全補助金のファイルを検索）
+
+    Returns:
+        一致したファイル・ページと該当箇所の抜粋
+    """
+    try:
+        if not query or not query.strip():
+            return "⚠️ 検索語を入力してください。"
+
+        result = await search_attachments(query.strip(), subsidy_id.strip() or None)
+
+        if "error" in result:
+            return f"❌ エラー: {result['error']}"
+
+        results = result.get("results", [])
+        output = f"# 🔎 「{query.strip()}」の検索結果: {len(results)}件\n\n"
+        output += f"索引済みファイル: {result.get('indexed_files', 0)}件"
+        output += f"（今回追加・更新: {result.get('newly_indexed', 0)}件）\n\n"
+        for hit in results:
+            location = f"p.{hit['page']}" if hit.get("page") else f"{hit.get('char_offset', 0):,}文字目〜"
+            output += f"### `{hit['subsidy_id']}` / `{hit['filename']}` ({location})\n\n"
+            output += f"> {hit['snippet']}\n\n"
+        return output
+
+    except Exception as e:
+        return f"❌ エラーが発生しました: {str(e)}"
+
+
 def list_files() -> str:
     """ダウンロード済みファイルの一覧を表示します。"""
     try:
@@ -284,12 +524,13 @@ def list_files() -> str:
         output = "# 📁 ダウンロード済みファイル一覧\n\n"
         output += f"保存先: `{FILES_DIR}`\n\n"
 
-        subsidy_dirs = [d for d in FILES_DIR.iterdir() if d.is_dir()]
+        # ".manifest.json" などの管理用ファイルは表示しない
+        subsidy_dirs = [d for d in FILES_DIR.iterdir() if d.is_dir() and not d.name.startswith(".")]
         if not subsidy_dirs:
             return output + "\n⚠️ まだファイルがダウンロードされていません。"
 
         for subsidy_dir in sorted(subsidy_dirs, key=lambda x: x.name):
-            files = list(subsidy_dir.iterdir())
+            files = [f for f in subsidy_dir.iterdir() if not f.name.startswith(".")]
             if files:
                 output += f"## 補助金ID: `{subsidy_dir.name}`\n\n"
                 for file in sorted(files, key=lambda x: x.name):
@@ -303,15 +544,24 @@ def list_files() -> str:
         return f"❌ エラーが発生しました: {str(e)}"
 
 
-def server_ping() -> str:
+async def server_ping() -> str:
     """サーバーの疎通確認を行います。"""
     try:
-        result = asyncio.run(ping())
+        result = await ping()
         return "✅ **サーバー稼働中**\n\n```json\n" + json.dumps(result, ensure_ascii=False, indent=2) + "\n```"
     except Exception as e:
         return f"❌ エラー: {str(e)}"
 
 
+async def server_stats() -> str:
+    """サーバー内部の統計情報（キャッシュのヒット率など）を表示します。"""
+    try:
+        result = await get_server_stats()
+        return "📈 **サーバー統計**\n\n```json\n" + json.dumps(result, ensure_ascii=False, indent=2) + "\n```"
+    except Exception as e:
+        return f"❌ エラー: {str(e)}"
+
+
 # ========================================
 # Gradio UI Definition
 # ========================================
@@ -392,16 +642,42 @@ def create_gradio_app():
                         choices=[("昇順", "ASC"), ("降順", "DESC")],
                         value="ASC"
                     )
+                    source_input = gr.Radio(
+                        label="検索先",
+                        choices=[("JグランツAPI", "api"), ("ローカルカタログ", "local"), ("自動", "auto")],
+                        value="api"
+                    )
+                    page_size_input = gr.Dropdown(
+                        label="表示件数",
+                        choices=sorted({25, 50, 100, _SEARCH_PAGE_SIZE}),
+                        value=_SEARCH_PAGE_SIZE
+                    )
 
                 search_btn = gr.Button("🔍 検索実行", variant="primary", size="lg")
                 search_output = gr.Textbox(label="検索結果サマリー", lines=5)
-                search_table = gr.Dataframe(label="検索結果テーブル", interactive=False)
-
+                # 1ページ分だけを送り、表はスクロール表示にする（大量の行を一度に描画しない）
+                search_table = gr.Dataframe(label="検索結果テーブル", interactive=False, max_height=600)
+                next_page_btn = gr.Button("▶ 次のページ", size="sm")
+                # 次のページのカーソル（検索結果はサーバー側に保存し、ページごとに取り出す）
+                next_cursor = gr.Textbox(visible=False)
+
+                # 結果が届いた段階から表示し、上位の詳細は取得できた順に表へ埋める
+                # （MCPクライアントには同じ名前のツールとして公開され、途中経過は進捗通知になる）
                 search_btn.click(
-                    fn=search_subsidies,
+                    fn=search_subsidies_stream,
                     inputs=[keyword_input, industry_input, target_area_input,
-                           employees_input, sort_input, order_input, acceptance_input],
-                    outputs=[search_output, search_table]
+                           employees_input, sort_input, order_input, acceptance_input, source_input,
+                           page_size_input],
+                    outputs=[search_output, search_table, next_cursor],
+                    api_name="search_subsidies",
+                    **_lane_options(core._FAST_LANE)
+                )
+                next_page_btn.click(
+                    fn=search_subsidies_next_page,
+                    inputs=[next_cursor, page_size_input],
+                    outputs=[search_output, search_table, next_cursor],
+                    api_name="search_subsidies_next_page",
+                    **_lane_options(core._FAST_LANE)
                 )
 
             # Tab 2: Detail
@@ -417,7 +693,8 @@ def create_gradio_app():
                 detail_btn.click(
                     fn=get_detail,
                     inputs=[subsidy_id_input],
-                    outputs=[detail_output]
+                    outputs=[detail_output],
+                    **_lane_options(core._SLOW_LANE)
                 )
 
             # Tab 3: Statistics
@@ -434,7 +711,8 @@ def create_gradio_app():
                 stats_btn.click(
                     fn=get_overview,
                     inputs=[format_input],
-                    outputs=[stats_output]
+                    outputs=[stats_output],
+                    **_lane_options(core._FAST_LANE)
                 )
 
             # Tab 4: File Access
@@ -457,7 +735,8 @@ def create_gradio_app():
                 file_btn.click(
                     fn=get_file,
                     inputs=[file_subsidy_id, file_filename, file_format],
-                    outputs=[file_output]
+                    outputs=[file_output],
+                    **_lane_options(core._SLOW_LANE)
                 )
 
                 gr.Markdown("---")
@@ -466,7 +745,23 @@ def create_gradio_app():
 
                 list_files_btn.click(
                     fn=list_files,
-                    outputs=[files_list_output]
+                    outputs=[files_list_output],
+                    **_lane_options(core._FAST_LANE)
+                )
+
+                gr.Markdown("---")
+                gr.Markdown("### ダウンロード済みファイルを全文検索")
+                with gr.Row():
+                    file_search_query = gr.Textbox(label="検索語", placeholder="例: 賃上げ 加点", scale=3)
+                    file_search_subsidy_id = gr.Textbox(label="補助金ID（任意）", scale=2)
+                file_search_btn = gr.Button("🔎 全文検索", size="lg")
+                file_search_output = gr.Markdown(label="検索結果")
+
+                file_search_btn.click(
+                    fn=search_files,
+                    inputs=[file_search_query, file_search_subsidy_id],
+                    outputs=[file_search_output],
+                    **_lane_options(core._SLOW_LANE)
                 )
 
             # Tab 5: Server Info
@@ -477,7 +772,17 @@ def create_gradio_app():
 
                 ping_btn.click(
                     fn=server_ping,
-                    outputs=[ping_output]
+                    outputs=[ping_output],
+                    **_lane_options(core._FAST_LANE)
+                )
+
+                stats_info_btn = gr.Button("📈 サーバー統計", size="lg")
+                stats_info_output = gr.Markdown(label="サーバー統計")
+
+                stats_info_btn.click(
+                    fn=server_stats,
+                    outputs=[stats_info_output],
+                    **_lane_options(core._FAST_LANE)
                 )
 
                 gr.Markdown("""
@@ -500,6 +805,29 @@ def create_gradio_app():
     return demo
 
 
+def _lane_options(lane: ConcurrencyLane) -> Dict[str, Any]:
+    """イベントをレーン名の concurrency_id にまとめる。
+
+    同時実行数・優先度・ツールごとの上限はイベントが呼ぶツールのレーンで制限するので、Gradio 側では制限しない
+    （Gradio でも同じ数に絞ると、MCP経由の呼び出しとの二重の待ちになり、優先度の順にも並ばない）。
+    """
+    return {"concurrency_id": lane.name, "concurrency_limit": None}
+
+
+@contextlib.asynccontextmanager
+async def _app_lifespan(app):
+    """Gradio(FastAPI)アプリの lifespan: /healthz を追加し、共有HTTPクライアントの起動・終了を行う"""
+    from fastapi.responses import JSONResponse
+
+    async def healthz():
+        status, body = health()
+        return JSONResponse(body, status_code=status)
+
+    app.add_api_route("/healthz", healthz, methods=["GET"], include_in_schema=False)
+    async with lifespan(app):
+        yield
+
+
 def launch_app(
     server_name: str = "0.0.0.0",
     server_port: int = 7860,
@@ -516,6 +844,10 @@ def launch_app(
         mcp_server: Enable MCP server mode (Gradio 5.32.0+)
     """
     demo = create_gradio_app()
+    demo.queue(
+        max_size=_UI_QUEUE_MAX_SIZE or None,
+        default_concurrency_limit=None,
+    )
 
     print("=" * 60)
     print("🚀 Jグランツ補助金検索システム")
@@ -530,7 +862,11 @@ def launch_app(
         server_name=server_name,
         server_port=server_port,
         share=share,
-        mcp_server=mcp_server  # Gradio 5.32.0+ native MCP support
+        mcp_server=mcp_server,  # Gradio 5.32.0+ native MCP support
+        # 両方のレーンが同時実行数いっぱいまで動けるだけのワーカーを用意する
+        max_threads=max(40, core._FAST_LANE.limit + core._SLOW_LANE.limit),
+        # 起動時に上流APIへの接続を温め、終了時に閉じる（ウォームアップ完了までは /healthz が 503）
+        app_kwargs={"lifespan": _app_lifespan},
     )
 
 
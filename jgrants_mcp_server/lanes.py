@@ -0,0 +1,178 @@
+"""ツール呼び出しの同時実行数の制限と待ち行列（レーン）
+
+軽いツール（検索・統計など）と重いツール（添付ファイルのダウンロード・変換）を別のレーンで実行し、
+重い処理が混み合っても軽いツールの応答時間が延びないようにする。
+
+- ConcurrencyLane: 同時に実行できる数（limit）を超えた呼び出しは待たせ、優先度（priority が小さいほど先）の順、
+  同じ優先度なら先着順に実行する。待ちが max_queue 件に達している・queue_timeout 秒待っても始められない場合は LaneFull で断る。
+- tool_limits でツールごとの同時実行数も制限できる（上限に達したツールの呼び出しは待ち、空いている枠は他のツールに回す）。
+- 待ち行列はイベントループに紐付かない（asyncio.Semaphore と違い、複数のループから使える）。
+"""
+
+import asyncio
+import bisect
+import contextlib
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+class LaneFull(Exception):
+    """レーンが混雑していて受け付けられない（待ちが上限・待ち時間切れ）"""
+
+
+@dataclass(order=True)
+class _Waiter:
+    """枠の空きを待っている呼び出し（priority, 到着順で並べる）"""
+    priority: int
+    seq: int
+    tool: Optional[str] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class ConcurrencyLane:
+    """同時実行数 limit のレーン（limit=0 なら制限しない）。max_queue / queue_timeout は 0 で無制限。
+
+    tool_limits はツール名ごとの同時実行数（0 や未指定のツールはレーンの limit だけで制限する）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int = 0,
+        queue_timeout: float = 0.0,
+        max_samples: int = 1024,
+        tool_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.name = name
+        self.limit = max(0, limit)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout)
+        self.tool_limits = {tool: n for tool, n in (tool_limits or {}).items() if n > 0}
+        self.active = 0
+        self.peak_active = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._tool_active: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._waits: deque = deque(maxlen=max_samples)
+        self._max_wait = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tool: Optional[str] = None, priority: int = 0) -> AsyncIterator[None]:
+        """レーンの枠を1つ確保して実行する（確保できなければ LaneFull）。
+
+        tool は tool_limits で数えるツール名、priority は待ちの順番（小さいほど先）。
+        """
+        if self.limit <= 0 and not self.tool_limits:
+            yield
+            return
+        started = time.monotonic()
+        await self._acquire(tool, priority)
+        self._record_wait(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self._release(tool)
+
+    def _can_start(self, tool: Optional[str]) -> bool:
+        if self.limit and self.active >= self.limit:
+            return False
+        limit = self.tool_limits.get(tool)
+        return not limit or self._tool_active.get(tool, 0) < limit
+
+    async def _acquire(self, tool: Optional[str], priority: int) -> None:
+        # 待ちは枠が空くたびに _dispatch で始めているので、始められる待ちは残っていない
+        # （残っているのはツールの上限に達している呼び出しだけ）
+        if self._can_start(tool):
+            self._on_acquired(tool)
+            return
+        if self.max_queue and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LaneFull(
+                f"サーバーが混雑しています（{self.name} の処理待ちが上限の{self.max_queue}件です）。"
+                "時間を置いて再試行してください"
+            )
+        waiter = _Waiter(priority, next(self._seq), tool, asyncio.get_running_loop().create_future())
+        bisect.insort(self._waiters, waiter)
+        self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout or None)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 枠を譲られた直後に打ち切られた: 次の待ちに回す
+                self._release(tool)
+            else:
+                waiter.future.cancel()
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise LaneFull(
+                    f"サーバーが混雑しています（{self.name} の処理を{self.queue_timeout:g}秒以内に開始できませんでした）。"
+                    "時間を置いて再試行してください"
+                ) from None
+            raise
+
+    def _on_acquired(self, tool: Optional[str]) -> None:
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        if tool in self.tool_limits:
+            self._tool_active[tool] = self._tool_active.get(tool, 0) + 1
+
+    def _release(self, tool: Optional[str]) -> None:
+        self.active -= 1
+        if tool in self.tool_limits:
+            self._tool_active[tool] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """空いた枠を、優先度の高い順（同じなら先着順）に、ツールの上限に達していない待ちへ譲る"""
+        i = 0
+        while i < len(self._waiters) and not (self.limit and self.active >= self.limit):
+            waiter = self._waiters[i]
+            if waiter.future.done():
+                del self._waiters[i]
+            elif self._can_start(waiter.tool):
+                del self._waiters[i]
+                self._on_acquired(waiter.tool)
+                waiter.future.set_result(None)
+            else:
+                i += 1
+
+    def _record_wait(self, seconds: float) -> None:
+        self._waits.append(seconds)
+        self._max_wait = max(self._max_wait, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._waits)
+
+        def percentile(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "peak_active": self.peak_active,
+            "peak_waiting": self.peak_waiting,
+            "max_queue": self.max_queue,
+            "tools": {tool: {"limit": n, "active": self._tool_active.get(tool, 0)} for tool, n in self.tool_limits.items()},
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "p99": percentile(0.99), "max": round(self._max_wait * 1000, 2)},
+        }
@@ -0,0 +1,183 @@
+"""get_subsidy_overview の集計スナップショット
+
+一覧の各補助金について締切日時・金額を取り込み時に一度だけ解析し、締切日時の順に並べて保持します。
+締切期間別・金額規模別の件数や緊急案件は「締切日時が現在から何日以内か」で決まるため、
+読み出し時は二分探索で境界を求めるだけで済み（日付が変わっても再集計は不要）、
+一覧が更新された場合は変化した補助金の分だけを差し替えます。
+"""
+
+import bisect
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+DAY = 86400.0
+
+# 締切期間の区切り（日数）。days_left = (締切 - 現在).days で判定する
+THIS_MONTH_DAYS = 30
+NEXT_MONTH_DAYS = 60
+URGENT_DAYS = 14
+
+# 金額規模の区切り（円、以下）と高額補助金の下限
+AMOUNT_BUCKETS = (
+    ("under_1m", 1000000),
+    ("under_10m", 10000000),
+    ("under_100m", 100000000),
+)
+HIGH_AMOUNT = 50000000
+
+
+def _parse_end(value: Any) -> Optional[float]:
+    """締切日時をUNIX時刻にする（未設定・解析できない・タイムゾーンなしは None）"""
+    if not value:
+        return None
+    try:
+        end = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return None
+    if end.tzinfo is None:
+        return None
+    return end.timestamp()
+
+
+def _parse_amount(value: Any) -> Tuple[str, Optional[float]]:
+    """(金額規模, 金額) を返す。未設定・数値でない場合は ("unspecified", None)"""
+    if not value:
+        return "unspecified", None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return "unspecified", None
+    for bucket, limit in AMOUNT_BUCKETS:
+        if amount <= limit:
+            return bucket, amount
+    return "over_100m", amount
+
+
+class _Row:
+    __slots__ = ("subsidy_id", "title", "end", "bucket", "amount", "order")
+
+    def __init__(self, subsidy_id: str, title: Any, end: Optional[float], bucket: str, amount: Optional[float]):
+        self.subsidy_id = subsidy_id
+        self.title = title
+        self.end = end
+        self.bucket = bucket
+        self.amount = amount
+        self.order = 0
+
+    def key(self) -> tuple:
+        return (self.title, self.end, self.bucket, self.amount)
+
+
+class OverviewSnapshot:
+    """補助金一覧の集計スナップショット"""
+
+    def __init__(self):
+        self._rows: Dict[str, _Row] = {}
+        # 締切日時のある補助金: (締切, id) の昇順
+        self._by_end: List[Tuple[float, str]] = []
+        # 金額規模ごと: 締切日時のある補助金の締切の昇順 / 締切日時のない補助金の件数
+        self._bucket_ends: Dict[str, List[float]] = {}
+        self._bucket_no_end: Dict[str, int] = {}
+        # 高額補助金の id
+        self._high: set = set()
+        self.updated_at: Optional[datetime] = None
+        self.applied_changes = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.updated_at is not None
+
+    def apply(self, records: List[Dict[str, Any]]) -> int:
+        """最新の一覧を取り込み、変化した補助金の数を返す（増減・変更のあった分だけ差し替える）"""
+        seen = set()
+        changes = 0
+        for order, record in enumerate(records):
+            subsidy_id = record.get("id")
+            if subsidy_id is None or subsidy_id in seen:
+                continue
+            seen.add(subsidy_id)
+            bucket, amount = _parse_amount(record.get("subsidy_max_limit"))
+            row = _Row(subsidy_id, record.get("title"), _parse_end(record.get("acceptance_end_datetime")), bucket, amount)
+            current = self._rows.get(subsidy_id)
+            if current is None or current.key() != row.key():
+                if current is not None:
+                    self._remove(current)
+                self._add(row)
+                current = row
+                changes += 1
+            current.order = order
+        for subsidy_id in [i for i in self._rows if i not in seen]:
+            self._remove(self._rows[subsidy_id])
+            changes += 1
+        self.updated_at = datetime.now(timezone.utc)
+        self.applied_changes += changes
+        return changes
+
+    def _add(self, row: _Row) -> None:
+        self._rows[row.subsidy_id] = row
+        if row.end is None:
+            self._bucket_no_end[row.bucket] = self._bucket_no_end.get(row.bucket, 0) + 1
+        else:
+            bisect.insort(self._by_end, (row.end, row.subsidy_id))
+            bisect.insort(self._bucket_ends.setdefault(row.bucket, []), row.end)
+        if row.amount is not None and row.amount >= HIGH_AMOUNT:
+            self._high.add(row.subsidy_id)
+
+    def _remove(self, row: _Row) -> None:
+        del self._rows[row.subsidy_id]
+        if row.end is None:
+            self._bucket_no_end[row.bucket] -= 1
+        else:
+            del self._by_end[bisect.bisect_left(self._by_end, (row.end, row.subsidy_id))]
+            ends = self._bucket_ends[row.bucket]
+            del ends[bisect.bisect_left(ends, row.end)]
+        self._high.discard(row.subsidy_id)
+
+    def _count_between(self, start: float, end: float) -> int:
+        return bisect.bisect_left(self._by_end, (end,)) - bisect.bisect_left(self._by_end, (start,))
+
+    def read(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """現在時刻での集計結果（get_subsidy_overview の形式）を返す。
+
+        締切を過ぎた補助金は締切期間別・金額規模別・一覧のいずれにも含めない。
+        """
+        now = now or datetime.now(timezone.utc)
+        t = now.timestamp()
+        stats = {
+            "total_count": len(self._rows),
+            "by_deadline_period": {
+                "accepting": 0,
+                "this_month": self._count_between(t, t + (THIS_MONTH_DAYS + 1) * DAY),
+                "next_month": self._count_between(t + (THIS_MONTH_DAYS + 1) * DAY, t + (NEXT_MONTH_DAYS + 1) * DAY),
+                "after_next_month": len(self._by_end) - bisect.bisect_left(self._by_end, (t + (NEXT_MONTH_DAYS + 1) * DAY,)),
+            },
+            "by_amount_range": {
+                bucket: (
+                    self._bucket_no_end.get(bucket, 0)
+                    + len(self._bucket_ends.get(bucket, []))
+                    - bisect.bisect_left(self._bucket_ends.get(bucket, []), t)
+                )
+                for bucket in ("under_1m", "under_10m", "under_100m", "over_100m", "unspecified")
+            },
+            "urgent_deadlines": [],
+            "high_amount_subsidies": [],
+            "statistics_generated_at": now.isoformat(),
+        }
+
+        lo = bisect.bisect_left(self._by_end, (t,))
+        hi = bisect.bisect_left(self._by_end, (t + (URGENT_DAYS + 1) * DAY,))
+        urgent = sorted((self._rows[subsidy_id] for _, subsidy_id in self._by_end[lo:hi]), key=lambda r: r.order)
+        stats["urgent_deadlines"] = [
+            {"id": row.subsidy_id, "title": row.title, "days_left": int((row.end - t) // DAY)}
+            for row in urgent
+        ]
+        high = sorted(
+            (self._rows[subsidy_id] for subsidy_id in self._high
+             if self._rows[subsidy_id].end is None or self._rows[subsidy_id].end >= t),
+            key=lambda r: r.order,
+        )
+        stats["high_amount_subsidies"] = [
+            {"id": row.subsidy_id, "title": row.title, "max_amount": row.amount}
+            for row in high
+        ]
+        return stats
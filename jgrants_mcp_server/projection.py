@@ -0,0 +1,128 @@
+"""レスポンスの項目の絞り込み（fields）と簡易表示（profile="compact"）
+
+LLMエージェントが必要な項目だけを受け取れるようにして、1回の呼び出しで返すデータ量
+（シリアライズの手間とトークン数）を減らします。キャッシュ上の結果は書き換えず、常に新しい辞書を返します。
+"""
+
+import html
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+PROFILES = ("full", "compact")
+
+# search_subsidies の compact で返す各補助金の項目
+SEARCH_COMPACT_FIELDS = ("id", "title", "acceptance_end_datetime", "subsidy_max_limit")
+
+# get_subsidy_detail の結果の項目（fields に指定できる項目。target.area のように入れ子も指定できる）
+DETAIL_FIELDS = (
+    "id", "title", "description", "subsidy_max_limit", "acceptance_start", "acceptance_end",
+    "status", "target", "application_url", "last_updated", "files", "save_directory",
+)
+# compact で返す項目（description は本文を短いテキストにし、files はファイル名とサイズだけにする）
+DETAIL_COMPACT_FIELDS = (
+    "id", "title", "status", "subsidy_max_limit", "acceptance_start", "acceptance_end",
+    "target", "application_url", "last_updated", "description", "files",
+)
+# 絞り込んでも残す項目（エラー・古い結果であることの通知など）
+DETAIL_META_FIELDS = ("error", "stale", "age_seconds", "stale_reason", "metadata_only")
+# compact の description の最大文字数
+COMPACT_DESCRIPTION_CHARS = 300
+# compact で省いたファイルごとの取得方法（mcp_access）の代わりに1回だけ付ける案内
+FILE_ACCESS_NOTE = "添付ファイルの内容は get_file_content(subsidy_id, filename) で取得できます"
+
+_TAG = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"\s+")
+
+
+def parse_fields(fields: Any) -> Optional[List[str]]:
+    """"id,title" または ["id", "title"] を項目名のリストにする（未指定なら None）。不正なら ValueError"""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        items: Iterable[Any] = fields.split(",")
+    elif isinstance(fields, (list, tuple)):
+        items = fields
+    else:
+        items = [None]
+    if any(not isinstance(item, str) for item in items):
+        raise ValueError("fields は「id,title」のようなカンマ区切りの文字列か、文字列のリストで指定してください")
+    names = list(dict.fromkeys(item.strip() for item in items if item.strip()))
+    if not names:
+        raise ValueError("fields には1つ以上の項目名を指定してください")
+    return names
+
+
+def check_profile(profile: Any) -> None:
+    if profile not in PROFILES:
+        raise ValueError(f"profile は {' / '.join(PROFILES)} から選択してください")
+
+
+def check_detail_fields(fields: Optional[Sequence[str]]) -> None:
+    """詳細の fields に知らない項目があれば ValueError（上流の一覧と違い、詳細の項目は決まっている）"""
+    unknown = [name for name in fields or () if name.partition(".")[0] not in DETAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"fields に指定できない項目があります: {', '.join(unknown)}（指定できる項目: {', '.join(DETAIL_FIELDS)}）")
+
+
+def project(record: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """record から fields の項目だけを取り出す（"target.area" のようにドットで入れ子の項目を指定できる）"""
+    whole = {name for name in fields if "." not in name}
+    projected: Dict[str, Any] = {}
+    for name in fields:
+        head, _, rest = name.partition(".")
+        if head not in record:
+            continue
+        if not rest:
+            projected[head] = record[head]
+        elif head not in whole and isinstance(record[head], dict):
+            inner = project(record[head], [rest])
+            if inner:
+                projected.setdefault(head, {}).update(inner)
+    return projected
+
+
+def shape_search(result: Dict[str, Any], fields: Optional[Sequence[str]] = None, profile: str = "full") -> Dict[str, Any]:
+    """検索結果の各補助金を fields（未指定なら profile）の項目に絞る。id は常に残す"""
+    if fields is None and profile == "full":
+        return result
+    names = ["id", *(fields if fields is not None else SEARCH_COMPACT_FIELDS)]
+    return {**result, "subsidies": [project(s, names) for s in result.get("subsidies", [])]}
+
+
+def compact_description(value: Any, limit: int = COMPACT_DESCRIPTION_CHARS) -> str:
+    """HTMLの説明文をタグを除いた1行のテキストにして limit 文字で切る"""
+    text = _SPACES.sub(" ", html.unescape(_TAG.sub(" ", str(value or "")))).strip()
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def compact_files(files: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """添付ファイルの情報をファイル名・サイズ・保存済みか（とエラー）だけにする"""
+    keep = ("name", "size", "estimated_size", "downloaded", "error")
+    return {
+        file_type: [{k: f[k] for k in keep if k in f} for f in entries]
+        for file_type, entries in (files or {}).items()
+        if entries
+    }
+
+
+def shape_detail(result: Dict[str, Any], fields: Optional[Sequence[str]] = None, profile: str = "full") -> Dict[str, Any]:
+    """詳細の結果を profile の形にし、fields の項目に絞る（id と DETAIL_META_FIELDS は常に残す）"""
+    if "error" in result and "title" not in result:
+        return result
+    shaped = result
+    if profile == "compact":
+        shaped = {k: result[k] for k in DETAIL_COMPACT_FIELDS if k in result}
+        if "description" in shaped:
+            shaped["description"] = compact_description(shaped["description"])
+        if "files" in shaped:
+            shaped["files"] = compact_files(shaped["files"])
+            if shaped["files"]:
+                shaped["file_access"] = FILE_ACCESS_NOTE
+    if fields is not None:
+        projected = project(shaped, ["id", *fields])
+        if "files" in projected and "file_access" in shaped:
+            projected["file_access"] = shaped["file_access"]
+        shaped = projected
+    if shaped is result:
+        return result
+    return {**shaped, **{k: result[k] for k in DETAIL_META_FIELDS if k in result}}
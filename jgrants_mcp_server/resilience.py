@@ -0,0 +1,246 @@
+"""上流APIへのリクエストの流量制御・リトライ・サーキットブレーカー
+
+- RateLimiter: トークンバケットで全ツール共通の送信レートを抑える。429 を受けたらレートを半分に下げ、
+  成功が続けば設定値まで少しずつ戻す（AIMD）。
+- 429 / 5xx / タイムアウト・接続エラーは、ジッター付きの指数バックオフで再試行する（Retry-After を優先）。
+  接続プールの空き待ちのタイムアウト（PoolTimeout）は手元の混雑なので再試行しない。
+- CircuitBreaker: 連続して失敗したら一定時間は上流に送らずに即座に失敗させ、
+  その後1件だけ試して回復を確認する。
+"""
+
+import asyncio
+import random
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+# 再試行するHTTPステータス
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いている（上流が停止中とみなして送信しない）"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"上流APIが応答しないため {retry_in:.0f} 秒間リクエストを停止しています")
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After ヘッダー（秒数またはHTTP日付）を待ち時間（秒）にする"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, at.timestamp() - now)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """attempt 回目（0始まり）の再試行までの待ち時間（フルジッター）"""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """トークンバケット（429 でレートを下げ、成功で戻す）。rate=0 なら制限しない"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        min_rate: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self.throttled = 0
+
+    def _reserve(self) -> float:
+        """トークンを1つ予約し、使えるようになるまでの待ち時間を返す（先着順）"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        if self.max_rate <= 0:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_throttled(self) -> None:
+        """上流にレート制限された（429）: レートを半分にする"""
+        self.throttled += 1
+        if self.max_rate > 0:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def on_success(self) -> None:
+        """成功: 設定値まで少しずつレートを戻す"""
+        if self.max_rate > 0 and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "max_rate": self.max_rate,
+            "burst": self.burst,
+            "throttled": self.throttled,
+        }
+
+
+class CircuitBreaker:
+    """連続失敗で開き、reset_timeout 秒後に1件だけ試す。failure_threshold=0 なら無効"""
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._trial_in_flight = False
+
+    def before_request(self) -> None:
+        """送信してよいか判定する（だめなら CircuitOpenError）"""
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return
+        elapsed = self._clock() - self.opened_at
+        if self.state == "open" and elapsed >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.short_circuited += 1
+        raise CircuitOpenError(max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """結果を判定できないまま終わった（キャンセルなど）: 試行中の印だけ外す"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failure_threshold > 0 and (
+            self.state == "half_open" or self.failures >= self.failure_threshold
+        ):
+            self.state = "open"
+            self.opened_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class UpstreamGuard:
+    """上流へのリクエストに流量制御・再試行・サーキットブレーカーを適用する"""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        breaker: CircuitBreaker,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_after_max: float = 60.0,
+        rng: Optional[random.Random] = None,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self._rng = rng or random.Random()
+        self.requests = 0
+        self.retries = 0
+
+    async def send(self, request: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """request() を実行してレスポンスを返す。
+
+        再試行しても 429 / 5xx のままなら最後のレスポンスをそのまま返し（呼び出し側の raise_for_status で
+        エラーになる）、タイムアウト・接続エラーは最後の例外を送出する。
+        """
+        attempt = 0
+        while True:
+            self.breaker.before_request()
+            try:
+                await self.limiter.acquire()
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.requests += 1
+            try:
+                response = await request()
+            except httpx.PoolTimeout:
+                # 手元の接続プールが埋まっているだけで上流の障害ではないので、再試行もブレーカーの判定もしない
+                self.breaker.release()
+                raise
+            except (httpx.TimeoutException, httpx.TransportError):
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, self._rng)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    # 4xx（429 以外）は上流の障害ではないので成功として扱う
+                    self.breaker.record_success()
+                    self.limiter.on_success()
+                    return response
+                if response.status_code == 429:
+                    # 上流は応答しているのでブレーカーは閉じたまま、送信レートだけ下げる
+                    self.breaker.record_success()
+                    self.limiter.on_throttled()
+                else:
+                    self.breaker.record_failure()
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                if attempt >= self.max_retries or (retry_after is not None and retry_after > self.retry_after_max):
+                    return response
+                await response.aclose()
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, self._rng)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limiter": self.limiter.stats(),
+            "circuit_breaker": self.breaker.stats(),
+        }
@@ -0,0 +1,221 @@
+"""添付ファイルの全文検索インデックス（SQLite FTS5 + 文字バイグラム）
+
+日本語は単語の区切りがないため、正規化（NFKC・小文字化）したテキストを文字バイグラムに分割して
+FTS5 に登録し、検索語も同じ規則でバイグラムのフレーズに変換して照合します。
+ファイルごとに内容キー（ファイルのハッシュ + コンバータのバージョン）を記録し、
+変わったファイルだけを索引し直します。
+"""
+
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# スキーマを変えた場合に上げる（古いインデックスは作り直す）
+SCHEMA_VERSION = 1
+
+# PDF以外の文書を分割する単位（文字数）と、境界をまたぐ語のための重なり
+CHUNK_CHARS = 1000
+CHUNK_OVERLAP = 50
+
+_RUN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _runs(text: str) -> List[str]:
+    """記号・空白で区切られた文字の連続（正規化済み）"""
+    return _RUN_RE.findall(normalize(text))
+
+
+def _run_tokens(run: str) -> List[str]:
+    if run.isascii() or len(run) == 1:
+        return [run]
+    # バイグラム + 末尾の1文字（1文字の検索語を前方一致で拾うため）
+    return [run[i:i + 2] for i in range(len(run) - 1)] + [run[-1]]
+
+
+def tokenize(text: str) -> str:
+    """索引用のトークン列（空白区切り）"""
+    return " ".join(token for run in _runs(text) for token in _run_tokens(run))
+
+
+def match_expression(query: str) -> Optional[str]:
+    """検索語を FTS5 の MATCH 式に変換する（語の連続はフレーズ、複数語は AND）"""
+    parts = []
+    for run in _runs(query):
+        if run.isascii() or len(run) == 1:
+            parts.append(f'"{run}"*')
+        else:
+            parts.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    return " AND ".join(parts) or None
+
+
+def make_snippet(text: str, query: str, before: int = 40, after: int = 80) -> str:
+    """最初に一致した箇所の前後を切り出し、一致部分を **強調** する"""
+    positions = [(text.find(run), run) for run in _runs(query)]
+    positions = [(pos, run) for pos, run in positions if pos >= 0]
+    if not positions:
+        return text[:before + after].strip()
+    pos, run = min(positions)
+    start = max(0, pos - before)
+    end = min(len(text), pos + len(run) + after)
+    snippet = text[start:pos] + f"**{run}**" + text[pos + len(run):end]
+    snippet = " ".join(snippet.split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+
+def chunk_text(text: str) -> List[Tuple[int, str]]:
+    """PDF以外の文書を (文字位置, テキスト) の断片に分割する"""
+    chunks = []
+    step = CHUNK_CHARS - CHUNK_OVERLAP
+    for start in range(0, max(len(text), 1), step):
+        chunk = text[start:start + CHUNK_CHARS]
+        if chunk.strip():
+            chunks.append((start, chunk))
+        if start + CHUNK_CHARS >= len(text):
+            break
+    return chunks
+
+
+class AttachmentIndex:
+    """添付ファイルの全文検索インデックス。
+
+    各メソッドはブロッキングI/Oなので、イベントループからはスレッドで呼ぶ。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.executescript(
+                    "DROP TABLE IF EXISTS documents;"
+                    "DROP TABLE IF EXISTS chunk_meta;"
+                    "DROP TABLE IF EXISTS chunks;"
+                )
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    path TEXT PRIMARY KEY,
+                    subsidy_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    content_key TEXT NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    indexed_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS chunk_meta (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    subsidy_id TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    page INTEGER,
+                    char_offset INTEGER,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chunk_meta_path ON chunk_meta(path);
+                CREATE INDEX IF NOT EXISTS chunk_meta_subsidy ON chunk_meta(subsidy_id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(tokens, tokenize='unicode61 remove_diacritics 0');
+                """
+            )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stale_documents(
+        self, entries: Iterable[Tuple[str, str, str, str]], subsidy_id: Optional[str] = None
+    ) -> List[Tuple[str, str, str, str]]:
+        """(path, subsidy_id, filename, content_key) のうち索引し直しが必要なものを返し、
+        entries に含まれない（削除された）ファイルを索引から外す。subsidy_id 指定時はその補助金の範囲だけ見る"""
+        entries = list(entries)
+        with self._lock, self._conn:
+            if subsidy_id is None:
+                rows = self._conn.execute("SELECT path, content_key FROM documents").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT path, content_key FROM documents WHERE subsidy_id = ?", (subsidy_id,)
+                ).fetchall()
+            indexed = dict(rows)
+            present = {entry[0] for entry in entries}
+            for path in set(indexed) - present:
+                self._delete(path)
+        return [entry for entry in entries if indexed.get(entry[0]) != entry[3]]
+
+    def replace_document(
+        self,
+        path: str,
+        subsidy_id: str,
+        filename: str,
+        content_key: str,
+        chunks: List[Tuple[Optional[int], Optional[int], str]],
+    ) -> None:
+        """文書の断片 [(ページ番号, 文字位置, テキスト)] を登録し直す"""
+        with self._lock, self._conn:
+            self._delete(path)
+            for page, char_offset, text in chunks:
+                text = normalize(text)
+                cursor = self._conn.execute(
+                    "INSERT INTO chunk_meta (path, subsidy_id, filename, page, char_offset, text) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, subsidy_id, filename, page, char_offset, text),
+                )
+                self._conn.execute(
+                    "INSERT INTO chunks (rowid, tokens) VALUES (?, ?)", (cursor.lastrowid, tokenize(text))
+                )
+            self._conn.execute(
+                "INSERT INTO documents (path, subsidy_id, filename, content_key, chunks, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, subsidy_id, filename, content_key, len(chunks), datetime.now(timezone.utc).isoformat()),
+            )
+
+    def _delete(self, path: str) -> None:
+        self._conn.execute("DELETE FROM chunks WHERE rowid IN (SELECT id FROM chunk_meta WHERE path = ?)", (path,))
+        self._conn.execute("DELETE FROM chunk_meta WHERE path = ?", (path,))
+        self._conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+    def search(self, query: str, subsidy_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """BM25 の順に一致した断片を返す"""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            "SELECT m.subsidy_id, m.filename, m.page, m.char_offset, m.text, bm25(chunks) "
+            "FROM chunks JOIN chunk_meta m ON m.id = chunks.rowid WHERE chunks MATCH ?"
+        )
+        params: List[Any] = [expression]
+        if subsidy_id is not None:
+            sql += " AND m.subsidy_id = ?"
+            params.append(subsidy_id)
+        sql += " ORDER BY bm25(chunks) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "subsidy_id": row[0],
+                "filename": row[1],
+                "page": row[2],
+                "char_offset": row[3],
+                "score": round(-row[5], 4),
+                "snippet": make_snippet(row[4], query),
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            documents, chunks = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM documents"
+            ).fetchone()
+        return {"documents": documents, "chunks": chunks}
@@ -0,0 +1,225 @@
+"""補助金詳細レスポンスの逐次JSONパーサー
+
+GET /subsidies/id/{id} のレスポンスには添付ファイルがBASE64文字列として丸ごと埋め込まれるため、
+resp.json() で読むと「生バイト列・デコード済み文字列・dict・デコード後のバイト列」が同時にメモリに載る。
+このモジュールはレスポンスをチャンク単位で読み進め、添付ファイルの data 文字列だけを
+シンク（ファイルへの逐次デコードなど）に流し、それ以外の小さな骨格部分だけを json.loads する。
+"""
+
+import json
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+# 添付ファイルの配列を持つキーと、その要素内でBASE64データを持つキー
+ATTACHMENT_KEYS = ("application_guidelines", "outline_of_grant", "application_form")
+DATA_KEYS = ("data", "file_data")
+
+_STRUCT_RE = re.compile(rb'["{}\[\],:]')
+_STRING_RE = re.compile(rb'["\\]')
+_PLACEHOLDER = "__jgrants_stream_{}__"
+_PLACEHOLDER_RE = re.compile(r"^__jgrants_stream_(\d+)__$")
+
+
+class StreamSink:
+    """ストリーミングされる文字列の受け口。write() にはJSONエスケープ解除済みのバイト列が渡される"""
+
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def close(self) -> Any:
+        """文字列の終端で呼ばれ、パース結果でその文字列の代わりに置く値を返す"""
+        raise NotImplementedError
+
+    def abort(self) -> None:
+        """パースが途中で失敗した場合に呼ばれる（一時ファイルの削除など）"""
+
+
+# シンクの生成関数: (添付ファイル種別, 配列内の位置) -> StreamSink
+SinkFactory = Callable[[str, int], StreamSink]
+
+
+class _Container:
+    __slots__ = ("is_object", "name", "index", "key", "expect_key")
+
+    def __init__(self, is_object: bool, name: Optional[str], index: int):
+        self.is_object = is_object
+        self.name = name          # 親オブジェクトでのキー（配列内のオブジェクトは配列のキーを引き継ぐ）
+        self.index = index        # 配列内の位置（配列なら現在の要素番号）
+        self.key: Optional[str] = None
+        self.expect_key = is_object
+
+
+class AttachmentStreamParser:
+    """添付ファイルの data 文字列をシンクに流しながらJSONを逐次パースする。
+
+    feed() にレスポンスのチャンクを順に渡し、最後に close() でパース結果を受け取る。
+    ストリーミングした文字列の位置には、対応するシンクの close() の戻り値が入る。
+    """
+
+    def __init__(
+        self,
+        open_sink: SinkFactory,
+        attachment_keys: Tuple[str, ...] = ATTACHMENT_KEYS,
+        data_keys: Tuple[str, ...] = DATA_KEYS,
+    ):
+        self._open_sink = open_sink
+        self._attachment_keys = attachment_keys
+        self._data_keys = data_keys
+        self._skeleton = bytearray()
+        self._buf = b""
+        self._stack: List[_Container] = []
+        self._mode = "struct"     # struct / string / key / sink
+        self._key_buf = bytearray()
+        self._sink: Optional[StreamSink] = None
+        self._sinks: List[StreamSink] = []
+        self._results: List[Any] = []
+
+    # ---- 公開API ----
+
+    def feed(self, chunk: bytes) -> None:
+        buf = self._buf + chunk if self._buf else chunk
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            if self._mode == "struct":
+                pos = self._scan_struct(buf, pos)
+            else:
+                pos, need_more = self._scan_string(buf, pos)
+                if need_more:
+                    break
+        self._buf = buf[pos:]
+
+    def close(self) -> Any:
+        if self._mode != "struct" or self._buf.strip() or self._stack:
+            self.abort()
+            raise ValueError("JSONが途中で終了しています")
+        try:
+            data = json.loads(bytes(self._skeleton))
+        except ValueError:
+            self.abort()
+            raise
+        return self._replace_placeholders(data)
+
+    def abort(self) -> None:
+        """途中までに開いたシンクをすべて破棄する"""
+        for sink in self._sinks:
+            sink.abort()
+        self._sinks = []
+        self._sink = None
+
+    @property
+    def sinks(self) -> List[StreamSink]:
+        return list(self._sinks)
+
+    # ---- 構造部分 ----
+
+    def _scan_struct(self, buf: bytes, pos: int) -> int:
+        m = _STRUCT_RE.search(buf, pos)
+        if m is None:
+            self._skeleton += buf[pos:]
+            return len(buf)
+        start = m.start()
+        self._skeleton += buf[pos:start]
+        char = buf[start:start + 1]
+        top = self._stack[-1] if self._stack else None
+
+        if char == b"{" or char == b"[":
+            if top is None:
+                name, index = None, 0
+            elif top.is_object:
+                name, index = top.key, 0
+            else:
+                name, index = top.name, top.index
+            self._stack.append(_Container(char == b"{", name, index))
+        elif char == b"}" or char == b"]":
+            if self._stack:
+                self._stack.pop()
+        elif char == b",":
+            if top is not None:
+                if top.is_object:
+                    top.expect_key = True
+                else:
+                    top.index += 1
+        elif char == b":":
+            if top is not None and top.is_object:
+                top.expect_key = False
+        else:  # 文字列の開始
+            if top is not None and top.is_object and top.expect_key:
+                self._mode = "key"
+                self._key_buf = bytearray()
+            elif (
+                top is not None
+                and top.is_object
+                and top.key in self._data_keys
+                and top.name in self._attachment_keys
+            ):
+                self._mode = "sink"
+                self._sink = self._open_sink(top.name, top.index)
+                self._sinks.append(self._sink)
+                return start + 1
+            else:
+                self._mode = "string"
+
+        self._skeleton += char
+        return start + 1
+
+    # ---- 文字列部分 ----
+
+    def _scan_string(self, buf: bytes, pos: int) -> Tuple[int, bool]:
+        """文字列の内部を読み進め、(次の位置, 続きのチャンクが必要か) を返す"""
+        m = _STRING_RE.search(buf, pos)
+        if m is None:
+            self._emit(buf[pos:])
+            return len(buf), False
+        start = m.start()
+        self._emit(buf[pos:start])
+
+        if buf[start:start + 1] == b'"':
+            self._end_string()
+            return start + 1, False
+
+        # バックスラッシュエスケープ（チャンク境界で切れていたら次のチャンクと結合して処理）
+        length = 6 if buf[start + 1:start + 2] == b"u" else 2
+        if start + length > len(buf):
+            return start, True
+        escape = buf[start:start + length]
+        if self._mode == "sink":
+            self._sink.write(json.loads(b'"' + escape + b'"').encode("utf-8"))
+        else:
+            self._emit(escape)
+        return start + length, False
+
+    def _emit(self, data: bytes) -> None:
+        if not data:
+            return
+        if self._mode == "sink":
+            self._sink.write(data)
+        else:
+            if self._mode == "key":
+                self._key_buf += data
+            self._skeleton += data
+
+    def _end_string(self) -> None:
+        if self._mode == "sink":
+            index = len(self._results)
+            self._results.append(self._sink.close())
+            self._sink = None
+            self._skeleton += json.dumps(_PLACEHOLDER.format(index)).encode("ascii")
+        else:
+            self._skeleton += b'"'
+            if self._mode == "key" and self._stack:
+                self._stack[-1].key = json.loads(b'"' + bytes(self._key_buf) + b'"')
+        self._mode = "struct"
+
+    # ---- 後処理 ----
+
+    def _replace_placeholders(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {k: self._replace_placeholders(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._replace_placeholders(v) for v in value]
+        if isinstance(value, str):
+            m = _PLACEHOLDER_RE.match(value)
+            if m and int(m.group(1)) < len(self._results):
+                return self._results[int(m.group(1))]
+        return value
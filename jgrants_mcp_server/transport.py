@@ -0,0 +1,196 @@
+"""上流APIへの接続プールの計測と DNS キャッシュ
+
+- PoolMonitor: 接続を使用中・空き待ちのリクエスト数と、プールから接続を確保するまでの待ち時間を記録する。
+  プールの大きさ（JGRANTS_HTTP_MAX_CONNECTIONS）を実測値から決めるための統計。
+- CachingNetworkBackend: ホスト名の名前解決結果を一定時間再利用する（新しい接続のたびに DNS を引かない）。
+- MonitoredTransport: 上記を組み込んだ httpx のトランスポート。
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+
+class PoolMonitor:
+    """接続プールの使用状況（使用中・空き待ち・確保までの待ち時間）"""
+
+    def __init__(self, max_samples: int = 1024):
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.peak_waiting = 0
+        self.acquired = 0
+        self.pool_timeouts = 0
+        self._latencies: deque = deque(maxlen=max_samples)
+        self._max_latency = 0.0
+
+    def on_wait(self) -> None:
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def on_acquire(self, latency: float) -> None:
+        self.waiting -= 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.acquired += 1
+        self._latencies.append(latency)
+        self._max_latency = max(self._max_latency, latency)
+
+    def on_release(self, acquired: bool) -> None:
+        if acquired:
+            self.in_use -= 1
+        else:
+            self.waiting -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._latencies)
+
+        def percentile(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "peak_in_use": self.peak_in_use,
+            "peak_waiting": self.peak_waiting,
+            "acquired": self.acquired,
+            "pool_timeouts": self.pool_timeouts,
+            "acquire_latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(self._max_latency * 1000, 2),
+            },
+        }
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """名前解決の結果を ttl 秒キャッシュする（接続できなければ破棄して引き直す）"""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, ttl: float):
+        self._backend = backend
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        key = (host, port)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[0]:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Any = None,
+    ) -> httpcore.AsyncNetworkStream:
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            pass
+        else:
+            return await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+
+        try:
+            addresses = await self._resolve(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        last_error: Optional[Exception] = None
+        # TLS の SNI・証明書検証はホスト名で行われるので、接続先だけアドレスに置き換える
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        self._entries.pop((host, port), None)
+        raise last_error or httpcore.ConnectError(f"{host} を名前解決できませんでした")
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options: Any = None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ttl_seconds": self.ttl, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """レスポンスのボディを閉じたときに接続の返却を記録する"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class MonitoredTransport(httpx.AsyncHTTPTransport):
+    """接続プールの使用状況を PoolMonitor に記録し、dns_cache_ttl > 0 なら名前解決をキャッシュする"""
+
+    def __init__(self, monitor: PoolMonitor, dns_cache_ttl: float = 0.0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.monitor = monitor
+        self.dns_cache: Optional[CachingNetworkBackend] = None
+        if dns_cache_ttl > 0 and isinstance(self._pool, httpcore.AsyncConnectionPool):
+            # httpx はネットワークバックエンドを指定する引数を持たないため、作成済みのプールのものを包む
+            self.dns_cache = CachingNetworkBackend(self._pool._network_backend, dns_cache_ttl)
+            self._pool._network_backend = self.dns_cache
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        monitor = self.monitor
+        started = time.monotonic()
+        acquired = False
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal acquired
+            # プールから接続を割り当てられた後の最初のイベント（新規接続・既存接続での送信開始）
+            if not acquired:
+                acquired = True
+                monitor.on_acquire(time.monotonic() - started)
+            if outer_trace is not None:
+                await outer_trace(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        monitor.on_wait()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as e:
+            if isinstance(e, httpx.PoolTimeout):
+                monitor.pool_timeouts += 1
+            monitor.on_release(acquired)
+            raise
+        if not acquired:
+            # 送信前のイベントが来なかった場合も待ちは終わっている
+            acquired = True
+            monitor.on_acquire(time.monotonic() - started)
+        response.stream = _TrackedStream(response.stream, lambda: monitor.on_release(True))
+        return response
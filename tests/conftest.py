@@ -0,0 +1,38 @@
+"""pytest 共通フィクスチャ"""
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.cache import ResponseCache
+from jgrants_mcp_server.lanes import ConcurrencyLane
+from jgrants_mcp_server.overview import OverviewSnapshot
+from jgrants_mcp_server.resilience import CircuitBreaker, RateLimiter, UpstreamGuard
+from jgrants_mcp_server.transport import PoolMonitor
+from tests.stub_api import StubAPI
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    """core をローカルのスタブAPIと一時ディレクトリに向ける"""
+    with StubAPI() as stub:
+        monkeypatch.setattr(core, "API_BASE_URL", stub.base_url)
+        monkeypatch.setattr(core, "FILES_DIR", tmp_path)
+        monkeypatch.setattr(core, "_HTTP_CLIENT", None)
+        monkeypatch.setattr(core, "_SEARCH_CACHE", ResponseCache(ttl=300))
+        monkeypatch.setattr(core, "_SEARCH_PAGES", ResponseCache(ttl=300))
+        monkeypatch.setattr(core, "_DETAIL_METADATA_CACHE", ResponseCache(ttl=300))
+        monkeypatch.setattr(core, "_VALIDATORS", ResponseCache(ttl=float("inf")))
+        monkeypatch.setattr(core, "_POOL_MONITOR", PoolMonitor())
+        monkeypatch.setattr(core, "_CATALOG", None)
+        monkeypatch.setattr(core, "_CATALOG_SYNC_FLIGHT", ResponseCache(ttl=0))
+        monkeypatch.setattr(core, "_OVERVIEW", OverviewSnapshot())
+        monkeypatch.setattr(core, "_FAST_LANE", ConcurrencyLane("fast", limit=32, max_queue=256, queue_timeout=30.0))
+        monkeypatch.setattr(core, "_SLOW_LANE", ConcurrencyLane("slow", limit=4, max_queue=32, queue_timeout=120.0))
+        # 流量制御なし・短いバックオフ（テストごとにブレーカーの状態を持ち越さない）
+        monkeypatch.setattr(core, "_UPSTREAM", UpstreamGuard(
+            RateLimiter(rate=0), CircuitBreaker(failure_threshold=5, reset_timeout=30.0),
+            max_retries=2, backoff_base=0.01, backoff_max=0.05,
+        ))
+        yield stub
+        if core._CATALOG is not None:
+            core._CATALOG.close()
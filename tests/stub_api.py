@@ -0,0 +1,124 @@
+"""テスト・ベンチマーク用の jGrants API スタブサーバー
+
+ローカルの 127.0.0.1 上で HTTP/1.1 (Keep-Alive) サーバーをスレッドで起動し、
+パスごとに登録したハンドラでレスポンスを返します。
+接続数・リクエスト・送信バイト数を記録するので、接続再利用や転送量の検証に使えます。
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class StubRequest:
+    """ハンドラに渡されるリクエスト情報"""
+
+    def __init__(self, path: str, query: Dict[str, str], headers: Dict[str, str], method: str = "GET"):
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.method = method
+
+
+# ハンドラの戻り値: (ステータス, 追加ヘッダー, ボディ)。ボディが dict/list ならJSONとして返す
+StubResponse = Tuple[int, Dict[str, str], Any]
+StubHandler = Callable[[StubRequest], StubResponse]
+
+
+class StubAPI:
+    """パス単位でレスポンスを差し替えられるローカルHTTPサーバー"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.routes: Dict[str, StubHandler] = {}
+        self.requests: List[StubRequest] = []
+        self.connections = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- ルート登録 ----
+
+    def route(self, path: str, handler: StubHandler) -> None:
+        self.routes[path] = handler
+
+    def json(self, path: str, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        self.route(path, lambda req: (status, dict(headers or {}), payload))
+
+    # ---- ライフサイクル ----
+
+    @property
+    def base_url(self) -> str:
+        assert self._server is not None, "StubAPI is not running"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubAPI":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーとボディをまとめて送る（Nagle/遅延ACKによる~40msの待ちを避ける）
+            wbufsize = 64 * 1024
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):  # noqa: A002 - 親クラスのシグネチャに合わせる
+                pass
+
+            def do_GET(self):
+                self._respond(send_body=True)
+
+            def do_HEAD(self):
+                self._respond(send_body=False)
+
+            def _respond(self, send_body: bool):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                req = StubRequest(parsed.path, query, {k.lower(): v for k, v in self.headers.items()}, self.command)
+                with stub._lock:
+                    stub.requests.append(req)
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                handler = stub.routes.get(parsed.path)
+                if handler is None:
+                    status, headers, body = 404, {}, {"message": "not found"}
+                else:
+                    status, headers, body = handler(req)
+
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                    headers.setdefault("Content-Type", "application/json")
+                elif isinstance(body, str):
+                    body = body.encode("utf-8")
+                body = body or b""
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body and send_body:
+                    self.wfile.write(body)
+                    with stub._lock:
+                        stub.bytes_sent += len(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
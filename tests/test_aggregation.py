@@ -0,0 +1,114 @@
+"""補助金一覧の集計エンジン（aggregate_subsidies）のテスト"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.aggregation import aggregate, amount_labels, deadline_labels
+from jgrants_mcp_server.overview import OverviewSnapshot
+
+BASE = datetime(2025, 4, 1, 9, 30, tzinfo=timezone.utc)
+
+
+def _iso(now: datetime, days: float) -> str:
+    return (now + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+RECORDS = [
+    {"id": "1", "title": "A", "subsidy_max_limit": 500000, "acceptance_end_datetime": _iso(BASE, 3),
+     "target_area_search": "東京都 / 神奈川県", "industry": "製造業"},
+    {"id": "2", "title": "B", "subsidy_max_limit": 5000000, "acceptance_end_datetime": _iso(BASE, 20),
+     "target_area_search": "東京都", "industry": "製造業 / 情報通信業"},
+    {"id": "3", "title": "C", "subsidy_max_limit": 200000000, "acceptance_end_datetime": _iso(BASE, 90),
+     "target_area_search": "全国"},
+    {"id": "4", "title": "D", "subsidy_max_limit": None, "acceptance_end_datetime": None,
+     "target_area_search": "大阪府"},
+    {"id": "5", "title": "E", "subsidy_max_limit": "0", "acceptance_end_datetime": _iso(BASE, -2)},
+]
+
+
+def test_custom_edges_and_percentiles():
+    result = aggregate(RECORDS, BASE, amount_edges=[1000000, 10000000], deadline_edges=[7, 30], percentiles=[50, 100])
+    assert result["total_count"] == 5
+    amount = result["amount"]
+    assert amount["buckets"] == {"〜1,000,000": 1, "1,000,000超〜10,000,000": 1, "10,000,000超": 1, "unspecified": 2}
+    assert (amount["count"], amount["min"], amount["max"]) == (3, 500000.0, 200000000.0)
+    assert amount["percentiles"] == {"p50": 5000000.0, "p100": 200000000.0}
+    assert result["deadline"]["buckets"] == {
+        "0〜7日": 1, "8〜30日": 1, "31日以上": 1, "expired": 1, "unspecified": 1,
+    }
+    assert deadline_labels([14, 30]) == ["0〜14日", "15〜30日", "31日以上"]
+    assert amount_labels([100]) == ["〜100", "100超"]
+
+
+def test_group_by_counts_each_value_of_multi_valued_fields():
+    result = aggregate(RECORDS, BASE, group_by="area")
+    groups = {g["value"]: g for g in result["groups"]}
+    assert result["groups"][0]["value"] == "東京都"
+    assert groups["東京都"]["count"] == 2
+    assert groups["東京都"]["amount_median"] == 2750000.0
+    assert groups["神奈川県"]["amount_buckets"]["〜1,000,000"] == 1
+    assert groups["未設定"]["deadline_buckets"]["expired"] == 1
+    assert sum(g["count"] for g in result["groups"]) == 6
+
+    industry = aggregate(RECORDS, BASE, group_by="industry")
+    assert {g["value"]: g["count"] for g in industry["groups"]} == {"製造業": 2, "未設定": 3, "情報通信業": 1}
+
+
+def test_default_buckets_match_overview_snapshot():
+    """区切りを get_subsidy_overview と同じにすれば、締切超過のない一覧では件数が一致する"""
+    rng = random.Random(12)
+    records = [
+        {
+            "id": str(i),
+            "title": f"補助金{i}",
+            "subsidy_max_limit": rng.choice([None, 1000000, 1000001, 10000000, 50000000, 100000000, 3e8]),
+            "acceptance_end_datetime": rng.choice([None, _iso(BASE, rng.uniform(0, 120))]),
+        }
+        for i in range(300)
+    ]
+    snapshot = OverviewSnapshot()
+    snapshot.apply(records)
+    legacy = snapshot.read(BASE)
+
+    result = aggregate(records, BASE, deadline_edges=[30, 60])
+    deadline = result["deadline"]["buckets"]
+    assert deadline["0〜30日"] == legacy["by_deadline_period"]["this_month"]
+    assert deadline["31〜60日"] == legacy["by_deadline_period"]["next_month"]
+    assert deadline["61日以上"] == legacy["by_deadline_period"]["after_next_month"]
+    assert list(result["amount"]["buckets"].values()) == list(legacy["by_amount_range"].values())
+
+
+@pytest.mark.asyncio
+async def test_aggregate_subsidies_tool_uses_catalog_and_details(stub_api):
+    now = datetime.now(timezone.utc)
+    listing = [
+        {"id": "a0W000000000001", "title": "補助金A", "subsidy_max_limit": 4500000,
+         "acceptance_start_datetime": _iso(now, -1), "acceptance_end_datetime": _iso(now, 10)},
+        {"id": "a0W000000000002", "title": "補助金B", "subsidy_max_limit": 100000000,
+         "acceptance_start_datetime": _iso(now, -1), "acceptance_end_datetime": _iso(now, 45)},
+    ]
+    stub_api.json("/subsidies", {"result": listing})
+    await core._ingest_catalog_detail({**listing[0], "use_purpose": "設備整備・IT導入をしたい"})
+
+    result = await core.aggregate_subsidies.fn(group_by="purpose", percentiles=[50])
+    assert result["total_count"] == 2
+    assert result["amount"]["percentiles"] == {"p50": 52250000.0}
+    assert {g["value"]: g["count"] for g in result["groups"]} == {"設備整備・IT導入をしたい": 1, "未設定": 1}
+    assert result["catalog_synced_at"]
+    assert len(stub_api.requests) == 1
+
+    filtered = await core.aggregate_subsidies.fn(keyword="補助金B")
+    assert filtered["total_count"] == 1
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_aggregate_subsidies_validation():
+    assert "error" in await core.aggregate_subsidies.fn(group_by="title")
+    assert "error" in await core.aggregate_subsidies.fn(amount_edges=[10, 5])
+    assert "error" in await core.aggregate_subsidies.fn(deadline_edges=[])
+    assert "error" in await core.aggregate_subsidies.fn(percentiles=[150])
+    assert "error" in await core.aggregate_subsidies.fn(acceptance=2)
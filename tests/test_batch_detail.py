@@ -0,0 +1,84 @@
+"""補助金詳細の一括取得（get_subsidy_details_batch）のテスト（スタブAPI使用）"""
+
+import base64
+import time
+
+import pytest
+
+from jgrants_mcp_server import core
+
+DELAYS = {"a0W000000000001": 0.4, "a0W000000000002": 0.1, "a0W000000000003": 0.25}
+
+
+def _detail(subsidy_id: str) -> dict:
+    return {
+        "result": [{
+            "id": subsidy_id,
+            "title": f"補助金 {subsidy_id}",
+            "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+            "update_datetime": "2025-01-01T00:00:00Z",
+            "application_guidelines": [
+                {"name": "公募要領.pdf", "data": base64.b64encode(b"%PDF-1 guideline").decode()},
+            ],
+        }]
+    }
+
+
+def _route_details(stub) -> None:
+    for subsidy_id, delay in DELAYS.items():
+        def handler(req, subsidy_id=subsidy_id, delay=delay):
+            time.sleep(delay)
+            return 200, {}, _detail(subsidy_id)
+        stub.route(f"/subsidies/id/{subsidy_id}", handler)
+
+
+class _ProgressRecorder:
+    def __init__(self):
+        self.events = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.events.append((progress, total, message))
+
+
+@pytest.mark.asyncio
+async def test_details_are_fetched_concurrently_and_reported_as_completed(stub_api):
+    _route_details(stub_api)
+    ids = list(DELAYS) + ["a0W000000000404", "a0W000000000002"]
+    ctx = _ProgressRecorder()
+
+    started = time.monotonic()
+    result = await core.get_subsidy_details_batch.fn(ids, ctx=ctx)
+    assert time.monotonic() - started < 0.7
+
+    assert [r["id"] for r in result["results"]] == ids[:4]
+    assert result["results"][0]["files"]["application_guidelines"][0]["name"] == "公募要領.pdf"
+    assert "error" in result["results"][3]
+    assert (result["succeeded"], result["failed"]) == (3, 1)
+    assert result["completed_order"][-3:] == ["a0W000000000002", "a0W000000000003", "a0W000000000001"]
+    assert [(p, t) for p, t, _ in ctx.events] == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert ctx.events[-1][2] == "a0W000000000001: 完了"
+    assert (core.FILES_DIR / "a0W000000000001" / "公募要領.pdf").exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_and_metadata_only(stub_api, monkeypatch):
+    _route_details(stub_api)
+    monkeypatch.setattr(core, "_BATCH_CONCURRENCY", 1)
+
+    started = time.monotonic()
+    result = await core.get_subsidy_details_batch.fn(list(DELAYS), download_files=False)
+    assert time.monotonic() - started >= sum(DELAYS.values())
+    assert result["completed_order"] == list(DELAYS)
+
+    first = result["results"][0]
+    assert first["title"] == "補助金 a0W000000000001"
+    assert first["files"]["application_guidelines"][0]["downloaded"] is False
+    assert not (core.FILES_DIR / "a0W000000000001" / "公募要領.pdf").exists()
+
+
+@pytest.mark.asyncio
+async def test_batch_detail_validation(monkeypatch):
+    assert "error" in await core.get_subsidy_details_batch.fn([])
+    assert "error" in await core.get_subsidy_details_batch.fn(["a0W000000000001", " "])
+    monkeypatch.setattr(core, "_BATCH_MAX_IDS", 1)
+    assert "error" in await core.get_subsidy_details_batch.fn(["a0W000000000001", "a0W000000000002"])
@@ -0,0 +1,124 @@
+"""複数条件の一括検索（search_subsidies_batch）のテスト（スタブAPI使用）"""
+
+import threading
+import time
+
+import pytest
+
+from jgrants_mcp_server import core
+
+SUBSIDIES = {
+    "a1": {"id": "a1", "title": "IT導入補助金", "acceptance_end_datetime": "2099-06-01T00:00:00Z"},
+    "a2": {"id": "a2", "title": "DX推進補助金", "acceptance_end_datetime": "2099-03-01T00:00:00Z"},
+    "a3": {"id": "a3", "title": "デジタル化支援", "acceptance_end_datetime": None},
+    "a4": {"id": "a4", "title": "DX人材育成", "acceptance_end_datetime": "2099-09-01T00:00:00Z"},
+}
+
+BY_KEYWORD = {
+    "IT導入": ["a1", "a2"],
+    "DX": ["a2", "a4"],
+    "デジタル化": ["a3", "a1"],
+}
+
+
+def _listing_route(stub, delay: float = 0.0, fail: tuple = ()):
+    state = {"in_flight": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def handler(req):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            time.sleep(delay)
+            keyword = req.query.get("keyword")
+            if keyword in fail:
+                return 500, {}, {"message": "error"}
+            return 200, {}, {"result": [SUBSIDIES[i] for i in BY_KEYWORD.get(keyword, [])]}
+        finally:
+            with lock:
+                state["in_flight"] -= 1
+
+    stub.route("/subsidies", handler)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_results_are_merged_by_id_with_provenance(stub_api):
+    _listing_route(stub_api)
+    result = await core.search_subsidies_batch.fn(
+        [{"keyword": "IT導入"}, {"keyword": "DX"}, {"keyword": "デジタル化"}]
+    )
+    assert result["failed_queries"] == 0
+    assert [s["id"] for s in result["subsidies"]] == ["a2", "a1", "a4", "a3"]
+    assert {s["id"]: s["matched_queries"] for s in result["subsidies"]} == {
+        "a1": [0, 2], "a2": [0, 1], "a3": [2], "a4": [1],
+    }
+    assert [q["total_count"] for q in result["queries"]] == [2, 2, 2]
+    assert result["queries"][1]["search_conditions"]["keyword"] == "DX"
+
+    # キャッシュ上の検索結果は書き換えない
+    single = await core.search_subsidies.fn("IT導入")
+    assert all("matched_queries" not in s for s in single["subsidies"])
+
+    desc = await core.search_subsidies_batch.fn([{"keyword": "IT導入"}, {"keyword": "DX"}], order="DESC")
+    assert [s["id"] for s in desc["subsidies"]] == ["a4", "a1", "a2"]
+
+
+@pytest.mark.asyncio
+async def test_queries_run_concurrently_up_to_the_cap(stub_api, monkeypatch):
+    state = _listing_route(stub_api, delay=0.3)
+    queries = [{"keyword": "IT導入"}, {"keyword": "DX"}, {"keyword": "デジタル化"}, {"keyword": "補助金"}]
+
+    started = time.monotonic()
+    await core.search_subsidies_batch.fn(queries)
+    assert time.monotonic() - started < 0.9
+    assert state["peak"] == 4
+
+    monkeypatch.setattr(core, "_BATCH_CONCURRENCY", 2)
+    state["peak"] = 0
+    await core.search_subsidies_batch.fn(queries, acceptance=0)
+    assert state["peak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_partial_failures_are_reported_per_query(stub_api):
+    _listing_route(stub_api, fail=("DX",))
+    result = await core.search_subsidies_batch.fn([{"keyword": "IT導入"}, {"keyword": "DX"}])
+    assert result["failed_queries"] == 1
+    assert "error" in result["queries"][1] and "error" not in result["queries"][0]
+    assert [s["id"] for s in result["subsidies"]] == ["a2", "a1"]
+
+    failed = await core.search_subsidies_batch.fn([{"keyword": "DX"}])
+    assert "error" in failed
+    assert len(failed["queries"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_validation(monkeypatch):
+    assert "error" in await core.search_subsidies_batch.fn([])
+    assert "error" in await core.search_subsidies_batch.fn([{"industry": "製造業"}])
+    assert "error" in await core.search_subsidies_batch.fn([{"keyword": "DX", "sort": "title"}])
+    monkeypatch.setattr(core, "_BATCH_MAX_QUERIES", 1)
+    assert "error" in await core.search_subsidies_batch.fn([{"keyword": "DX"}, {"keyword": "IT導入"}])
+
+
+class _ProgressRecorder:
+    def __init__(self):
+        self.events = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.events.append((progress, total, message))
+
+
+@pytest.mark.asyncio
+async def test_search_progress_is_reported(stub_api):
+    _listing_route(stub_api)
+    ctx = _ProgressRecorder()
+    await core.search_subsidies.fn("IT導入", ctx=ctx)
+    assert ctx.events == [(0, 1, "上流APIで検索しています"), (1, 1, "2件")]
+
+    ctx = _ProgressRecorder()
+    await core.search_subsidies_batch.fn([{"keyword": "DX"}, {"keyword": "デジタル化"}], ctx=ctx)
+    assert [(p, t) for p, t, _ in ctx.events] == [(1, 2), (2, 2)]
+    assert {m for _, _, m in ctx.events} == {"DX: 2件", "デジタル化: 2件"}
@@ -0,0 +1,146 @@
+"""検索結果キャッシュ（TTL + LRU + 単一フライト + stale-while-revalidate）のテスト"""
+
+import asyncio
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_is_normalized():
+    a = make_cache_key({"keyword": " IT導入 ", "order": "ASC", "industry": None})
+    b = make_cache_key({"order": "ASC", "keyword": "IT導入"})
+    assert a == b
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("jgrants_mcp_server.cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set("k", {"v": 1})
+    now[0] += 9
+    assert cache.get("k") == {"v": 1}
+    now[0] += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(ttl=60, max_entries=2, max_bytes=100)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    cache.get("a")  # a を最近使ったことにする
+    cache.set("c", 3, size=10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("d", 4, size=95)
+    assert cache.stats()["bytes"] <= 100
+    assert cache.get("d") == 4
+    assert cache.stats()["evictions"] == 3
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_counters():
+    cache = ResponseCache(ttl=60)
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"result": []}
+
+    results = await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+
+    await cache.get_or_fetch("k", fetch)
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 1)
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    cache = ResponseCache(ttl=60)
+    responses = iter([{"error": "HTTPエラー: 503"}, {"result": []}])
+
+    async def fetch():
+        return next(responses)
+
+    assert "error" in await cache.get_or_fetch("k", fetch, cacheable=lambda d: "error" not in d)
+    assert await cache.get_or_fetch("k", fetch, cacheable=lambda d: "error" not in d) == {"result": []}
+
+
+@pytest.mark.asyncio
+async def test_search_hits_upstream_once(stub_api):
+    stub_api.json("/subsidies", {"result": [{"id": "a0W1", "title": "IT導入補助金"}]})
+
+    first, second = await asyncio.gather(
+        core.search_subsidies.fn(keyword="IT導入"),
+        core.search_subsidies.fn(keyword="IT導入"),
+    )
+    third = await core.search_subsidies.fn(keyword=" IT導入 ", order="asc")
+
+    assert first["total_count"] == second["total_count"] == third["total_count"] == 1
+    assert len(stub_api.requests) == 1
+    stats = (await core.get_server_stats.fn())["search_cache"]
+    assert stats["misses"] == 1 and stats["hits"] + stats["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_and_revalidated(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("jgrants_mcp_server.cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=10, stale_ttl=60)
+    cache.set("k", {"v": 1})
+    release = asyncio.Event()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"v": 2}
+
+    now[0] += 30
+    assert cache.get("k") is None
+    # 古い結果をすぐに返し、再取得は裏で1回だけ行う
+    for _ in range(3):
+        value, age = await cache.get_or_fetch_stale("k", fetch)
+        assert (value, age) == ({"v": 1}, 30)
+    await asyncio.sleep(0)
+    assert calls == 1
+    release.set()
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert await cache.get_or_fetch_stale("k", fetch) == ({"v": 2}, None)
+    stats = cache.stats()
+    assert (stats["stale_hits"], stats["revalidations"]) == (3, 1)
+
+    # 許容範囲を過ぎたら取得を待つ
+    now[0] += 100
+    assert await cache.get_or_fetch_stale("k", fetch) == ({"v": 2}, None)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_search_serves_stale_result_while_upstream_is_down(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_SEARCH_CACHE", ResponseCache(ttl=0.05, stale_ttl=60))
+    stub_api.json("/subsidies", {"result": [{"id": "a0W1", "title": "IT導入補助金"}]})
+    fresh = await core.search_subsidies.fn(keyword="IT導入")
+    assert "stale" not in fresh
+
+    await asyncio.sleep(0.1)
+    stub_api.json("/subsidies", {"message": "unavailable"}, status=503)
+    stale = await core.search_subsidies.fn(keyword="IT導入")
+    assert stale["stale"] is True and stale["age_seconds"] >= 0.05
+    assert stale["subsidies"] == fresh["subsidies"]
+
+    # 復旧後は裏の再取得で新しい結果に入れ替わる
+    stub_api.json("/subsidies", {"result": [{"id": "a0W2", "title": "DX推進補助金"}]})
+    await core.search_subsidies.fn(keyword="IT導入")
+    await asyncio.sleep(0.05)
+    updated = await core.search_subsidies.fn(keyword="IT導入")
+    assert [s["id"] for s in updated["subsidies"]] == ["a0W2"]
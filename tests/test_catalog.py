@@ -0,0 +1,173 @@
+"""補助金カタログ（ローカルミラー）のテスト（スタブAPI使用）"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from jgrants_mcp_server import core
+
+
+def _iso(days: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+SUBSIDIES = [
+    {
+        "id": "a0W000000000001",
+        "title": "ＩＴ導入補助金",
+        "target_area_search": "全国",
+        "target_number_of_employees": "従業員数の制約なし",
+        "subsidy_max_limit": 4500000,
+        "acceptance_start_datetime": _iso(-10),
+        "acceptance_end_datetime": _iso(5),
+    },
+    {
+        "id": "a0W000000000002",
+        "title": "東京都 設備投資助成事業",
+        "target_area_search": "東京都 / 神奈川県",
+        "target_number_of_employees": "300名以下",
+        "subsidy_max_limit": 100000000,
+        "acceptance_start_datetime": _iso(-10),
+        "acceptance_end_datetime": _iso(60),
+    },
+    {
+        "id": "a0W000000000003",
+        "title": "大阪府 販路開拓支援事業",
+        "target_area_search": "大阪府",
+        "subsidy_max_limit": None,
+        "acceptance_start_datetime": _iso(-30),
+        "acceptance_end_datetime": _iso(20),
+    },
+]
+
+
+def _ids(result: dict) -> list:
+    return [s["id"] for s in result["subsidies"]]
+
+
+@pytest.mark.asyncio
+async def test_local_search_syncs_once_and_filters_locally(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+
+    result = await core.search_subsidies.fn("事業", source="local")
+    assert result["source"] == "local"
+    assert _ids(result) == ["a0W000000000003", "a0W000000000002"]
+    assert len(stub_api.requests) == 1
+
+    # 同期後は上流APIに問い合わせない
+    it = await core.search_subsidies.fn("it導入", source="local")
+    assert _ids(it) == ["a0W000000000001"]
+    kanagawa = await core.search_subsidies.fn("補助", source="local", target_area_search="神奈川県")
+    assert _ids(kanagawa) == []
+    area = await core.search_subsidies.fn("設備", source="local", target_area_search="神奈川県 / 千葉県")
+    assert _ids(area) == ["a0W000000000002"]
+    amount = await core.search_subsidies.fn("補助金", source="local", max_amount=5000000)
+    assert _ids(amount) == ["a0W000000000001"]
+    soon = await core.search_subsidies.fn("支援", source="local", deadline_within_days=30)
+    assert _ids(soon) == ["a0W000000000003"]
+    desc = await core.search_subsidies.fn("事業", source="local", order="DESC")
+    assert _ids(desc) == ["a0W000000000002", "a0W000000000003"]
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_is_incremental(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES[:2]})
+    first = await core.sync_catalog.fn()
+    assert (first["added"], first["updated"], first["unchanged"]) == (2, 0, 0)
+
+    changed = dict(SUBSIDIES[1], subsidy_max_limit=200000000)
+    stub_api.json("/subsidies", {"result": [SUBSIDIES[0], changed, SUBSIDIES[2]]})
+    second = await core.sync_catalog.fn()
+    assert (second["added"], second["updated"], second["unchanged"]) == (1, 1, 1)
+    assert second["catalog"]["records"] == 3
+    assert second["catalog"]["last_sync_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_syncs_are_coalesced(stub_api):
+    stub_api.delay = 0.1
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+
+    results = await asyncio.gather(*[
+        core.search_subsidies.fn("事業", source="local") for _ in range(5)
+    ])
+
+    assert all(_ids(r) == _ids(results[0]) for r in results)
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_auto_falls_back_to_catalog_on_upstream_error(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    await core.sync_catalog.fn()
+
+    stub_api.json("/subsidies", {"message": "Too Many Requests"}, status=429)
+    result = await core.search_subsidies.fn("設備投資", source="auto")
+
+    assert result["source"] == "local"
+    assert "429" in result["fallback_reason"]
+    assert _ids(result) == ["a0W000000000002"]
+
+    plain = await core.search_subsidies.fn("設備投資")
+    assert "error" in plain
+
+
+@pytest.mark.asyncio
+async def test_stale_catalog_is_refreshed_in_background(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": SUBSIDIES[:1]})
+    await core.sync_catalog.fn()
+    monkeypatch.setattr(core, "_CATALOG_SYNC_INTERVAL", 0.01)
+    await asyncio.sleep(0.05)
+
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    stale = await core.search_subsidies.fn("事業", source="local")
+    # 古いカタログで即座に応答し、同期は裏で行う
+    assert _ids(stale) == []
+    await asyncio.gather(*core._BACKGROUND_TASKS)
+    fresh = await core.search_subsidies.fn("事業", source="local")
+    assert _ids(fresh) == ["a0W000000000003", "a0W000000000002"]
+
+
+@pytest.mark.asyncio
+async def test_api_results_feed_catalog_and_detail_enriches_it(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    await core.search_subsidies.fn("事業")
+    # カタログへの取り込みは検索の応答後に裏で行われる
+    await asyncio.gather(*core._BACKGROUND_TASKS)
+    stats = (await core.get_server_stats.fn())["catalog"]
+    assert stats["records"] == 3
+    assert stats["last_sync_at"] is None
+
+    stub_api.json("/subsidies/id/a0W000000000002", {"result": [dict(
+        SUBSIDIES[1],
+        industry="製造業 / 建設業",
+        use_purpose="設備整備・IT導入をしたい",
+        detail="<p>生産性向上のための設備投資を支援</p>",
+        update_datetime="2025-05-01T00:00:00Z",
+    )]})
+    await core.get_subsidy_detail.fn("a0W000000000002")
+
+    # 同期済み扱いにして上流に問い合わせずに検索する
+    core._get_catalog().set_meta("last_sync_at", datetime.now(timezone.utc).isoformat())
+    requests = len(stub_api.requests)
+    manufacturing = await core.search_subsidies.fn("事業", source="local", industry="製造業")
+    # 業種が未取得の補助金（…003）は除外しない
+    assert _ids(manufacturing) == ["a0W000000000003", "a0W000000000002"]
+    retail = await core.search_subsidies.fn("事業", source="local", industry="卸売業、小売業")
+    assert _ids(retail) == ["a0W000000000003"]
+    productivity = await core.search_subsidies.fn("生産性", source="local")
+    assert _ids(productivity) == ["a0W000000000002"]
+    assert len(stub_api.requests) == requests
+    assert (await core.get_server_stats.fn())["catalog"]["with_detail"] == 1
+
+
+@pytest.mark.asyncio
+async def test_api_source_applies_amount_filter(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    result = await core.search_subsidies.fn("事業", min_amount=10000000)
+    assert result["source"] == "api"
+    assert _ids(result) == ["a0W000000000002"]
+    assert result["search_conditions"]["min_amount"] == 10000000
+    assert "error" in await core.search_subsidies.fn("事業", source="cache")
@@ -0,0 +1,126 @@
+"""条件付きGET（ETag / Last-Modified）と圧縮のネゴシエーションのテスト（スタブAPI使用）"""
+
+import base64
+import gzip
+import json
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.cache import ResponseCache
+
+SUBSIDY_ID = "a0W000000000001"
+ATTACHMENT = b"%PDF-1.4 " + b"guideline " * 20000
+
+
+def _detail(update_datetime: str, content: bytes) -> dict:
+    return {
+        "result": [{
+            "id": SUBSIDY_ID,
+            "title": "IT導入補助金",
+            "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+            "update_datetime": update_datetime,
+            "application_guidelines": [{"name": "公募要領.pdf", "data": base64.b64encode(content).decode()}],
+        }]
+    }
+
+
+def _etag_route(stub, path: str, state: dict) -> None:
+    """state["etag"] / state["body"] を返し、If-None-Match が一致すれば 304 を返す"""
+    def handler(req):
+        if req.headers.get("if-none-match") == state["etag"]:
+            return 304, {"ETag": state["etag"]}, b""
+        return 200, {"ETag": state["etag"]}, state["body"]
+
+    stub.route(path, handler)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_detail_is_revalidated_without_download(stub_api, monkeypatch):
+    # 保存済みの結果をすぐに返さず、上流からの取得を待つ
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    monkeypatch.setattr(core, "_STALE_GRACE", 5.0)
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    state = {"etag": '"v1"', "body": _detail("2025-01-01T00:00:00Z", ATTACHMENT)}
+    _etag_route(stub_api, path, state)
+
+    first = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    full_bytes = stub_api.bytes_sent
+    assert full_bytes > len(ATTACHMENT)
+
+    second = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert stub_api.requests[-1].headers["if-none-match"] == '"v1"'
+    assert stub_api.bytes_sent == full_bytes  # 304 はボディなし
+    assert second["files"] == first["files"]
+    assert "stale" not in second
+
+    # 更新されていれば取り直して保存し直す
+    state.update(etag='"v2"', body=_detail("2025-02-01T00:00:00Z", b"%PDF-1.4 updated"))
+    third = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert third["last_updated"] == "2025-02-01T00:00:00Z"
+    assert (core.FILES_DIR / SUBSIDY_ID / "公募要領.pdf").read_bytes() == b"%PDF-1.4 updated"
+
+    # 保存したファイルが欠けていれば条件付きにしない
+    (core.FILES_DIR / SUBSIDY_ID / "公募要領.pdf").unlink()
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert "if-none-match" not in stub_api.requests[-1].headers
+    assert (core.FILES_DIR / SUBSIDY_ID / "公募要領.pdf").exists()
+
+
+@pytest.mark.asyncio
+async def test_search_revalidates_with_last_modified(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_SEARCH_CACHE", ResponseCache(ttl=0))
+    last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+    listing = {"result": [{"id": f"a{i}", "title": f"補助金{i}"} for i in range(200)]}
+
+    def handler(req):
+        if req.headers.get("if-modified-since") == last_modified:
+            return 304, {}, b""
+        return 200, {"Last-Modified": last_modified}, listing
+
+    stub_api.route("/subsidies", handler)
+    before = (await core.get_server_stats.fn())["http"]
+
+    first = await core.search_subsidies.fn(keyword="補助金")
+    full_bytes = stub_api.bytes_sent
+    second = await core.search_subsidies.fn(keyword="補助金")
+    assert second["subsidies"] == first["subsidies"]
+    assert stub_api.bytes_sent == full_bytes
+
+    after = (await core.get_server_stats.fn())["http"]
+    assert after["not_modified"] - before["not_modified"] == 1
+    assert after["bytes_downloaded"] - before["bytes_downloaded"] == full_bytes
+
+    # 無効にすれば毎回ボディを取得する
+    monkeypatch.setattr(core, "_CONDITIONAL_REQUESTS", False)
+    await core.search_subsidies.fn(keyword="補助金")
+    assert stub_api.bytes_sent == full_bytes * 2
+
+
+@pytest.mark.asyncio
+async def test_compressed_responses_reduce_transfer(stub_api, monkeypatch):
+    payload = json.dumps(_detail("2025-01-01T00:00:00Z", ATTACHMENT)).encode()
+
+    def handler(req):
+        if "gzip" in req.headers.get("accept-encoding", ""):
+            return 200, {"Content-Type": "application/json", "Content-Encoding": "gzip"}, gzip.compress(payload)
+        return 200, {"Content-Type": "application/json"}, payload
+
+    stub_api.route(f"/subsidies/id/{SUBSIDY_ID}", handler)
+    monkeypatch.setattr(core, "_CONDITIONAL_REQUESTS", False)
+    # 保存済みの結果をすぐに返さず、上流からの取得を待つ
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    monkeypatch.setattr(core, "_STALE_GRACE", 5.0)
+
+    monkeypatch.setattr(core, "_ACCEPT_ENCODING", "identity")
+    plain = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    plain_bytes = stub_api.bytes_sent
+    assert stub_api.requests[-1].headers["accept-encoding"] == "identity"
+
+    monkeypatch.setattr(core, "_ACCEPT_ENCODING", "gzip, unknown")
+    monkeypatch.setattr(core, "_HTTP_CLIENT", None)
+    compressed = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert stub_api.requests[-1].headers["accept-encoding"] == "gzip"
+    assert stub_api.bytes_sent - plain_bytes < plain_bytes / 10
+    assert compressed["files"] == plain["files"]
+    assert (core.FILES_DIR / SUBSIDY_ID / "公募要領.pdf").read_bytes() == ATTACHMENT
@@ -0,0 +1,303 @@
+"""get_subsidy_detail の添付ファイル保存のテスト（スタブAPI使用）"""
+
+import asyncio
+import base64
+import contextlib
+import gc
+import json
+import os
+import time
+
+import pytest
+
+from jgrants_mcp_server import core
+
+SUBSIDY_ID = "a0W000000000001"
+
+
+def _detail(update_datetime: str, files: dict) -> dict:
+    return {
+        "result": [{
+            "id": SUBSIDY_ID,
+            "title": "IT導入補助金",
+            "detail": "<p>説明</p>",
+            "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+            "update_datetime": update_datetime,
+            "application_guidelines": [
+                {"name": name, "data": base64.b64encode(content).decode()}
+                for name, content in files.items()
+            ],
+        }]
+    }
+
+
+@contextlib.contextmanager
+def _frozen_heap():
+    """他のテストで溜まったオブジェクトの世代別GC（全体の走査で100ms以上止まる）を計測に含めない"""
+    gc.collect()
+    gc.freeze()
+    try:
+        yield
+    finally:
+        gc.unfreeze()
+
+
+def _count_decodes(monkeypatch) -> list:
+    calls = []
+    original = core.base64.b64decode
+
+    def counting(data, *args, **kwargs):
+        calls.append(len(data))
+        return original(data, *args, **kwargs)
+
+    monkeypatch.setattr(core.base64, "b64decode", counting)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_unchanged_detail_skips_decode_and_write(stub_api, monkeypatch):
+    stub_api.json(f"/subsidies/id/{SUBSIDY_ID}", _detail("2025-01-01T00:00:00Z", {
+        "公募要領.pdf": b"%PDF-1 guideline",
+        "様式 1.docx": b"form",
+    }))
+    decodes = _count_decodes(monkeypatch)
+
+    first = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    names = [f["name"] for f in first["files"]["application_guidelines"]]
+    assert names == ["公募要領.pdf", "様式_1.docx"]
+    assert len(decodes) == 2
+
+    subsidy_dir = core.FILES_DIR / SUBSIDY_ID
+    manifest = json.loads((subsidy_dir / ".manifest.json").read_text(encoding="utf-8"))
+    assert manifest["update_datetime"] == "2025-01-01T00:00:00Z"
+    assert manifest["files"]["公募要領.pdf"]["size"] == len(b"%PDF-1 guideline")
+    mtime = (subsidy_dir / "公募要領.pdf").stat().st_mtime_ns
+
+    second = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert second["files"] == first["files"]
+    assert second["status"] == "受付中"
+    assert len(decodes) == 2
+    assert (subsidy_dir / "公募要領.pdf").stat().st_mtime_ns == mtime
+
+
+@pytest.mark.asyncio
+async def test_updated_detail_rewrites_only_changed_files(stub_api, monkeypatch):
+    # 保存済みの結果をすぐに返さず、上流からの取得を待つ
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    monkeypatch.setattr(core, "_STALE_GRACE", 5.0)
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    stub_api.json(path, _detail("2025-01-01T00:00:00Z", {"a.pdf": b"aaa", "b.pdf": b"bbb", "c.pdf": b"ccc"}))
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+    decodes = _count_decodes(monkeypatch)
+    stub_api.json(path, _detail("2025-02-01T00:00:00Z", {"a.pdf": b"aaa", "b.pdf": b"BBB!"}))
+    result = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+    subsidy_dir = core.FILES_DIR / SUBSIDY_ID
+    assert len(decodes) == 1
+    assert (subsidy_dir / "b.pdf").read_bytes() == b"BBB!"
+    assert not (subsidy_dir / "c.pdf").exists()
+    assert [f["size"] for f in result["files"]["application_guidelines"]] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_missing_file_on_disk_is_restored(stub_api):
+    stub_api.json(f"/subsidies/id/{SUBSIDY_ID}", _detail("2025-01-01T00:00:00Z", {"a.pdf": b"aaa"}))
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+    (core.FILES_DIR / SUBSIDY_ID / "a.pdf").unlink()
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert (core.FILES_DIR / SUBSIDY_ID / "a.pdf").read_bytes() == b"aaa"
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_saving(tmp_path):
+    """大きな添付ファイルの保存中も ping が遅延なく応答すること"""
+    encoded = base64.b64encode(os.urandom(16 * 1024 * 1024)).decode()
+    subsidy = {"application_guidelines": [{"name": f"file{i}.pdf", "data": encoded} for i in range(4)]}
+    subsidy_dir = tmp_path / SUBSIDY_ID
+    subsidy_dir.mkdir()
+
+    with _frozen_heap():
+        save = asyncio.create_task(core._save_attachments(subsidy, SUBSIDY_ID, subsidy_dir, {}))
+        worst = 0.0
+        pings = 0
+        while not save.done():
+            start = time.perf_counter()
+            result = await core.ping.fn()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - start)
+            assert result["status"] == "ok"
+            pings += 1
+
+    saved, manifest_files = await save
+    assert [f["size"] for f in saved["application_guidelines"]] == [16 * 1024 * 1024] * 4
+    assert len(manifest_files) == 4
+    assert pings > 1
+    assert worst < 0.1, f"ping stalled for {worst * 1000:.0f} ms"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("metadata_only", [False, True])
+async def test_event_loop_stays_responsive_while_streaming(stub_api, monkeypatch, metadata_only):
+    """逐次パースで大きな添付ファイルを保存（メタデータのみなら読み飛ば）している間も ping が遅延なく応答すること"""
+    monkeypatch.setattr(core, "_STREAM_DETAIL_MIN_BYTES", 0)
+    files = {f"file{i}.pdf": os.urandom(16 * 1024 * 1024) for i in range(4)}
+    body = json.dumps(_detail("2025-01-01T00:00:00Z", files)).encode()
+    stub_api.route(f"/subsidies/id/{SUBSIDY_ID}", lambda req: (200, {"Content-Type": "application/json"}, body))
+
+    # 共有HTTPクライアント（SSLコンテキストの読み込み）は本番では起動時に作成済みなので計測に含めない
+    core._get_http_client()
+    with _frozen_heap():
+        fetch = asyncio.create_task(core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=metadata_only))
+        worst = 0.0
+        pings = 0
+        while not fetch.done():
+            start = time.perf_counter()
+            result = await core.ping.fn()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - start)
+            assert result["status"] == "ok"
+            pings += 1
+
+    detail = await fetch
+    size_key = "estimated_size" if metadata_only else "size"
+    assert [f[size_key] for f in detail["files"]["application_guidelines"]] == [16 * 1024 * 1024] * 4
+    assert pings > 1
+    assert worst < 0.1, f"ping stalled for {worst * 1000:.0f} ms"
+
+
+@pytest.mark.asyncio
+async def test_metadata_only_defers_decode_until_file_is_requested(stub_api, monkeypatch):
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    stub_api.json(path, _detail("2025-01-01T00:00:00Z", {"a.pdf": b"a" * 1000, "b.pdf": b"bb"}))
+    decodes = _count_decodes(monkeypatch)
+
+    result = await core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=True)
+    files = result["files"]["application_guidelines"]
+    assert [(f["name"], f["estimated_size"], f["downloaded"]) for f in files] == [
+        ("a.pdf", 1000, False), ("b.pdf", 2, False),
+    ]
+    assert result["metadata_only"] is True
+    subsidy_dir = core.FILES_DIR / SUBSIDY_ID
+    assert not (subsidy_dir / "a.pdf").exists()
+    assert decodes == []
+    assert not list(subsidy_dir.glob(".stream-*"))
+
+    # 要求されたときに初めて保存する（同時の要求は1回の取得にまとめる）
+    requests_before = len(stub_api.requests)
+    first, second = await asyncio.gather(
+        core.get_file_content.fn(SUBSIDY_ID, "a.pdf", return_format="base64"),
+        core.get_file_content.fn(SUBSIDY_ID, "b.pdf", return_format="base64"),
+    )
+    assert base64.b64decode(first["content_base64"]) == b"a" * 1000
+    assert base64.b64decode(second["content_base64"]) == b"bb"
+    assert len(stub_api.requests) == requests_before + 1
+
+    # 2回目のメタデータはキャッシュから返す（保存済みかどうかはその時点のファイルで判定する）
+    again = await core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=True)
+    assert all(f["downloaded"] for f in again["files"]["application_guidelines"])
+    assert len(stub_api.requests) == requests_before + 1
+
+    # 一覧にないファイルは上流に問い合わせない
+    missing = await core.get_file_content.fn(SUBSIDY_ID, "missing.pdf")
+    assert "error" in missing
+    assert len(stub_api.requests) == requests_before + 1
+
+
+def test_size_sink_estimates_decoded_size_across_chunks():
+    for size in range(0, 40):
+        encoded = base64.encodebytes(os.urandom(size))
+        for split in range(len(encoded) + 1):
+            sink = core._SizeSink()
+            sink.write(encoded[:split])
+            sink.write(encoded[split:])
+            assert sink.close().size == size
+        assert core._estimate_decoded_size(encoded.decode()) == size
+
+
+@pytest.mark.asyncio
+async def test_saved_detail_is_served_when_upstream_is_slow_or_down(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    stub_api.json(path, _detail("2025-01-01T00:00:00Z", {"a.pdf": b"aaa"}))
+    first = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert "stale" not in first
+
+    # 応答が遅ければ保存済みの結果を返し、取得は裏で続けて保存し直す
+    monkeypatch.setattr(core, "_STALE_GRACE", 0.1)
+    stub_api.delay = 0.4
+    stub_api.json(path, _detail("2025-02-01T00:00:00Z", {"a.pdf": b"AAAA"}))
+    started = time.monotonic()
+    slow = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert time.monotonic() - started < 0.3
+    assert slow["stale"] is True and "stale_reason" in slow
+    assert slow["last_updated"] == "2025-01-01T00:00:00Z"
+    await asyncio.sleep(0.5)
+    assert (core.FILES_DIR / SUBSIDY_ID / "a.pdf").read_bytes() == b"AAAA"
+
+    # 上流がエラーでも保存済みの結果を返す（404 はそのまま）
+    stub_api.delay = 0
+    stub_api.json(path, {"message": "unavailable"}, status=503)
+    down = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert down["stale"] is True and "HTTPエラー: 503" in down["stale_reason"]
+    assert down["last_updated"] == "2025-02-01T00:00:00Z"
+    stub_api.json(path, {"message": "not found"}, status=404)
+    assert "見つかりません" in (await core.get_subsidy_detail.fn(SUBSIDY_ID))["error"]
+
+    # 許容範囲より古ければ使わない
+    stub_api.json(path, {"message": "unavailable"}, status=503)
+    monkeypatch.setattr(core, "_DETAIL_MAX_STALE", 0.01)
+    await asyncio.sleep(0.05)
+    assert "error" in await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+
+@pytest.mark.asyncio
+async def test_saved_detail_is_served_at_once_and_revalidated_in_slow_lane(stub_api, monkeypatch):
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    stub_api.json(path, _detail("2025-01-01T00:00:00Z", {"a.pdf": b"aaa"}))
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+
+    # 既定（JGRANTS_STALE_GRACE=0）では上流を待たずに保存済みの結果を返す
+    stub_api.delay = 0.3
+    stub_api.json(path, _detail("2025-02-01T00:00:00Z", {"a.pdf": b"AAAA"}))
+    started = time.monotonic()
+    stale = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert time.monotonic() - started < 0.2
+    assert stale["stale"] is True and stale["last_updated"] == "2025-01-01T00:00:00Z"
+
+    # 裏での取り直しは slow レーンの枠を使う
+    await asyncio.sleep(0.05)
+    assert core._SLOW_LANE.stats()["active"] == 1
+    await asyncio.gather(*core._BACKGROUND_TASKS)
+    assert core._SLOW_LANE.stats()["completed"] == 3
+    assert (core.FILES_DIR / SUBSIDY_ID / "a.pdf").read_bytes() == b"AAAA"
+
+
+@pytest.mark.asyncio
+async def test_fresh_detail_skips_upstream_and_withdrawn_detail_is_not_served(stub_api, monkeypatch):
+    path = f"/subsidies/id/{SUBSIDY_ID}"
+    stub_api.json(path, _detail("2025-01-01T00:00:00Z", {"a.pdf": b"aaa"}))
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+    # JGRANTS_DETAIL_FRESH_TTL 以内は上流に問い合わせず、古い結果の印も付けない
+    requests = len(stub_api.requests)
+    fresh = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert "stale" not in fresh and fresh["last_updated"] == "2025-01-01T00:00:00Z"
+    assert len(stub_api.requests) == requests
+    assert not core._BACKGROUND_TASKS
+
+    # 期間を過ぎたら古い結果を返して取り直す（同じ補助金の取り直しは同時に1つまで）
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    stub_api.delay = 0.2
+    stub_api.json(path, {"message": "not found"}, status=404)
+    results = await asyncio.gather(*(core.get_subsidy_detail.fn(SUBSIDY_ID) for _ in range(3)))
+    assert all(r["stale"] is True for r in results)
+    assert len(core._DETAIL_REVALIDATIONS) == 1
+    await asyncio.gather(*core._BACKGROUND_TASKS)
+    assert len(stub_api.requests) == requests + 1
+
+    # 取り直しで 404 になった（取り下げられた）補助金は、保存済みの結果を返さない
+    stub_api.delay = 0
+    assert "見つかりません" in (await core.get_subsidy_detail.fn(SUBSIDY_ID))["error"]
@@ -0,0 +1,276 @@
+"""get_file_content のテスト（ローカルファイルのみ、API呼び出しなし）"""
+
+import asyncio
+import base64
+import threading
+
+import pytest
+
+from jgrants_mcp_server import converter, core
+from jgrants_mcp_server.converter import ConversionEngine
+from tests.sample_files import make_pdf
+
+SUBSIDY_ID = "a0W000000000001"
+
+
+@pytest.fixture
+def files_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(core, "FILES_DIR", tmp_path)
+    (tmp_path / SUBSIDY_ID).mkdir()
+    return tmp_path / SUBSIDY_ID
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """スレッド1本で動く変換エンジン（submitted で実際の変換回数を数える）"""
+    engine = ConversionEngine(max_workers=0)
+    monkeypatch.setattr(core, "_CONVERTER", engine)
+    yield engine
+    engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_markdown_conversion_is_cached_on_disk(files_dir, engine):
+    (files_dir / "一覧.csv").write_text("名称,金額\nIT導入,450\n", encoding="utf-8")
+
+    first = await core.get_file_content.fn(SUBSIDY_ID, "一覧.csv")
+    second = await core.get_file_content.fn(SUBSIDY_ID, "一覧.csv")
+
+    assert first["extraction_method"] == "markitdown_csv"
+    assert "IT導入" in first["content_markdown"]
+    assert second == first
+    assert engine.submitted == 1
+    assert (files_dir / ".markdown" / "一覧.csv.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_cache_survives_restart_and_invalidates_on_change(files_dir, engine, monkeypatch):
+    path = files_dir / "memo.txt"
+    path.write_text("賃上げ枠", encoding="utf-8")
+    await core.get_file_content.fn(SUBSIDY_ID, "memo.txt")
+
+    # 再起動相当: メモリ上の状態を捨ててもディスクのキャッシュが使われる
+    monkeypatch.setattr(core, "_FILE_HASHES", {})
+    monkeypatch.setattr(converter, "_MARKITDOWN", None)
+    await core.get_file_content.fn(SUBSIDY_ID, "memo.txt")
+    assert engine.submitted == 1
+
+    path.write_text("通常枠と賃上げ枠", encoding="utf-8")
+    changed = await core.get_file_content.fn(SUBSIDY_ID, "memo.txt")
+    assert "通常枠" in changed["content_markdown"]
+    assert engine.submitted == 2
+
+    monkeypatch.setattr(core, "_CONVERTER_VERSION", "markitdown-99/pdfplumber-99/format-1")
+    await core.get_file_content.fn(SUBSIDY_ID, "memo.txt")
+    assert engine.submitted == 3
+
+
+def test_markitdown_instance_is_shared():
+    assert converter._get_markitdown() is converter._get_markitdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_conversion(files_dir):
+    """ワーカープロセスで変換し、結果はキャッシュと同じ形で返る"""
+    (files_dir / "一覧.csv").write_text("名称,金額\nIT導入,450\n", encoding="utf-8")
+    engine = ConversionEngine(max_workers=2, timeout=60)
+    try:
+        results = await asyncio.gather(*[
+            engine.convert(files_dir / "一覧.csv", ".csv", "text/csv") for _ in range(3)
+        ])
+    finally:
+        engine.shutdown()
+    assert all(r == results[0] for r in results)
+    assert results[0][1] == "markitdown_csv"
+    assert engine.stats()["completed"] == 3
+    assert engine.stats()["mode"] == "process"
+
+
+@pytest.mark.asyncio
+async def test_size_guard_rejects_without_converting(files_dir, engine):
+    engine.max_bytes = 10
+    (files_dir / "大きい.txt").write_text("あ" * 100, encoding="utf-8")
+
+    result = await core.get_file_content.fn(SUBSIDY_ID, "大きい.txt")
+
+    assert "上限" in result["error"]
+    assert engine.submitted == 0
+    assert engine.rejected == 1
+    # base64 なら取得できる
+    raw = await core.get_file_content.fn(SUBSIDY_ID, "大きい.txt", "base64")
+    assert raw["size_bytes"] == 300
+
+
+def test_page_guard(tmp_path):
+    pdf = make_pdf(["p1", "p2", "p3"])
+    path = tmp_path / "要領.pdf"
+    path.write_bytes(pdf)
+    with pytest.raises(converter.ConversionRejected):
+        converter.convert_to_markdown(str(path), ".pdf", "application/pdf", max_pages=2)
+
+
+def test_worker_timeout_interrupts_conversion(monkeypatch, tmp_path):
+    """ワーカー（メインスレッド）では SIGALRM で変換を打ち切る"""
+    path = tmp_path / "memo.txt"
+    path.write_text("x", encoding="utf-8")
+
+    def slow(*args):
+        while True:
+            pass
+
+    monkeypatch.setattr(converter, "_convert", slow)
+    with pytest.raises(converter.ConversionTimeout):
+        converter.convert_to_markdown(str(path), ".txt", "text/plain", timeout=0.2)
+
+
+@pytest.mark.asyncio
+async def test_thread_mode_timeout_frees_the_worker(files_dir):
+    """スレッドモードでタイムアウトした変換は止められないが、次のジョブは新しいスレッドですぐに実行される"""
+    (files_dir / "memo.txt").write_text("x", encoding="utf-8")
+    engine = ConversionEngine(max_workers=0, timeout=0.2)
+    release = threading.Event()
+    try:
+        with pytest.raises(converter.ConversionTimeout):
+            await engine._run(release.wait, 10)
+        result = await asyncio.wait_for(engine.convert(files_dir / "memo.txt", ".txt", "text/plain"), timeout=5)
+    finally:
+        release.set()
+        engine.shutdown()
+    assert result[0].strip() == "x"
+    stats = engine.stats()
+    assert (stats["timeouts"], stats["abandoned"], stats["completed"], stats["running"]) == (1, 1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_timeout_counts_from_job_start(files_dir):
+    """ワーカーの空きを待っていた時間はタイムアウトに数えない"""
+    engine = ConversionEngine(max_workers=0, timeout=0.3)
+    try:
+        # 1本しかないワーカーを 0.2 秒ずつ使うジョブを4つ並べても、どれもタイムアウトしない
+        await asyncio.gather(*(engine._run(threading.Event().wait, 0.2) for _ in range(4)))
+    finally:
+        engine.shutdown()
+    assert (engine.timeouts, engine.completed) == (0, 4)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_drops_queued_job(files_dir):
+    """呼び出し側がキャンセルされたら、未着手のジョブは実行されない"""
+    (files_dir / "memo.txt").write_text("x", encoding="utf-8")
+    engine = ConversionEngine(max_workers=0)
+    release = threading.Event()
+    # 唯一のワーカースレッドを塞いで、変換ジョブを待機状態にする
+    blocker = engine._get_executor().submit(release.wait, 10)
+
+    task = asyncio.create_task(engine.convert(files_dir / "memo.txt", ".txt", "text/plain"))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    release.set()
+    await asyncio.wrap_future(blocker)
+    engine.shutdown()
+
+    assert engine.cancelled == 1
+    assert engine.completed == 0
+    assert engine.running == 0
+
+
+@pytest.mark.asyncio
+async def test_markdown_paging_by_chars(files_dir, engine):
+    (files_dir / "memo.txt").write_text("0123456789", encoding="utf-8")
+
+    first = await core.get_file_content.fn(SUBSIDY_ID, "memo.txt", offset=0, limit=4)
+    assert first["content_markdown"] == "0123"
+    assert first["range"] == {"unit": "chars", "offset": 0, "limit": 4, "returned": 4, "total": 10}
+    assert first["next_cursor"] == 4
+
+    rest = []
+    cursor = first["next_cursor"]
+    while cursor is not None:
+        page = await core.get_file_content.fn(SUBSIDY_ID, "memo.txt", offset=cursor, limit=4)
+        rest.append(page["content_markdown"])
+        cursor = page["next_cursor"]
+    assert first["content_markdown"] + "".join(rest) == "0123456789"
+    # 変換は1回だけ（2回目以降はキャッシュから切り出す）
+    assert engine.submitted == 1
+
+    whole = await core.get_file_content.fn(SUBSIDY_ID, "memo.txt")
+    assert whole["content_markdown"] == "0123456789"
+    assert whole["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_pdf_paging_extracts_only_requested_pages(files_dir, engine):
+    (files_dir / "要領.pdf").write_bytes(make_pdf(["Alpha", "Bravo", "Charlie", "Delta", "Echo"]))
+
+    result = await core.get_file_content.fn(SUBSIDY_ID, "要領.pdf", offset=1, limit=2, unit="pages")
+
+    assert result["extraction_method"] == "pdfplumber_pages"
+    assert "## ページ 2" in result["content_markdown"]
+    assert "Bravo" in result["content_markdown"] and "Charlie" in result["content_markdown"]
+    assert "Alpha" not in result["content_markdown"] and "Delta" not in result["content_markdown"]
+    assert result["range"]["total"] == 5
+    assert result["next_cursor"] == 3
+
+    # 抽出済みのページはキャッシュから返し、足りないページだけ抽出する
+    again = await core.get_file_content.fn(SUBSIDY_ID, "要領.pdf", offset=1, limit=2, unit="pages")
+    assert again == result
+    assert engine.submitted == 1
+    last = await core.get_file_content.fn(SUBSIDY_ID, "要領.pdf", offset=3, unit="pages")
+    assert "Echo" in last["content_markdown"]
+    assert last["next_cursor"] is None
+    assert engine.submitted == 2
+
+
+@pytest.mark.asyncio
+async def test_pdf_paging_respects_max_pages(files_dir, engine):
+    engine.max_pages = 2
+    (files_dir / "要領.pdf").write_bytes(make_pdf(["Alpha", "Bravo", "Charlie"]))
+
+    result = await core.get_file_content.fn(SUBSIDY_ID, "要領.pdf", unit="pages")
+
+    assert result["range"]["returned"] == 2
+    assert result["next_cursor"] == 2
+
+
+@pytest.mark.asyncio
+async def test_base64_byte_range(files_dir):
+    data = bytes(range(256)) * 4
+    (files_dir / "様式.bin").write_bytes(data)
+
+    chunks = []
+    cursor = 0
+    while cursor is not None:
+        part = await core.get_file_content.fn(SUBSIDY_ID, "様式.bin", "base64", offset=cursor, limit=300)
+        assert part["range"]["unit"] == "bytes"
+        chunks.append(base64.b64decode(part["content_base64"]))
+        cursor = part["next_cursor"]
+    assert b"".join(chunks) == data
+    assert len(chunks) == 4
+
+
+@pytest.mark.asyncio
+async def test_char_range_is_rejected_when_markdown_falls_back_to_base64(files_dir):
+    data = bytes(range(256))
+    (files_dir / "様式.bin").write_bytes(data)
+
+    # Markdownに変換できないファイルは、範囲の指定がなければ base64 で全体を返す
+    whole = await core.get_file_content.fn(SUBSIDY_ID, "様式.bin")
+    assert base64.b64decode(whole["content_base64"]) == data
+    assert whole["range"]["unit"] == "bytes"
+
+    # 文字数の範囲はバイトとして読まずにエラーにする
+    rejected = await core.get_file_content.fn(SUBSIDY_ID, "様式.bin", offset=10, limit=20)
+    assert "error" in rejected and "base64" in rejected["hint"]
+    part = await core.get_file_content.fn(SUBSIDY_ID, "様式.bin", "base64", offset=10, limit=20, unit="bytes")
+    assert base64.b64decode(part["content_base64"]) == data[10:30]
+    assert part["next_cursor"] == 30
+
+
+@pytest.mark.asyncio
+async def test_paging_parameter_validation(files_dir):
+    (files_dir / "memo.txt").write_text("x", encoding="utf-8")
+    assert "error" in await core.get_file_content.fn(SUBSIDY_ID, "memo.txt", offset=-1)
+    assert "error" in await core.get_file_content.fn(SUBSIDY_ID, "memo.txt", limit=0)
+    assert "error" in await core.get_file_content.fn(SUBSIDY_ID, "memo.txt", unit="pages")
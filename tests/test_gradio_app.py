@@ -0,0 +1,150 @@
+"""Gradioラッパー関数のテスト（スタブAPI使用）"""
+
+import base64
+import inspect
+import time
+
+import pytest
+
+from jgrants_mcp_server import core, gradio_mcp_app
+
+SUBSIDY = {
+    "id": "a0W000000000001",
+    "title": "IT導入補助金",
+    "acceptance_start_datetime": "2025-01-01T00:00:00Z",
+    "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+    "subsidy_max_limit": 4500000,
+    "target_area_search": "全国",
+}
+
+
+def test_wrappers_are_coroutines():
+    """イベントループを作り直さないよう、API呼び出しを伴うラッパーは async であること"""
+    for fn in (
+        gradio_mcp_app.search_subsidies,
+        gradio_mcp_app.get_detail,
+        gradio_mcp_app.get_overview,
+        gradio_mcp_app.get_file,
+        gradio_mcp_app.server_ping,
+        gradio_mcp_app.server_stats,
+        gradio_mcp_app.search_files,
+    ):
+        assert inspect.iscoroutinefunction(fn), fn.__name__
+    assert inspect.isasyncgenfunction(gradio_mcp_app.search_subsidies_stream)
+    assert inspect.isasyncgenfunction(gradio_mcp_app.search_subsidies_next_page)
+
+
+@pytest.mark.asyncio
+async def test_search_reuses_pooled_connection(stub_api):
+    """同じループ上の連続リクエストは共有クライアントのKeep-Alive接続を再利用する"""
+    stub_api.json("/subsidies", {"result": [SUBSIDY]})
+
+    for keyword in ("IT導入", "DX推進", "設備投資"):
+        summary, df = await gradio_mcp_app.search_subsidies(keyword)
+        assert summary.startswith("✅")
+        assert list(df["ID"]) == [SUBSIDY["id"]]
+
+    assert len(stub_api.requests) == 3
+    assert stub_api.connections == 1
+    assert core._get_http_client() is core._HTTP_CLIENT
+
+
+@pytest.mark.asyncio
+async def test_ping_wrapper_calls_core_tool():
+    output = await gradio_mcp_app.server_ping()
+    assert output.startswith("✅")
+
+
+@pytest.mark.asyncio
+async def test_search_wrapper_can_use_local_catalog(stub_api):
+    stub_api.json("/subsidies", {"result": [SUBSIDY]})
+    summary, df = await gradio_mcp_app.search_subsidies("IT導入", source="local")
+    assert "ローカルカタログ" in summary
+    assert list(df["ID"]) == [SUBSIDY["id"]]
+
+
+@pytest.mark.asyncio
+async def test_search_stream_shows_table_before_details(stub_api, monkeypatch):
+    monkeypatch.setattr(gradio_mcp_app, "_PREFETCH_DETAILS", 1)
+    other = {**SUBSIDY, "id": "a0W000000000002", "title": "DX推進補助金"}
+    stub_api.json("/subsidies", {"result": [SUBSIDY, other]})
+
+    def detail(req):
+        time.sleep(0.3)
+        return 200, {}, {"result": [{
+            **SUBSIDY,
+            "target_industry": "製造業",
+            "application_guidelines": [{"name": "公募要領.pdf", "data": base64.b64encode(b"%PDF-1").decode()}],
+        }]}
+
+    stub_api.route(f"/subsidies/id/{SUBSIDY['id']}", detail)
+
+    updates = []
+    started = time.monotonic()
+    async for summary, df, cursor in gradio_mcp_app.search_subsidies_stream("IT導入"):
+        updates.append((time.monotonic() - started, summary, df))
+        assert cursor == ""
+
+    # 検索中の表示 → 一覧の内容の表（詳細は取得中） → 詳細を埋めた表
+    assert updates[0][1].startswith("🔍") and updates[0][2].empty
+    elapsed, summary, df = updates[1]
+    assert elapsed < 0.3
+    assert list(df["ID"]) == [SUBSIDY["id"], other["id"]]
+    assert list(df["業種"]) == ["⏳", ""]
+    assert df["残り日数"][0] > 0
+
+    elapsed, summary, df = updates[-1]
+    assert elapsed >= 0.3
+    assert summary.startswith("✅") and "⏳" not in summary
+    assert list(df["業種"]) == ["製造業", ""]
+    assert df["添付"][0] == 1
+    # 先読みでは添付ファイルを保存しない
+    assert not (core.FILES_DIR / SUBSIDY["id"] / "公募要領.pdf").exists()
+
+
+@pytest.mark.asyncio
+async def test_search_stream_reports_errors(stub_api):
+    stub_api.route("/subsidies", lambda req: (500, {}, {}))
+    updates = [u async for u in gradio_mcp_app.search_subsidies_stream("IT導入")]
+    assert len(updates) == 2
+    assert updates[-1][0].startswith("❌")
+
+
+@pytest.mark.asyncio
+async def test_search_table_is_paged(stub_api, monkeypatch):
+    monkeypatch.setattr(gradio_mcp_app, "_PREFETCH_DETAILS", 0)
+    listing = [{**SUBSIDY, "id": f"a0W{i:012d}"} for i in range(120)]
+    stub_api.json("/subsidies", {"result": listing})
+
+    *_, (summary, df, cursor) = [u async for u in gradio_mcp_app.search_subsidies_stream("IT導入", page_size=50)]
+    assert "120件（1〜50件目を表示）" in summary
+    assert len(df) == 50 and cursor
+
+    pages = [df]
+    while cursor:
+        *_, (summary, df, cursor) = [u async for u in gradio_mcp_app.search_subsidies_next_page(cursor, 50)]
+        pages.append(df)
+    assert "101〜120件目" in summary
+    assert [len(p) for p in pages] == [50, 50, 20]
+    assert [i for p in pages for i in p["ID"]] == [s["id"] for s in listing]
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_local_search_table_is_paged(stub_api, monkeypatch):
+    monkeypatch.setattr(gradio_mcp_app, "_PREFETCH_DETAILS", 0)
+    listing = [{**SUBSIDY, "id": f"a0W{i:012d}"} for i in range(120)]
+    stub_api.json("/subsidies", {"result": listing})
+
+    # ローカルカタログでの検索も全件を保存し、51件目以降へページ送りできる
+    *_, (summary, df, cursor) = [
+        u async for u in gradio_mcp_app.search_subsidies_stream("IT導入", source="local", page_size=50)
+    ]
+    assert "120件（1〜50件目を表示）" in summary
+    assert len(df) == 50 and cursor
+
+    ids = list(df["ID"])
+    while cursor:
+        *_, (summary, df, cursor) = [u async for u in gradio_mcp_app.search_subsidies_next_page(cursor, 50)]
+        ids += list(df["ID"])
+    assert sorted(ids) == sorted(s["id"] for s in listing)
@@ -0,0 +1,180 @@
+"""ツールの実行レーン（同時実行数の制限と待ち行列）のテスト"""
+
+import asyncio
+
+import pytest
+
+from jgrants_mcp_server import core, gradio_mcp_app
+from jgrants_mcp_server.lanes import ConcurrencyLane, LaneFull
+
+
+@pytest.mark.asyncio
+async def test_lane_limits_concurrency_and_serves_in_order():
+    lane = ConcurrencyLane("test", limit=2)
+    running = []
+    order = []
+
+    async def job(i):
+        async with lane.slot():
+            running.append(i)
+            order.append(i)
+            assert len(running) <= 2
+            await asyncio.sleep(0.01)
+            running.remove(i)
+
+    await asyncio.gather(*(job(i) for i in range(6)))
+    assert order == list(range(6))
+    stats = lane.stats()
+    assert stats["peak_active"] == 2
+    assert stats["peak_waiting"] == 4
+    assert stats["completed"] == 6
+    assert stats["active"] == 0 and stats["waiting"] == 0
+    assert stats["wait_ms"]["max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_lane_serves_higher_priority_waiters_first():
+    lane = ConcurrencyLane("test", limit=1)
+    release = asyncio.Event()
+    order = []
+
+    async def hold():
+        async with lane.slot():
+            await release.wait()
+
+    async def job(name, priority):
+        async with lane.slot(priority=priority):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    jobs = [asyncio.create_task(job(name, priority)) for name, priority in
+            [("background", 2), ("bulk-1", 1), ("interactive", 0), ("bulk-2", 1)]]
+    await asyncio.sleep(0)
+    assert lane.waiting == 4
+
+    release.set()
+    await asyncio.gather(holder, *jobs)
+    # 優先度の順、同じ優先度なら先着順
+    assert order == ["interactive", "bulk-1", "bulk-2", "background"]
+
+
+@pytest.mark.asyncio
+async def test_tool_limit_does_not_block_other_tools():
+    lane = ConcurrencyLane("test", limit=3, tool_limits={"convert": 1})
+    release = asyncio.Event()
+    started = []
+
+    async def job(tool, i):
+        async with lane.slot(tool):
+            started.append((tool, i))
+            await release.wait()
+
+    tasks = [asyncio.create_task(job("convert", i)) for i in range(3)]
+    await asyncio.sleep(0)
+    # convert は1つしか動かず、残りの枠は他のツールがすぐに使える
+    assert started == [("convert", 0)] and lane.waiting == 2
+    tasks.append(asyncio.create_task(job("detail", 0)))
+    await asyncio.sleep(0)
+    assert ("detail", 0) in started
+    assert lane.stats()["tools"] == {"convert": {"limit": 1, "active": 1}}
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert started[-2:] == [("convert", 1), ("convert", 2)]
+    stats = lane.stats()
+    assert (stats["active"], stats["waiting"], stats["completed"]) == (0, 0, 4)
+    assert stats["tools"]["convert"]["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lane_rejects_when_queue_is_full_or_wait_times_out():
+    lane = ConcurrencyLane("test", limit=1, max_queue=1, queue_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with lane.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    # 待ちが上限（1件）なので即座に断る
+    with pytest.raises(LaneFull):
+        async with lane.slot():
+            pass
+    # 待っていた呼び出しは queue_timeout で打ち切られる
+    with pytest.raises(LaneFull):
+        await waiter
+    assert lane.waiting == 0
+
+    release.set()
+    await holder
+    stats = lane.stats()
+    assert (stats["rejected"], stats["timeouts"], stats["active"]) == (1, 1, 0)
+
+    # 打ち切り・拒否の後も枠は正しく使える
+    async with lane.slot():
+        assert lane.active == 1
+
+
+@pytest.mark.asyncio
+async def test_busy_slow_lane_does_not_block_search(stub_api, monkeypatch):
+    stub_api.route("/subsidies", lambda req: (200, {}, {"result": [{"id": "a001", "title": "IT導入補助金"}]}))
+    monkeypatch.setattr(core, "_SLOW_LANE", ConcurrencyLane("slow", limit=1, max_queue=1, queue_timeout=0.05))
+
+    release = asyncio.Event()
+
+    async def heavy_job():
+        async with core._SLOW_LANE.slot():
+            await release.wait()
+
+    heavy = asyncio.create_task(heavy_job())
+    await asyncio.sleep(0)
+
+    # 重い処理が枠を使い切っていても検索は待たされない
+    result = await asyncio.wait_for(core.search_subsidies.fn("IT"), timeout=5)
+    assert result["total_count"] == 1
+
+    # 混雑した slow レーンのツールはエラーを返す（例外にしない）
+    busy = await core.get_file_content.fn("a001", "公募要領.pdf")
+    assert "混雑" in busy["error"]
+
+    release.set()
+    await heavy
+    stats = (await core.get_server_stats.fn())["lanes"]
+    assert stats["fast"]["completed"] == 1
+    assert stats["slow"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_web_ui_search_and_prefetch_run_in_fast_lane(stub_api, monkeypatch):
+    subsidies = [{"id": f"a00{i}", "title": f"補助金{i}"} for i in range(3)]
+    stub_api.json("/subsidies", {"result": subsidies})
+    for s in subsidies:
+        stub_api.json(f"/subsidies/id/{s['id']}", {"result": [s]})
+    monkeypatch.setattr(gradio_mcp_app, "_PREFETCH_DETAILS", 2)
+
+    # 検索1回と詳細の先読み2件が fast レーンの枠を使う
+    updates = [u async for u in gradio_mcp_app.search_subsidies_stream("補助金")]
+    assert updates[-1][0].startswith("✅")
+    assert core._FAST_LANE.stats()["completed"] == 3
+
+    # fast レーンが混雑していれば Web UI の検索も断られる
+    monkeypatch.setattr(core, "_FAST_LANE", ConcurrencyLane("fast", limit=1, max_queue=1, queue_timeout=0.05))
+    core._SEARCH_CACHE.clear()
+    async with core._FAST_LANE.slot():
+        updates = [u async for u in gradio_mcp_app.search_subsidies_stream("補助金")]
+    assert updates[-1][0].startswith("❌") and "混雑" in updates[-1][0]
+
+
+def test_gradio_handlers_use_matching_lanes():
+    demo = gradio_mcp_app.create_gradio_app()
+    lanes = {fn.api_name: (fn.concurrency_id, fn.concurrency_limit) for fn in demo.fns.values()}
+    # 同時実行数はツールのレーンで制限するので、Gradio 側では二重に制限しない
+    assert lanes["search_subsidies"] == ("fast", None)
+    assert lanes["get_overview"] == ("fast", None)
+    assert lanes["get_file"] == ("slow", None)
+    assert lanes["search_files"] == ("slow", None)
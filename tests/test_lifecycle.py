@@ -0,0 +1,120 @@
+"""共有HTTPクライアントのライフサイクル（起動時のウォームアップ・終了時のクローズ・/healthz）のテスト（スタブAPI使用）"""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.converter import ConversionEngine
+from jgrants_mcp_server.gradio_mcp_app import _app_lifespan
+
+LISTING = {"result": [{"id": "a0W1", "title": "IT導入補助金", "acceptance_end_datetime": "2099-01-01T00:00:00Z"}]}
+
+
+async def _wait_ready(timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, body = core.health()
+        if status == 200:
+            return body
+        await asyncio.sleep(0.02)
+    raise AssertionError("ウォームアップが終わりませんでした")
+
+
+@pytest.mark.asyncio
+async def test_startup_warms_connections_and_catalog(stub_api, monkeypatch):
+    stub_api.json("/subsidies", LISTING)
+    stub_api.delay = 0.1
+    monkeypatch.setattr(core, "_WARMUP_CONNECTIONS", 3)
+    monkeypatch.setattr(core, "_WARMUP_CATALOG", True)
+
+    async with core.lifespan():
+        status, body = core.health()
+        assert (status, body["status"]) == (503, "warming_up")
+
+        body = await _wait_ready()
+        assert body["warmup"]["connections"] == 3
+        assert body["warmup"]["catalog"] == "ok"
+        assert stub_api.connections == 3
+        assert sum(1 for r in stub_api.requests if r.method == "HEAD") == 3
+        # 接続を開く HEAD はレート制限・サーキットブレーカーを通さない（カタログ同期の GET だけが数えられる）
+        assert core._UPSTREAM.requests == sum(1 for r in stub_api.requests if r.method == "GET")
+
+        # 最初の利用者は温めた接続をそのまま使う
+        stub_api.delay = 0
+        result = await core.search_subsidies.fn(keyword="IT導入", source="local")
+        assert result["total_count"] == 1
+        await core._get_json(f"{core.API_BASE_URL}/subsidies", {"keyword": "DX"})
+        assert stub_api.connections == 3
+
+    assert core._HTTP_CLIENT is None
+    assert core.health()[0] == 503
+
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_a_slow_warm_up(stub_api, monkeypatch):
+    stub_api.json("/subsidies", LISTING)
+    stub_api.delay = 0.5
+    monkeypatch.setattr(core, "_WARMUP_CATALOG", False)
+
+    started = time.monotonic()
+    async with core.lifespan():
+        await asyncio.sleep(0.05)
+    assert time.monotonic() - started < 0.4
+    assert not core._BACKGROUND_TASKS
+    assert core.health()[1]["warmup"] is None
+
+
+def test_gradio_app_serves_healthz_after_warm_up(stub_api, monkeypatch):
+    stub_api.json("/subsidies", LISTING)
+    monkeypatch.setattr(core, "_WARMUP_CATALOG", False)
+    monkeypatch.setattr(core, "_WARMUP_TIMEOUT", 5.0)
+
+    with TestClient(FastAPI(lifespan=_app_lifespan)) as client:
+        deadline = time.monotonic() + 5
+        while (response := client.get("/healthz")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert response.status_code == 200
+        assert response.json()["warmup"]["connections"] == 2
+    assert core._HTTP_CLIENT is None
+
+
+def test_import_does_not_load_converters():
+    # 新しいプロセスで確かめる（このプロセスでは他のテストが読み込み済みのことがある）
+    code = "import sys, jgrants_mcp_server.core; print(sorted(m for m in ('markitdown', 'pdfplumber') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_asgi_app_is_built_on_first_access():
+    code = (
+        "import jgrants_mcp_server.core as core; before = core._APP; app = core.app; "
+        "print(before is None, app is core.app, app.name)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["True", "True", "jgrants-mcp-server"]
+
+
+@pytest.mark.asyncio
+async def test_startup_preloads_converters_in_background(stub_api, monkeypatch):
+    stub_api.json("/subsidies", LISTING)
+    engine = ConversionEngine(max_workers=0)
+    monkeypatch.setattr(core, "_CONVERTER", engine)
+    monkeypatch.setattr(core, "_PRELOAD_CONVERTERS", True)
+    try:
+        async with core.lifespan():
+            await _wait_ready()
+            deadline = time.monotonic() + 30
+            while engine.stats()["preloaded_workers"] == 0 and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            assert engine.stats()["preloaded_workers"] == 1
+            assert "markitdown" in sys.modules
+        # 終了時に変換ワーカーを閉じる
+        assert engine._executor is None
+    finally:
+        engine.shutdown()
@@ -0,0 +1,184 @@
+"""get_subsidy_overview の集計スナップショットのテスト"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.overview import OverviewSnapshot
+
+BASE = datetime(2025, 4, 1, 9, 30, tzinfo=timezone.utc)
+
+
+def _legacy_overview(subsidies, now):
+    """スナップショット導入前の集計（1件ずつ解析するループ）。結果が一致することを確認する基準"""
+    stats = {
+        "total_count": len(subsidies),
+        "by_deadline_period": {"accepting": 0, "this_month": 0, "next_month": 0, "after_next_month": 0},
+        "by_amount_range": {"under_1m": 0, "under_10m": 0, "under_100m": 0, "over_100m": 0, "unspecified": 0},
+        "urgent_deadlines": [],
+        "high_amount_subsidies": [],
+    }
+    for subsidy in subsidies:
+        if subsidy.get("acceptance_end_datetime"):
+            try:
+                end_date = datetime.fromisoformat(subsidy["acceptance_end_datetime"].replace("Z", "+00:00"))
+                days_left = (end_date - now).days
+                if days_left < 0:
+                    continue
+                elif days_left <= 30:
+                    stats["by_deadline_period"]["this_month"] += 1
+                elif days_left <= 60:
+                    stats["by_deadline_period"]["next_month"] += 1
+                else:
+                    stats["by_deadline_period"]["after_next_month"] += 1
+                if 0 <= days_left <= 14:
+                    stats["urgent_deadlines"].append(
+                        {"id": subsidy.get("id"), "title": subsidy.get("title"), "days_left": days_left}
+                    )
+            except Exception:
+                pass
+        max_limit = subsidy.get("subsidy_max_limit")
+        if max_limit:
+            try:
+                amount = float(max_limit)
+                if amount <= 1000000:
+                    stats["by_amount_range"]["under_1m"] += 1
+                elif amount <= 10000000:
+                    stats["by_amount_range"]["under_10m"] += 1
+                elif amount <= 100000000:
+                    stats["by_amount_range"]["under_100m"] += 1
+                else:
+                    stats["by_amount_range"]["over_100m"] += 1
+                if amount >= 50000000:
+                    stats["high_amount_subsidies"].append(
+                        {"id": subsidy.get("id"), "title": subsidy.get("title"), "max_amount": amount}
+                    )
+            except Exception:
+                stats["by_amount_range"]["unspecified"] += 1
+        else:
+            stats["by_amount_range"]["unspecified"] += 1
+    return stats
+
+
+def _random_subsidies(rng, count, prefix="a0W"):
+    subsidies = []
+    for i in range(count):
+        end = BASE + timedelta(days=rng.uniform(-20, 120), seconds=rng.randint(0, 86399))
+        end_value = rng.choice([
+            end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            end.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            end.strftime("%Y-%m-%dT%H:%M:%S"),   # タイムゾーンなし（集計では締切不明扱い）
+            None,
+            "不明",
+        ] if rng.random() < 0.2 else [end.strftime("%Y-%m-%dT%H:%M:%SZ")])
+        amount = rng.choice([None, "", 0, "未定", 500000, 1000000, 4500000, 30000000, 50000000, 100000000, 300000000])
+        subsidies.append({
+            "id": f"{prefix}{i:06d}",
+            "title": f"補助金{i}",
+            "acceptance_end_datetime": end_value,
+            "subsidy_max_limit": amount,
+        })
+    return subsidies
+
+
+def _without_timestamp(stats):
+    return {k: v for k, v in stats.items() if k != "statistics_generated_at"}
+
+
+def test_snapshot_matches_legacy_loop_over_time():
+    rng = random.Random(11)
+    subsidies = _random_subsidies(rng, 400)
+    snapshot = OverviewSnapshot()
+    snapshot.apply(subsidies)
+
+    for hours in range(0, 24 * 90, 7):
+        now = BASE + timedelta(hours=hours, seconds=rng.randint(0, 3599))
+        assert _without_timestamp(snapshot.read(now)) == _legacy_overview(subsidies, now)
+
+
+def test_snapshot_applies_only_changes():
+    rng = random.Random(3)
+    subsidies = _random_subsidies(rng, 200)
+    snapshot = OverviewSnapshot()
+    assert snapshot.apply(subsidies) == 200
+    assert snapshot.apply(subsidies) == 0
+
+    updated = [dict(s) for s in subsidies[20:]]          # 20件削除
+    updated[0]["subsidy_max_limit"] = 999999999           # 1件変更
+    updated += _random_subsidies(rng, 5, prefix="new")    # 5件追加
+    rng.shuffle(updated)                                  # 並び順の変化は差分にならない
+    assert snapshot.apply(updated) == 26
+
+    now = BASE + timedelta(days=3)
+    assert _without_timestamp(snapshot.read(now)) == _legacy_overview(updated, now)
+
+
+SUBSIDIES = [
+    {
+        "id": "a0W000000000001",
+        "title": "締切間近の補助金",
+        "acceptance_end_datetime": (datetime.now(timezone.utc) + timedelta(days=3, hours=1)).isoformat(),
+        "subsidy_max_limit": 80000000,
+    },
+    {
+        "id": "a0W000000000002",
+        "title": "来月締切の補助金",
+        "acceptance_end_datetime": (datetime.now(timezone.utc) + timedelta(days=45)).isoformat(),
+        "subsidy_max_limit": 3000000,
+    },
+]
+
+
+@pytest.mark.asyncio
+async def test_overview_reads_snapshot_without_refetching(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+
+    first = await core.get_subsidy_overview.fn()
+    assert first["total_count"] == 2
+    assert first["by_deadline_period"]["this_month"] == 1
+    assert first["by_deadline_period"]["next_month"] == 1
+    assert [u["days_left"] for u in first["urgent_deadlines"]] == [3]
+    assert [h["id"] for h in first["high_amount_subsidies"]] == ["a0W000000000001"]
+
+    core._SEARCH_CACHE.clear()
+    csv = await core.get_subsidy_overview.fn("csv")
+    assert csv["format"] == "csv"
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_refreshed_in_background(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": SUBSIDIES[:1]})
+    await core.get_subsidy_overview.fn()
+    monkeypatch.setattr(core, "_OVERVIEW_REFRESH_INTERVAL", 0.01)
+    core._SEARCH_CACHE.clear()
+    await asyncio.sleep(0.05)
+
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    stale = await core.get_subsidy_overview.fn()
+    assert stale["total_count"] == 1
+    await asyncio.gather(*core._BACKGROUND_TASKS)
+    monkeypatch.setattr(core, "_OVERVIEW_REFRESH_INTERVAL", 300.0)
+    fresh = await core.get_subsidy_overview.fn()
+    assert fresh["total_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_catalog_sync_updates_snapshot(stub_api):
+    stub_api.json("/subsidies", {"result": SUBSIDIES})
+    await core.sync_catalog.fn()
+
+    overview = await core.get_subsidy_overview.fn()
+
+    assert overview["total_count"] == 2
+    assert len(stub_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_overview_error_is_returned_when_never_fetched(stub_api):
+    stub_api.json("/subsidies", {"message": "error"}, status=500)
+    result = await core.get_subsidy_overview.fn()
+    assert "500" in result["error"]
@@ -0,0 +1,50 @@
+"""search_subsidies のページ送り（page_size / cursor）のテスト（スタブAPI使用）"""
+
+import pytest
+
+from jgrants_mcp_server import core
+
+LISTING = [{"id": f"a{i:03d}", "title": f"補助金{i}"} for i in range(230)]
+
+
+@pytest.mark.asyncio
+async def test_cursor_walks_a_snapshot_of_the_results(stub_api):
+    state = {"listing": LISTING}
+    stub_api.route("/subsidies", lambda req: (200, {}, {"result": state["listing"]}))
+
+    first = await core.search_subsidies.fn("補助金", page_size=100)
+    assert first["total_count"] == 230
+    assert len(first["subsidies"]) == 100
+    assert first["page"] == {"offset": 0, "page_size": 100, "returned": 100}
+
+    # ページ送りの途中で上流の結果が変わっても、1ページ目の時点の結果の続きを返す
+    state["listing"] = LISTING[:5]
+    core._SEARCH_CACHE.clear()
+    ids = [s["id"] for s in first["subsidies"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = await core.search_subsidies.fn("無視される", cursor=cursor, page_size=100)
+        assert page["total_count"] == 230
+        ids += [s["id"] for s in page["subsidies"]]
+        cursor = page["next_cursor"]
+    assert ids == [s["id"] for s in LISTING]
+    assert page["page"] == {"offset": 200, "page_size": 100, "returned": 30}
+    assert len(stub_api.requests) == 1
+
+    # 既定の件数（1ページに収まれば cursor は発行しない）
+    small = await core.search_subsidies.fn("補助金")
+    assert small["page"]["page_size"] == core._SEARCH_PAGE_SIZE
+    assert small["next_cursor"] is None
+    assert core._SEARCH_PAGES.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_page_size_and_cursor_validation(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": LISTING})
+    assert "error" in await core.search_subsidies.fn("補助金", page_size=0)
+    assert "error" in await core.search_subsidies.fn("補助金", page_size=core._SEARCH_MAX_PAGE_SIZE + 1)
+    assert "不正" in (await core.search_subsidies.fn("補助金", cursor="abc"))["error"]
+
+    page = await core.search_subsidies.fn("補助金", page_size=10)
+    core._SEARCH_PAGES.clear()
+    assert "有効期限" in (await core.search_subsidies.fn("補助金", cursor=page["next_cursor"]))["error"]
@@ -0,0 +1,121 @@
+"""検索・詳細の項目の絞り込み（fields）と compact 表示のテスト（スタブAPI使用）"""
+
+import base64
+import json
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.projection import parse_fields, project
+
+SUBSIDY_ID = "a0W000000000001"
+LISTING = [
+    {
+        "id": f"a{i:03d}",
+        "name": f"S-{i:05d}",
+        "title": f"ものづくり補助金 第{i}次",
+        "target_area_search": "全国",
+        "subsidy_max_limit": 10000000,
+        "acceptance_start_datetime": "2025-01-01T00:00:00Z",
+        "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+        "target_number_of_employees": "従業員数の制約なし",
+    }
+    for i in range(40)
+]
+DETAIL = {
+    "result": [{
+        "id": SUBSIDY_ID,
+        "title": "IT導入補助金",
+        "detail": "<p>中小企業の<b>IT導入</b>を支援します。&nbsp;</p>" + "<p>" + "対象経費の説明。" * 200 + "</p>",
+        "subsidy_max_limit": 4500000,
+        "acceptance_start_datetime": "2025-01-01T00:00:00Z",
+        "acceptance_end_datetime": "2099-12-31T00:00:00Z",
+        "target_area_search": "全国",
+        "target_industry": "製造業",
+        "update_datetime": "2025-01-01T00:00:00Z",
+        "application_guidelines": [
+            {"name": f"公募要領{i}.pdf", "data": base64.b64encode(b"%PDF-1 guideline").decode()} for i in range(3)
+        ],
+    }]
+}
+
+
+def _size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False))
+
+
+def test_project_and_parse_fields():
+    record = {"id": "a1", "title": "補助金", "target": {"area": "全国", "industry": "製造業"}}
+    assert project(record, ["title", "target.area", "missing"]) == {"title": "補助金", "target": {"area": "全国"}}
+    assert project(record, ["target.area", "target"]) == {"target": record["target"]}
+    assert parse_fields(" id, title ,,id") == ["id", "title"]
+    assert parse_fields(["id"]) == ["id"]
+    assert parse_fields(None) is None
+    for bad in ("", " , ", 123, ["id", 1]):
+        with pytest.raises(ValueError):
+            parse_fields(bad)
+
+
+@pytest.mark.asyncio
+async def test_search_fields_and_compact_profile(stub_api):
+    stub_api.json("/subsidies", {"result": LISTING})
+
+    full = await core.search_subsidies.fn("補助金")
+    compact = await core.search_subsidies.fn("補助金", profile="compact")
+    assert compact["subsidies"][0] == {
+        "id": "a000", "title": "ものづくり補助金 第0次",
+        "acceptance_end_datetime": "2099-12-31T00:00:00Z", "subsidy_max_limit": 10000000,
+    }
+    assert compact["total_count"] == full["total_count"]
+    assert _size(compact) * 2 < _size(full)
+
+    # id は常に含め、ページ送りでも同じ項目に絞る
+    page = await core.search_subsidies.fn("補助金", fields="title", page_size=30)
+    assert page["subsidies"][0] == {"id": "a000", "title": "ものづくり補助金 第0次"}
+    rest = await core.search_subsidies.fn("補助金", cursor=page["next_cursor"], fields="subsidy_max_limit")
+    assert rest["subsidies"][0] == {"id": "a030", "subsidy_max_limit": 10000000}
+    # キャッシュ上の結果は書き換えない
+    assert (await core.search_subsidies.fn("補助金"))["subsidies"] == full["subsidies"]
+
+    assert "error" in await core.search_subsidies.fn("補助金", profile="tiny")
+    assert "error" in await core.search_subsidies.fn("補助金", fields=" , ")
+
+
+@pytest.mark.asyncio
+async def test_detail_compact_profile_and_fields(stub_api, monkeypatch):
+    # 保存済みの結果をすぐに返さず、上流からの取得を待つ
+    monkeypatch.setattr(core, "_DETAIL_FRESH_TTL", 0)
+    monkeypatch.setattr(core, "_STALE_GRACE", 5.0)
+    stub_api.json(f"/subsidies/id/{SUBSIDY_ID}", DETAIL)
+
+    full = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    compact = await core.get_subsidy_detail.fn(SUBSIDY_ID, profile="compact")
+    assert compact["description"].startswith("中小企業の IT導入 を支援します。")
+    assert compact["description"].endswith("…")
+    assert compact["files"]["application_guidelines"][0] == {"name": "公募要領0.pdf", "size": 16}
+    assert "get_file_content" in compact["file_access"]
+    assert "save_directory" not in compact
+    assert _size(compact) * 3 < _size(full)
+
+    # 取得方法の項目名は保存するモードとメタデータのみのモードで同じ
+    light = await core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=True)
+    for result in (full, light):
+        entry = result["files"]["application_guidelines"][0]
+        assert entry["mcp_access"]["tool"] == "get_file_content"
+    light_compact = await core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=True, profile="compact")
+    assert "mcp_access" not in light_compact["files"]["application_guidelines"][0]
+    picked_files = await core.get_subsidy_detail.fn(SUBSIDY_ID, metadata_only=True, fields="files")
+    assert picked_files["files"]["application_guidelines"][0]["mcp_access"] == entry["mcp_access"]
+
+    picked = await core.get_subsidy_detail.fn(SUBSIDY_ID, fields="title,acceptance_end,target.industry")
+    assert picked == {
+        "id": SUBSIDY_ID, "title": "IT導入補助金",
+        "acceptance_end": "2099-12-31T00:00:00Z", "target": {"industry": "製造業"},
+    }
+    assert "unknown" in (await core.get_subsidy_detail.fn(SUBSIDY_ID, fields="title,unknown"))["error"]
+
+    batch = await core.get_subsidy_details_batch.fn(
+        [SUBSIDY_ID, "a0W000000000404"], download_files=False, fields="status"
+    )
+    assert batch["results"][0] == {"id": SUBSIDY_ID, "status": "受付中", "metadata_only": True}
+    assert "error" in batch["results"][1]
@@ -0,0 +1,176 @@
+"""上流APIの流量制御・再試行・サーキットブレーカーのテスト（スタブAPI使用）"""
+
+import asyncio
+import random
+import time
+from email.utils import formatdate
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RateLimiter,
+    UpstreamGuard,
+    parse_retry_after,
+)
+
+
+def _guard(**kwargs) -> UpstreamGuard:
+    limiter = kwargs.pop("limiter", RateLimiter(rate=0))
+    breaker = kwargs.pop("breaker", CircuitBreaker(failure_threshold=0, reset_timeout=0))
+    options = {"max_retries": 3, "backoff_base": 0.01, "backoff_max": 0.05, "rng": random.Random(0)}
+    options.update(kwargs)
+    return UpstreamGuard(limiter, breaker, **options)
+
+
+def _sequence(stub, responses):
+    """呼ばれるたびに responses を順に返す（最後の要素を繰り返す）"""
+    calls = []
+
+    def handler(req):
+        calls.append(time.monotonic())
+        return responses[min(len(calls), len(responses)) - 1]
+
+    stub.route("/subsidies", handler)
+    return calls
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(formatdate(1000.0 + 30, usegmt=True), now=1000.0) == 30.0
+    assert parse_retry_after(formatdate(900.0, usegmt=True), now=1000.0) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_5xx_is_retried_with_backoff(stub_api, monkeypatch):
+    guard = _guard()
+    monkeypatch.setattr(core, "_UPSTREAM", guard)
+    calls = _sequence(stub_api, [(503, {}, {"message": "down"}), (502, {}, {}), (200, {}, {"result": []})])
+
+    result = await core._search_subsidies_internal(keyword="IT導入")
+    assert result["total_count"] == 0
+    assert len(calls) == 3
+    assert guard.stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_UPSTREAM", _guard(max_retries=2))
+    calls = _sequence(stub_api, [(500, {}, {})])
+
+    result = await core._search_subsidies_internal(keyword="IT導入")
+    assert result == {"error": "HTTPエラー: 500"}
+    assert len(calls) == 3
+
+    # 404 などは再試行しない
+    _sequence(stub_api, [(404, {}, {})])
+    detail = await core.get_subsidy_detail.fn("a0W000000000404")
+    assert "見つかりません" in detail["error"]
+    assert len(stub_api.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_429_honors_retry_after_and_lowers_rate(stub_api, monkeypatch):
+    limiter = RateLimiter(rate=100, burst=10)
+    monkeypatch.setattr(core, "_UPSTREAM", _guard(limiter=limiter))
+    calls = _sequence(stub_api, [(429, {"Retry-After": "1"}, {}), (200, {}, {"result": []})])
+
+    result = await core._search_subsidies_internal(keyword="IT導入")
+    assert "error" not in result
+    assert calls[1] - calls[0] >= 0.95
+    assert limiter.throttled == 1
+    assert limiter.rate < 100
+
+    # Retry-After が上限より長ければ待たずにエラーを返す
+    monkeypatch.setattr(core, "_UPSTREAM", _guard(retry_after_max=5))
+    calls = _sequence(stub_api, [(429, {"Retry-After": "3600"}, {})])
+    started = time.monotonic()
+    result = await core._search_subsidies_internal(keyword="DX推進")
+    assert result == {"error": "HTTPエラー: 429"}
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_connect_errors_are_retried(monkeypatch):
+    guard = _guard(max_retries=2)
+    monkeypatch.setattr(core, "_UPSTREAM", guard)
+    monkeypatch.setattr(core, "_HTTP_CLIENT", None)
+    monkeypatch.setattr(core, "_SEARCH_CACHE", core.ResponseCache(ttl=0))
+    # 使われていないポートへ接続する
+    monkeypatch.setattr(core, "API_BASE_URL", "http://127.0.0.1:9")
+
+    result = await core._get_json(f"{core.API_BASE_URL}/subsidies")
+    assert "接続に失敗" in result["error"]
+    assert guard.stats()["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_and_recovers(stub_api, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+    monkeypatch.setattr(core, "_UPSTREAM", _guard(max_retries=0, breaker=breaker))
+    calls = _sequence(stub_api, [(500, {}, {})])
+
+    for keyword in ("補助金A", "補助金B"):
+        assert "error" in await core._search_subsidies_internal(keyword=keyword)
+    assert breaker.state == "open"
+
+    # 開いている間は上流に送らない
+    result = await core._search_subsidies_internal(keyword="補助金C")
+    assert "停止しています" in result["error"]
+    assert len(calls) == 2
+    assert breaker.short_circuited == 1
+
+    # 一定時間後に1件だけ試し、失敗すれば再び開く
+    await asyncio.sleep(0.35)
+    assert "HTTPエラー: 500" in (await core._search_subsidies_internal(keyword="補助金D"))["error"]
+    assert breaker.state == "open"
+    assert len(calls) == 3
+
+    await asyncio.sleep(0.35)
+    _sequence(stub_api, [(200, {}, {"result": []})])
+    assert "error" not in await core._search_subsidies_internal(keyword="補助金E")
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 11
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.release()
+    breaker.before_request()
+    breaker.record_success()
+    breaker.before_request()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_requests(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_UPSTREAM", _guard(limiter=RateLimiter(rate=20, burst=2)))
+    calls = _sequence(stub_api, [(200, {}, {"result": []})])
+
+    started = time.monotonic()
+    await asyncio.gather(*(core._search_subsidies_internal(keyword=f"補助金{i}") for i in range(6)))
+    # 2件はバーストで即時、残り4件は 1/20 秒間隔
+    assert time.monotonic() - started >= 0.19
+    assert len(calls) == 6
+
+
+def test_rate_recovers_additively_after_throttling():
+    limiter = RateLimiter(rate=10, burst=1)
+    limiter.on_throttled()
+    limiter.on_throttled()
+    assert limiter.rate == 2.5
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.rate == 4.0
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 10
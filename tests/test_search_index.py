@@ -0,0 +1,115 @@
+"""添付ファイル全文検索（search_attachments）のテスト（ローカルファイルのみ、API呼び出しなし）"""
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.converter import ConversionEngine
+from jgrants_mcp_server.search_index import AttachmentIndex, match_expression, tokenize
+from tests.sample_files import make_pdf
+
+SUBSIDY_A = "a0W000000000001"
+SUBSIDY_B = "a0W000000000002"
+
+
+@pytest.fixture
+def files_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(core, "FILES_DIR", tmp_path)
+    monkeypatch.setattr(core, "_ATTACHMENT_INDEX", None)
+    engine = ConversionEngine(max_workers=0)
+    monkeypatch.setattr(core, "_CONVERTER", engine)
+    (tmp_path / SUBSIDY_A).mkdir()
+    (tmp_path / SUBSIDY_B).mkdir()
+    yield tmp_path
+    if core._ATTACHMENT_INDEX is not None:
+        core._ATTACHMENT_INDEX.close()
+    engine.shutdown()
+
+
+def test_bigram_tokenization():
+    assert tokenize("賃上げ枠") == "賃上 上げ げ枠 枠"
+    assert tokenize("ＩＴ導入、DX") == "it t導 導入 入 dx"
+    assert match_expression("賃上げ 加点") == '"賃上 上げ" AND "加点"'
+    assert match_expression("枠") == '"枠"*'
+    assert match_expression("、、") is None
+
+
+def test_index_matches_substrings(tmp_path):
+    index = AttachmentIndex(tmp_path / "index.sqlite3")
+    index.replace_document("a/1.txt", "a", "1.txt", "k1", [(None, 0, "本事業では賃上げに取り組む事業者を加点します。")])
+    index.replace_document("b/2.txt", "b", "2.txt", "k2", [(None, 0, "設備投資の補助率は1/2です。")])
+
+    hits = index.search("賃上げ")
+    assert [h["filename"] for h in hits] == ["1.txt"]
+    assert "**賃上げ**" in hits[0]["snippet"]
+    assert index.search("上げに") and not index.search("上げる")
+    assert [h["filename"] for h in index.search("投資")] == ["2.txt"]
+    assert index.search("賃上げ 設備") == []
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_search_attachments_ranks_pages_and_chunks(files_dir):
+    (files_dir / SUBSIDY_A / "要領.pdf").write_bytes(make_pdf(["Outline", "Wage increase bonus", "Schedule"]))
+    (files_dir / SUBSIDY_B / "概要.txt").write_text("賃上げ枠の申請要件について", encoding="utf-8")
+    (files_dir / SUBSIDY_B / "様式.bin").write_bytes(b"\x00\x01")
+
+    result = await core.search_attachments.fn("wage")
+    assert result["newly_indexed"] == 2
+    assert result["indexed_files"] == 2
+    [hit] = result["results"]
+    assert (hit["subsidy_id"], hit["filename"], hit["page"]) == (SUBSIDY_A, "要領.pdf", 2)
+
+    result = await core.search_attachments.fn("賃上げ")
+    [hit] = result["results"]
+    assert (hit["subsidy_id"], hit["filename"], hit["char_offset"]) == (SUBSIDY_B, "概要.txt", 0)
+    assert result["newly_indexed"] == 0
+
+    scoped = await core.search_attachments.fn("賃上げ", subsidy_id=SUBSIDY_A)
+    assert scoped["results"] == []
+
+
+@pytest.mark.asyncio
+async def test_corrupt_file_does_not_break_search(files_dir):
+    (files_dir / SUBSIDY_A / "要領.pdf").write_bytes(make_pdf(["Wage increase bonus"]))
+    (files_dir / SUBSIDY_B / "壊れた.pdf").write_bytes(b"%PDF-1.4\nnot really a pdf")
+
+    first = await core.search_attachments.fn("wage")
+    assert "error" not in first
+    assert first["newly_indexed"] == 2
+    assert [hit["filename"] for hit in first["results"]] == ["要領.pdf"]
+
+    # 壊れたファイルは空の文書として記録済みなので、次回は変換し直さない
+    second = await core.search_attachments.fn("wage")
+    assert second["newly_indexed"] == 0
+    assert [hit["filename"] for hit in second["results"]] == ["要領.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_index_is_incremental(files_dir):
+    memo = files_dir / SUBSIDY_A / "memo.txt"
+    memo.write_text("通常枠", encoding="utf-8")
+    await core.search_attachments.fn("通常")
+    converted = core._CONVERTER.submitted
+
+    # 変化がなければ変換も再索引もしない
+    again = await core.search_attachments.fn("通常")
+    assert again["newly_indexed"] == 0
+    assert core._CONVERTER.submitted == converted
+
+    memo.write_text("賃上げ枠", encoding="utf-8")
+    changed = await core.search_attachments.fn("賃上げ")
+    assert changed["newly_indexed"] == 1
+    assert len(changed["results"]) == 1
+    assert (await core.search_attachments.fn("通常"))["results"] == []
+
+    memo.unlink()
+    removed = await core.search_attachments.fn("賃上げ")
+    assert removed["results"] == []
+    assert removed["indexed_files"] == 0
+
+
+@pytest.mark.asyncio
+async def test_search_attachments_validation(files_dir):
+    assert "error" in await core.search_attachments.fn("  ")
+    assert "error" in await core.search_attachments.fn("賃上げ", limit=0)
+    assert "error" in await core.search_attachments.fn("賃上げ", subsidy_id="missing")
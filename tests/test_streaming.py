@@ -0,0 +1,120 @@
+"""補助金詳細レスポンスの逐次パースのテスト"""
+
+import base64
+import json
+import os
+import random
+import tracemalloc
+
+import pytest
+
+from jgrants_mcp_server import core
+from jgrants_mcp_server.streaming import AttachmentStreamParser, StreamSink
+
+SUBSIDY_ID = "a0W000000000001"
+
+
+class _BytesSink(StreamSink):
+    def __init__(self, file_type, index):
+        self.file_type, self.index, self.data = file_type, index, bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        return (self.file_type, self.index, base64.b64decode(bytes(self.data)))
+
+
+def _document(files):
+    return {
+        "metadata": {"resultset": {"count": 1}},
+        "result": [{
+            "id": SUBSIDY_ID,
+            "title": "エスケープ \"を\" 含む\\タイトル",
+            "detail": "<p>説明</p>",
+            "data": "ストリーミング対象外",
+            "update_datetime": "2025-01-01T00:00:00Z",
+            "application_guidelines": [
+                {"data": base64.b64encode(content).decode(), "name": name}
+                for name, content in files.items()
+            ],
+            "outline_of_grant": [],
+            "application_form": [{"name": "様式.docx", "file_data": base64.b64encode(b"form").decode()}],
+            "numbers": [1, 2.5, None, True],
+        }],
+    }
+
+
+@pytest.mark.parametrize("escape_slash", [False, True])
+def test_parser_round_trip_with_random_chunks(escape_slash):
+    rng = random.Random(0)
+    files = {f"f{i}.pdf": rng.randbytes(rng.randint(1, 4000)) for i in range(3)}
+    doc = _document(files)
+    raw = json.dumps(doc, ensure_ascii=escape_slash).encode("utf-8")
+    if escape_slash:
+        raw = raw.replace(b"/", b"\\/")
+
+    parser = AttachmentStreamParser(_BytesSink)
+    pos = 0
+    while pos < len(raw):
+        size = rng.randint(1, 64)
+        parser.feed(raw[pos:pos + size])
+        pos += size
+    out = parser.close()["result"][0]
+
+    expected = doc["result"][0]
+    for key in ("id", "title", "detail", "data", "numbers"):
+        assert out[key] == expected[key]
+    for index, (name, content) in enumerate(files.items()):
+        assert out["application_guidelines"][index]["name"] == name
+        assert out["application_guidelines"][index]["data"] == ("application_guidelines", index, content)
+    assert out["application_form"][0]["file_data"] == ("application_form", 0, b"form")
+
+
+def test_parser_rejects_truncated_json():
+    parser = AttachmentStreamParser(_BytesSink)
+    parser.feed(b'{"result": [{"application_guidelines": [{"data": "QUJD')
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_streamed_detail_saves_files(stub_api, monkeypatch):
+    monkeypatch.setattr(core, "_STREAM_DETAIL_MIN_BYTES", 0)
+    files = {"公募要領.pdf": os.urandom(300_000), "概要.pdf": os.urandom(10)}
+    raw = json.dumps(_document(files)).replace("/", "\\/")
+    stub_api.route(f"/subsidies/id/{SUBSIDY_ID}", lambda req: (200, {"Content-Type": "application/json"}, raw))
+
+    result = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+
+    subsidy_dir = core.FILES_DIR / SUBSIDY_ID
+    assert [f["size"] for f in result["files"]["application_guidelines"]] == [300_000, 10]
+    for name, content in files.items():
+        assert (subsidy_dir / name).read_bytes() == content
+    assert (subsidy_dir / "様式.docx").read_bytes() == b"form"
+    assert not list(subsidy_dir.glob(".*.part"))
+
+    # 2回目は内容が同じなので保存済みファイルを書き換えない
+    mtime = (subsidy_dir / "公募要領.pdf").stat().st_mtime_ns
+    await core.get_subsidy_detail.fn(SUBSIDY_ID)
+    assert (subsidy_dir / "公募要領.pdf").stat().st_mtime_ns == mtime
+    assert not list(subsidy_dir.glob(".*.part"))
+
+
+@pytest.mark.asyncio
+async def test_streamed_detail_memory_is_bounded(stub_api, monkeypatch):
+    """32MiBの添付ファイルでも、ピークのメモリ確保量が添付サイズより十分小さいこと"""
+    monkeypatch.setattr(core, "_STREAM_DETAIL_MIN_BYTES", 0)
+    size = 32 * 1024 * 1024
+    body = json.dumps(_document({"large.pdf": os.urandom(size)})).encode()
+    stub_api.route(f"/subsidies/id/{SUBSIDY_ID}", lambda req: (200, {"Content-Type": "application/json"}, body))
+
+    tracemalloc.start()
+    try:
+        result = await core.get_subsidy_detail.fn(SUBSIDY_ID)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result["files"]["application_guidelines"][0]["size"] == size
+    assert peak < size // 4, f"peak allocation {peak / 1024 / 1024:.1f} MiB"
@@ -0,0 +1,68 @@
+"""上流APIへの接続プールの設定・計測と DNS キャッシュのテスト（スタブAPI使用）"""
+
+import asyncio
+
+import pytest
+
+from jgrants_mcp_server import core
+
+
+async def _fetch_all(n: int) -> list:
+    return await asyncio.gather(*(core._get_json(f"{core.API_BASE_URL}/subsidies", {"keyword": f"補助金{i}"}) for i in range(n)))
+
+
+@pytest.mark.asyncio
+async def test_pool_saturation_is_measured(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": []})
+    stub_api.delay = 0.2
+    monkeypatch.setattr(core, "_HTTP_MAX_CONNECTIONS", 1)
+
+    results = await _fetch_all(3)
+    assert all("error" not in r for r in results)
+
+    pool = (await core.get_server_stats.fn())["http"]["pool"]
+    assert pool["max_connections"] == 1
+    assert (pool["in_use"], pool["waiting"]) == (0, 0)
+    assert (pool["peak_in_use"], pool["peak_waiting"], pool["acquired"]) == (1, 3, 3)
+    # 3件目は前の2件が終わるまで接続を確保できない
+    assert pool["acquire_latency_ms"]["max"] >= 350
+    assert pool["acquire_latency_ms"]["p50"] >= 150
+
+
+@pytest.mark.asyncio
+async def test_pool_timeout_is_reported_and_not_retried(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": []})
+    stub_api.delay = 0.5
+    monkeypatch.setattr(core, "_HTTP_MAX_CONNECTIONS", 2)
+    monkeypatch.setattr(core, "_HTTP_POOL_TIMEOUT", 0.1)
+
+    results = await _fetch_all(4)
+    errors = [r["error"] for r in results if "error" in r]
+    assert len(errors) == 2
+    assert "同時リクエストが多すぎる" in errors[0] and "JGRANTS_HTTP_MAX_CONNECTIONS" in errors[0]
+
+    stats = await core.get_server_stats.fn()
+    assert stats["http"]["pool"]["pool_timeouts"] == 2
+    assert stats["upstream"]["retries"] == 0
+    assert stats["upstream"]["circuit_breaker"]["consecutive_failures"] == 0
+    assert len(stub_api.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_dns_cache_reuses_lookups(stub_api, monkeypatch):
+    stub_api.json("/subsidies", {"result": []})
+    port = stub_api.base_url.rsplit(":", 1)[1]
+    monkeypatch.setattr(core, "API_BASE_URL", f"http://localhost:{port}")
+    monkeypatch.setattr(core, "_DNS_CACHE_TTL", 60.0)
+    # 毎回新しく接続させる
+    monkeypatch.setattr(core, "_HTTP_MAX_KEEPALIVE", 0)
+
+    for i in range(3):
+        assert "error" not in await core._get_json(f"{core.API_BASE_URL}/subsidies", {"keyword": f"補助金{i}"})
+    assert stub_api.connections == 3
+    dns = (await core.get_server_stats.fn())["http"]["dns_cache"]
+    assert (dns["misses"], dns["hits"]) == (1, 2)
+
+    monkeypatch.setattr(core, "_DNS_CACHE_TTL", 0.0)
+    monkeypatch.setattr(core, "_HTTP_CLIENT", None)
+    assert (await core.get_server_stats.fn())["http"]["dns_cache"] is None